@@ -1,410 +0,0 @@
-import os
-import django
-from decimal import Decimal
-from pathlib import Path
-
-# Setup Django
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'paper_trail_ecommerce_project.settings')
-django.setup()
-
-from shop.models import Product
-from django.conf import settings
-
-# Use the media folder from Django settings
-BASE_DIR = Path(__file__).resolve().parent
-MEDIA_ROOT = getattr(settings, 'MEDIA_ROOT', BASE_DIR / 'media')
-IMAGES_FOLDER = MEDIA_ROOT / 'products'
-
-print(f"Looking for images in: { IMAGES_FOLDER }")
-
-# Your products data
-products = [
-    # NOTEBOOKS
-    {
-        'name': 'Classic Spiral Notebook (A5)',
-        'description': 'Durable cover and smooth ruled pages, ideal for class notes or journaling.',
-        'price': 45.00,
-        'category': 'notebooks',
-        'stock_quantity': 50,
-        'image_path': 'products/classicspiralnb.png',
-        'weight': 180.00,
-        'dimensions': '21cm x 14.8cm'
-    },
-    {
-        'name': 'Composition Notebook',
-        'description': 'Classic black-and-white marble design with a sturdy cover and sewn binding that keeps pages securely in place.',
-        'price': 55.00,
-        'category': 'notebooks',
-        'stock_quantity': 40,
-        'image_path': 'products/compositionnb.png',
-        'weight': 200.00,
-        'dimensions': '24cm x 19cm'
-    },
-    {
-        'name': 'Dot Grid Notebook (A5)',
-        'description': 'Features grid pages, great for technical drawings or bullet journaling.',
-        'price': 60.00,
-        'category': 'notebooks',
-        'stock_quantity': 35,
-        'image_path': 'products/dotgridjournalnb.png',
-        'weight': 175.00,
-        'dimensions': '21cm x 14.8cm'
-    },
-    {
-        'name': 'Grid Notebook (A5)',
-        'description': 'Features grid pages, great for technical drawings or bullet journaling.',
-        'price': 50.00,
-        'category': 'notebooks',
-        'stock_quantity': 45,
-        'image_path': 'products/gridnb.png',
-        'weight': 170.00,
-        'dimensions': '21cm x 14.8cm'
-    },
-    {
-        'name': 'Hardbound Journal (A6)',
-        'description': 'Compact and sturdy notebook with thick paper, perfect for daily reflections.',
-        'price': 85.00,
-        'category': 'notebooks',
-        'stock_quantity': 25,
-        'image_path': 'products/hardboundjournalnb.png',
-        'weight': 220.00,
-        'dimensions': '14.8cm x 10.5cm'
-    },
-    {
-        'name': 'Mini Pocket Notebook',
-        'description': 'Compact design for quick notes and reminders.',
-        'price': 30.00,
-        'category': 'notebooks',
-        'stock_quantity': 60,
-        'image_path': 'products/minipocketnb.png',
-        'weight': 50.00,
-        'dimensions': '9cm x 14cm'
-    },
-
-    # PENS
-    {
-        'name': 'Calligraphy Brush Pen Set',
-        'description': 'Ideal for hand lettering and creative journaling.',
-        'price': 180.00,
-        'category': 'pens',
-        'stock_quantity': 20,
-        'image_path': 'products/callibrushsetpen.png',
-        'weight': 120.00,
-        'dimensions': '18cm x 12cm x 3cm (box)'
-    },
-    {
-        'name': 'Fine Liner Pen (Black, 0.4mm)',
-        'description': 'Precision tip for detailed writing or sketching.',
-        'price': 45.00,
-        'category': 'pens',
-        'stock_quantity': 75,
-        'image_path': 'products/finelinerpen.png',
-        'weight': 8.00,
-        'dimensions': '14cm L'
-    },
-    {
-        'name': 'Multicolor 4-in-1 Pen',
-        'description': 'Combines four ink colors in one pen for convenience.',
-        'price': 60.00,
-        'category': 'pens',
-        'stock_quantity': 50,
-        'image_path': 'products/multicolorpen.png',
-        'weight': 15.00,
-        'dimensions': '14.5cm L'
-    },
-    {
-        'name': 'Retractable Ballpoint Pen (Blue, 1.0mm)',
-        'description': 'Easy-click pen for everyday writing.',
-        'price': 25.00,
-        'category': 'pens',
-        'stock_quantity': 100,
-        'image_path': 'products/retballpointpen.png',
-        'weight': 6.00,
-        'dimensions': '13.5cm L'
-    },
-    {
-        'name': 'Rollerball Pen (Blue, 0.7mm)',
-        'description': 'Smooth ink delivery with a classic design.',
-        'price': 40.00,
-        'category': 'pens',
-        'stock_quantity': 80,
-        'image_path': 'products/rollerballpen.png',
-        'weight': 10.00,
-        'dimensions': '14cm L'
-    },
-    {
-        'name': 'Smooth Gel Pen (Black, 0.5mm)',
-        'description': 'Quick-drying gel pen with smooth ink flow, great for writing or school use.',
-        'price': 25.00,
-        'category': 'pens',
-        'stock_quantity': 120,
-        'image_path': 'products/smoothgelpen.png',
-        'weight': 7.00,
-        'dimensions': '13.8cm L'
-    },
-
-    # PENCILS
-    {
-        'name': 'Charcoal Pencil Set',
-        'description': 'Rich, deep tones for artistic sketches.',
-        'price': 150.00,
-        'category': 'pencils',
-        'stock_quantity': 30,
-        'image_path': 'products/charcoalpencilset.png',
-        'weight': 90.00,
-        'dimensions': '20cm x 8cm x 2cm (box)'
-    },
-    {
-        'name': 'Colored Pencil Set (12 Colors)',
-        'description': 'Smooth pigment for coloring and artwork.',
-        'price': 120.00,
-        'category': 'pencils',
-        'stock_quantity': 40,
-        'image_path': 'products/coloredpencils.png',
-        'weight': 85.00,
-        'dimensions': '19cm x 10cm x 1.5cm (box)'
-    },
-    {
-        'name': 'Eco Recycled Pencil',
-        'description': 'Made from recycled materials, perfect for eco-conscious users.',
-        'price': 20.00,
-        'category': 'pencils',
-        'stock_quantity': 150,
-        'image_path': 'products/ecorecycledpencil.png',
-        'weight': 5.00,
-        'dimensions': '19cm L'
-    },
-    {
-        'name': 'Graphite Sketch Pencil Set (6B–4H)',
-        'description': 'Ideal for shading and technical sketches.',
-        'price': 130.00,
-        'category': 'pencils',
-        'stock_quantity': 35,
-        'image_path': 'products/graphitepencil.png',
-        'weight': 100.00,
-        'dimensions': '20cm x 12cm x 2cm (box)'
-    },
-    {
-        'name': 'Mechanical Pencil (0.5mm)',
-        'description': 'Refillable pencil with comfortable grip.',
-        'price': 45.00,
-        'category': 'pencils',
-        'stock_quantity': 70,
-        'image_path': 'products/mechpencil.png',
-        'weight': 12.00,
-        'dimensions': '14cm L'
-    },
-    {
-        'name': 'Wooden Pencil (Classic)',
-        'description': 'Durable lead pencil for writing and drawing.',
-        'price': 10.00,
-        'category': 'pencils',
-        'stock_quantity': 200,
-        'image_path': 'products/woodenpencil.png',
-        'weight': 4.00,
-        'dimensions': '19cm L'
-    },
-
-    # ART MATERIALS
-    {
-        'name': 'Acrylic Paint Tubes (12 pcs)',
-        'description': 'Rich, vibrant colors for canvas and crafts.',
-        'price': 220.00,
-        'category': 'art_materials',
-        'stock_quantity': 25,
-        'image_path': 'products/acrylicpainttubes.png',
-        'weight': 480.00,
-        'dimensions': '25cm x 15cm x 5cm (box)'
-    },
-    {
-        'name': 'Artist Marker Set (24 Colors)',
-        'description': 'Dual-tip markers for shading and blending.',
-        'price': 350.00,
-        'category': 'art_materials',
-        'stock_quantity': 15,
-        'image_path': 'products/artistmarkerset.png',
-        'weight': 350.00,
-        'dimensions': '28cm x 20cm x 3cm (box)'
-    },
-    {
-        'name': 'Craft Scissors (Decorative Edge)',
-        'description': 'Perfect for paper crafting and scrapbooking.',
-        'price': 85.00,
-        'category': 'art_materials',
-        'stock_quantity': 30,
-        'image_path': 'products/craftscissor.png',
-        'weight': 65.00,
-        'dimensions': '18cm L'
-    },
-    {
-        'name': 'Glue Stick (Large)',
-        'description': 'Mess-free adhesive for craft and school projects.',
-        'price': 35.00,
-        'category': 'art_materials',
-        'stock_quantity': 80,
-        'image_path': 'products/gluestick.png',
-        'weight': 40.00,
-        'dimensions': '10cm L x 3cm diameter'
-    },
-    {
-        'name': 'Oil Pastel Set (36 Colors)',
-        'description': 'Creamy texture for vibrant artwork.',
-        'price': 180.00,
-        'category': 'art_materials',
-        'stock_quantity': 20,
-        'image_path': 'products/oilpastelset.png',
-        'weight': 320.00,
-        'dimensions': '30cm x 18cm x 3cm (box)'
-    },
-    {
-        'name': 'Paintbrush Set (10 pcs)',
-        'description': 'Various brush sizes for detailed or broad strokes.',
-        'price': 120.00,
-        'category': 'art_materials',
-        'stock_quantity': 35,
-        'image_path': 'products/paintbrushset.png',
-        'weight': 95.00,
-        'dimensions': '30cm x 8cm x 2cm (box)'
-    },
-    {
-        'name': 'Palette Mixing Tray',
-        'description': 'Durable plastic tray for mixing paints easily.',
-        'price': 40.00,
-        'category': 'art_materials',
-        'stock_quantity': 50,
-        'image_path': 'products/palettetray.png',
-        'weight': 120.00,
-        'dimensions': '25cm x 18cm x 2cm'
-    },
-    {
-        'name': 'Sketch Pad (A4)',
-        'description': 'Thick paper ideal for pencil, ink, and charcoal sketches.',
-        'price': 90.00,
-        'category': 'art_materials',
-        'stock_quantity': 40,
-        'image_path': 'products/sketchpad.png',
-        'weight': 250.00,
-        'dimensions': '29.7cm x 21cm'
-    },
-    {
-        'name': 'Watercolor Paint Set (24 Colors)',
-        'description': 'High-quality pigments for smooth blending.',
-        'price': 220.00,
-        'category': 'art_materials',
-        'stock_quantity': 25,
-        'image_path': 'products/watercolorpaintset.png',
-        'weight': 280.00,
-        'dimensions': '22cm x 12cm x 3cm (box)'
-    },
-
-    # PAPERS
-    {
-        'name': 'Colored Paper Set (A4, 10 Colors)',
-        'description': 'Bright and assorted colors for crafts.',
-        'price': 70.00,
-        'category': 'papers',
-        'stock_quantity': 60,
-        'image_path': 'products/coloredpaperset.png',
-        'weight': 500.00,
-        'dimensions': '29.7cm x 21cm'
-    },
-    {
-        'name': 'Graph Paper (A4)',
-        'description': 'Ideal for mathematics and engineering drawings.',
-        'price': 30.00,
-        'category': 'papers',
-        'stock_quantity': 100,
-        'image_path': 'products/graphpaper.png',
-        'weight': 80.00,
-        'dimensions': '29.7cm x 21cm (100 sheets)'
-    },
-    {
-        'name': 'Long Bond Paper (500 Sheets)',
-        'description': 'Standard paper for printing and writing.',
-        'price': 180.00,
-        'category': 'papers',
-        'stock_quantity': 80,
-        'image_path': 'products/longbondpapers.png',
-        'weight': 2500.00,
-        'dimensions': '21.6cm x 33cm'
-    },
-    {
-        'name': 'Origami Paper (Double-Sided)',
-        'description': 'Colorful sheets for paper folding crafts.',
-        'price': 90.00,
-        'category': 'papers',
-        'stock_quantity': 45,
-        'image_path': 'products/origamipaper.png',
-        'weight': 150.00,
-        'dimensions': '15cm x 15cm (100 sheets)'
-    },
-    {
-        'name': 'Photo Paper (Glossy A4)',
-        'description': 'High-quality print paper for vivid images.',
-        'price': 150.00,
-        'category': 'papers',
-        'stock_quantity': 30,
-        'image_path': 'products/photopaper.png',
-        'weight': 300.00,
-        'dimensions': '29.7cm x 21cm (50 sheets)'
-    },
-    {
-        'name': 'Sticky Notes (Assorted Colors)',
-        'description': 'Repositionable notes for reminders.',
-        'price': 50.00,
-        'category': 'papers',
-        'stock_quantity': 90,
-        'image_path': 'products/stickynotes.png',
-        'weight': 80.00,
-        'dimensions': '7.6cm x 7.6cm (pack of 6)'
-    },
-]
-
-# Create the products
-created_count = 0
-skipped_count = 0
-updated_count = 0
-
-for item in products:
-    try:
-        
-        # Check if product already exists (by name)
-        existing_product = Product.objects.filter(name=item['name']).first()
-        
-        if existing_product:
-            print(f"⏭️  Product '{item['name']}' already exists")
-            skipped_count += 1
-            continue
-        
-        # Get image path from the data
-        image_path = item.pop('image_path', None)
-        
-        # Create product with the image path (relative to MEDIA_ROOT)
-        product = Product.objects.create(
-            name=item['name'],
-            description=item['description'],
-            price=Decimal(str(item['price'])),
-            category=item['category'],
-            stock_quantity=item['stock_quantity'],
-            weight=Decimal(str(item.get('weight', 0))) if item.get('weight') else None,
-            dimensions=item.get('dimensions', ''),
-            image=image_path if image_path else ''
-        )
-        
-        # Check if image file actually exists
-        if image_path:
-            full_image_path = MEDIA_ROOT / image_path
-            if full_image_path.exists():
-                print(f"✅ Created '{product.name}' with image")
-            else:
-                print(f"⚠️  Created '{product.name}' but image not found at: {full_image_path}")
-        else:
-            print(f"✅ Created '{product.name}' without image")
-        
-        created_count += 1
-            
-    except Exception as e:
-        print(f"❌ Error with '{item['name']}': {e}")
-
-print(f"\n🎉 Done! Created { created_count } new products, skipped { skipped_count } existing products.")
-print(f"\n📁 Make sure your product images are placed in: { IMAGES_FOLDER }")
@@ -48,7 +48,11 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'shop.middleware.ProfilingMiddleware',
+    'shop.middleware.QueryBudgetMiddleware',
+    'shop.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'shop.middleware.CartCookieMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -71,6 +75,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'shop.context_processors.cart_context',
+                'shop.context_processors.currency_context',
             ],
         },
     },
@@ -93,6 +98,42 @@ DATABASES = {
     }
 }
 
+# DB_ENGINE=sqlite runs against a local SQLite file instead (e.g. for the benchmark suite)
+if os.getenv("DB_ENGINE") == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.getenv("DB_NAME") or BASE_DIR / "db.sqlite3",
+        }
+    }
+
+# Read replicas
+# DB_REPLICAS is a comma-separated list of MySQL hosts (or SQLite files with DB_ENGINE=sqlite)
+# replicating the default database. shop.routers.ReplicaRouter sends catalog and admin analytics
+# reads to them; visitors who just wrote stay on the primary for SHOP_REPLICA_STICKY_SECONDS.
+
+SHOP_READ_REPLICAS = []
+for number, replica in enumerate(filter(None, os.getenv("DB_REPLICAS", "").split(",")), start=1):
+    location = "NAME" if DATABASES["default"]["ENGINE"].endswith("sqlite3") else "HOST"
+    DATABASES[f"replica{number}"] = {**DATABASES["default"], location: replica.strip(), "TEST": {"MIRROR": "default"}}
+    SHOP_READ_REPLICAS.append(f"replica{number}")
+
+DATABASE_ROUTERS = ["shop.routers.ReplicaRouter"]
+SHOP_REPLICA_STICKY_SECONDS = int(os.getenv("SHOP_REPLICA_STICKY_SECONDS", 10))
+
+
+# Cache
+# Catalog fragments are invalidated through a version counter stored in the
+# cache, so every worker must share one cache (e.g. Redis or Memcached) in
+# production. Local memory is only suitable for a single-process dev server.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'paper-trail'),
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -136,3 +177,114 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Catalog search
+# shop.search.InvertedIndexBackend (in-process BM25 index) or
+# shop.search.MySQLFullTextBackend (uses the FULLTEXT index from migration 0016)
+
+SHOP_SEARCH_BACKEND = os.getenv('SHOP_SEARCH_BACKEND', 'shop.search.InvertedIndexBackend')
+
+# Search results are cached per query until the catalog changes (or for this many seconds).
+# Best-match listings page through every match; other sort orders and the facet counts
+# cover the best SHOP_SEARCH_MAX_RESULTS
+
+SHOP_SEARCH_CACHE_TIMEOUT = 60 * 15
+SHOP_SEARCH_MAX_RESULTS = int(os.getenv('SHOP_SEARCH_MAX_RESULTS', 1000))
+
+
+# Shop grid
+# Number of product cards rendered per page / infinite-scroll fragment
+
+SHOP_PAGE_SIZE = int(os.getenv('SHOP_PAGE_SIZE', 24))
+
+
+# Homepage product rails cache lifetime in seconds (also bounds how late new arrivals roll off)
+
+SHOP_LANDING_CACHE_TIMEOUT = 60 * 15
+
+
+# Anonymous carts
+# Kept in a signed cookie (see shop.carts.CookieCart) until login or checkout; a cart with more
+# lines than SHOP_CART_COOKIE_MAX_LINES is stored in the database instead
+
+SHOP_CART_COOKIE_AGE = 60 * 60 * 24 * 30
+SHOP_CART_COOKIE_MAX_LINES = 50
+
+
+# Stock reservations
+# Seconds stock stays held for a cart once checkout starts (expired holds are swept by
+# manage.py release_expired_reservations)
+
+SHOP_STOCK_RESERVATION_TTL = int(os.getenv('SHOP_STOCK_RESERVATION_TTL', 60 * 10))
+
+
+# Query budgets
+# Maximum SQL queries per request by URL name, checked by shop.middleware.QueryBudgetMiddleware
+# (session and auth lookups included). Overruns and statements repeated
+# SHOP_N_PLUS_ONE_THRESHOLD times are logged, or raise when SHOP_QUERY_BUDGET_RAISE is on
+# (shop.testing.strict_query_budgets turns it on in tests).
+
+SHOP_QUERY_BUDGETS = {
+    'landing': 6,
+    'shop': 5,
+    'shop-products-api': 4,
+    'shop-products-fragment': 3,
+    'product-detail-api': 4,
+    'pdp': 8,
+    'cart': 8,
+    'cart-count-api': 2,
+    'add_to_cart': 20,
+    'checkout': 40,
+    'orders': 7,
+    'order_detail': 6,
+    'profile': 5,
+    'admin:sales-analytics': 8,
+    'admin:order-history': 8,
+    'admin:inventory-dashboard': 10,
+}
+SHOP_N_PLUS_ONE_THRESHOLD = 5
+SHOP_QUERY_BUDGET_RAISE = os.getenv('SHOP_QUERY_BUDGET_RAISE', '').lower() in ('1', 'true', 'yes')
+
+
+# Request profiling
+# Fraction of requests profiled by shop.middleware.ProfilingMiddleware (0 = only requests with a
+# signed X-Shop-Profile header, see manage.py profile_token). Profiles are kept in SHOP_PROFILE_DIR,
+# newest SHOP_PROFILE_KEEP only, and browsed by staff at /admin/profiles/.
+
+SHOP_PROFILE_SAMPLE_RATE = float(os.getenv('SHOP_PROFILE_SAMPLE_RATE', 0))
+SHOP_PROFILE_SAMPLE_INTERVAL = 0.005
+SHOP_PROFILE_DIR = Path(os.getenv('SHOP_PROFILE_DIR', BASE_DIR / 'profiles'))
+SHOP_PROFILE_KEEP = int(os.getenv('SHOP_PROFILE_KEEP', 200))
+SHOP_PROFILE_TOKEN_MAX_AGE = 60 * 60
+
+
+# Async API
+# Worker threads (each with its own database connection) that the async JSON views in
+# shop/api/catalog.py use to run independent reads at the same time
+
+SHOP_ASYNC_READ_THREADS = int(os.getenv('SHOP_ASYNC_READ_THREADS', 32))
+
+
+# Currencies
+# Exchange rates from PHP for UserProfile.preferred_currency, read from a local JSON file (see
+# shop/currency.py). Each process reloads the file when it changes, checking at most every
+# SHOP_CURRENCY_REFRESH_SECONDS.
+
+SHOP_CURRENCY_RATES_FILE = Path(os.getenv('SHOP_CURRENCY_RATES_FILE', BASE_DIR / 'shop' / 'data' / 'currency_rates.json'))
+SHOP_CURRENCY_REFRESH_SECONDS = int(os.getenv('SHOP_CURRENCY_REFRESH_SECONDS', 60))
+
+
+# Recommendations
+# "Customers also bought" neighbours stored per product by manage.py build_recommendations
+# (see shop/recommendations.py); the PDP shows the first four that are still active.
+
+SHOP_RECOMMENDATIONS_PER_PRODUCT = int(os.getenv('SHOP_RECOMMENDATIONS_PER_PRODUCT', 8))
+
+
+# Bestsellers
+# manage.py rank_bestsellers ranks products by units sold over the last SHOP_BESTSELLER_WINDOW_DAYS;
+# the top SHOP_BESTSELLER_COUNT are flagged is_bestseller. Schedule it (e.g. hourly) from cron.
+
+SHOP_BESTSELLER_WINDOW_DAYS = int(os.getenv('SHOP_BESTSELLER_WINDOW_DAYS', 30))
+SHOP_BESTSELLER_COUNT = int(os.getenv('SHOP_BESTSELLER_COUNT', 20))
@@ -1,12 +1,19 @@
+from django.conf import settings
 from django.contrib import admin
-from django.db.models import Sum, Count, Avg, F
+from django.db.models import Sum, Count, Avg, F, Max
+from django.db.models.functions import TruncMonth
 from django.urls import path
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import render
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.utils import timezone
 from django.utils.html import format_html
-from datetime import date, timedelta
-from .models import UserProfile, Product, Cart, CartItem, Order, OrderItem, Feedback, InventoryTransaction, Address
+from datetime import date, datetime, time, timedelta
+from . import profiling
+from .rollups import dashboard_start
+from .routers import replica_reads
+from .models import UserProfile, Product, Cart, CartItem, Order, OrderItem, Feedback, InventoryTransaction, Address, StockReservation, DailySalesRollup, DailyProductSalesRollup
 
 class UserProfileInline(admin.StackedInline):
     model = UserProfile
@@ -17,12 +24,14 @@ class UserAdmin(BaseUserAdmin):
 # P R O D U C T S
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ('name', 'slug', 'category', 'price', 'stock_quantity', 'is_featured', 'is_bestseller', 'stock_status_display', 'is_active', 'image_preview', 'created_at')
+    list_display = ('name', 'slug', 'category', 'price', 'stock_quantity', 'is_featured', 'is_bestseller', 'bestseller_rank', 'stock_status_display', 'is_active', 'image_preview', 'created_at')
     list_filter = ('category', 'is_active', 'is_featured', 'is_bestseller', 'created_at')
     search_fields = ('name', 'description', 'slug')
-    readonly_fields = ('slug', 'created_at', 'modified_at', 'image_preview', 'stock_status_display')
+    readonly_fields = ('slug', 'created_at', 'modified_at', 'image_preview', 'stock_status_display',
+                       'is_bestseller', 'sales_score', 'bestseller_rank')
     list_per_page = 25
-    list_editable = ('price', 'stock_quantity', 'is_active', 'is_featured', 'is_bestseller')
+    # Bestsellers are ranked from sales by manage.py rank_bestsellers, not picked by hand
+    list_editable = ('price', 'stock_quantity', 'is_active', 'is_featured')
     
     fieldsets = (
         ('Basic Information', {
@@ -32,8 +41,9 @@ class ProductAdmin(admin.ModelAdmin):
             'fields': ('stock_quantity', 'is_active', 'stock_status_display')
         }),
         ('Marketing & Display', {
-            'fields': ('is_featured', 'is_bestseller'),
-            'description': 'Control how this product appears on the homepage'
+            'fields': ('is_featured', 'is_bestseller', 'sales_score', 'bestseller_rank'),
+            'description': 'Control how this product appears on the homepage. Bestsellers are ranked from the '
+                           'last SHOP_BESTSELLER_WINDOW_DAYS of sales by manage.py rank_bestsellers.'
         }),
         ('Product Details', {
             'fields': ('weight', 'dimensions'),
@@ -55,7 +65,7 @@ class ProductAdmin(admin.ModelAdmin):
         if obj.image:
             return format_html(
                 '<img src="{}" width="100" height="100" style="object-fit: cover; border-radius: 4px;" />',
-                obj.image.url
+                obj.image_admin_thumbnail_url
             )
         return format_html('<div style="width:100px;height:100px;background:#f0f0f0;border-radius:4px;display:flex;align-items:center;justify-content:center;color:#666;">No image</div>')
     
@@ -82,30 +92,13 @@ class ProductAdmin(admin.ModelAdmin):
         ]
         return custom_urls + urls
     
+    @replica_reads()
     def sales_analytics_view(self, request):
-        # Calculate analytics
-        total_orders = Order.objects.count()
-        total_revenue = Order.objects.aggregate(total=Sum('total_amount'))['total'] or 0
-        completed_orders = Order.objects.filter(status='completed').count()
-        pending_orders = Order.objects.filter(status='pending').count()
-        cancelled_orders = Order.objects.filter(status='cancelled').count()
-        
-        # Top products
-        top_products = OrderItem.objects.values('product__name').annotate(
-            total_sold=Sum('quantity'),
-            revenue=Sum('price')
-        ).order_by('-total_sold')[:10]
-
-        # Bottom products (least sold)
-        bottom_products = OrderItem.objects.values('product__name').annotate(
-             total_sold=Sum('quantity'),
-             revenue=Sum('price')
-        ).order_by('total_sold')[:10]
-        
         # Monthly sales filter
         current_year = date.today().year
         selected_month = request.GET.get('month')
-        
+        start_date, end_date = dashboard_start(), None
+
         if selected_month:
             try:
                 year, month = map(int, selected_month.split('-'))
@@ -114,29 +107,50 @@ class ProductAdmin(admin.ModelAdmin):
                     end_date = date(year + 1, 1, 1) - timedelta(days=1)
                 else:
                     end_date = date(year, month + 1, 1) - timedelta(days=1)
-                
-                filtered_sales = Order.objects.filter(
-                    placed_at__date__range=(start_date, end_date)
-                ).aggregate(
-                    orders=Count('id'),
-                    revenue=Sum('total_amount')
-                )
-                monthly_sales = [{
-                    'month': start_date,
-                    'orders': filtered_sales['orders'] or 0,
-                    'revenue': filtered_sales['revenue'] or 0
-                }]
             except ValueError:
-                monthly_sales = []  # Invalid month, show nothing
+                selected_month = None  # Invalid month, fall back to the last 12 months
+                start_date = dashboard_start()
+
+        # Calculate analytics from the daily rollups (one row per day, not per order), over the period shown only
+        period = {'date__gte': start_date}
+        if end_date:
+            period['date__lte'] = end_date
+        sales = DailySalesRollup.objects.filter(**period)
+        totals = sales.aggregate(orders=Sum('orders'), revenue=Sum('revenue'))
+        total_orders = totals['orders'] or 0
+        total_revenue = totals['revenue'] or 0
+        orders_per_status = dict(
+            sales.values_list('status').annotate(count=Sum('orders')).order_by()
+        )
+        completed_orders = orders_per_status.get('completed', 0)
+        pending_orders = orders_per_status.get('pending', 0)
+        cancelled_orders = orders_per_status.get('cancelled', 0)
+        
+        # Top products
+        product_sales = DailyProductSalesRollup.objects.filter(**period).values('product_id').annotate(
+            product_name=Max('product_name'),
+            total_sold=Sum('units'),
+            revenue=Sum('revenue')
+        )
+        top_products = product_sales.order_by('-total_sold')[:10]
+
+        # Bottom products (least sold)
+        bottom_products = product_sales.order_by('total_sold')[:10]
+        
+        if end_date:
+            monthly_sales = [{
+                'month': start_date,
+                'orders': total_orders,
+                'revenue': total_revenue
+            }]
         else:
             # Default: last 12 months
-            from django.db.models.functions import TruncMonth
-            monthly_sales = Order.objects.filter(status='completed').annotate(
-                month=TruncMonth('placed_at')
+            monthly_sales = sales.filter(status='completed').annotate(
+                month=TruncMonth('date')
             ).values('month').annotate(
-                orders=Count('id'),
-                revenue=Sum('total_amount')
-            ).order_by('-month')[:12]
+                orders=Sum('orders'),
+                revenue=Sum('revenue')
+            ).order_by('-month')
         
         # Generate month options (January to December of current year)
         month_options = []
@@ -159,6 +173,8 @@ class ProductAdmin(admin.ModelAdmin):
             monthly_sales=monthly_sales,
             month_options=month_options,
             selected_month=selected_month,
+            start_date=start_date,
+            end_date=end_date,
         )
         return render(request, 'admin/sales_analytics.html', context)
 
@@ -177,12 +193,21 @@ class CartAdmin(admin.ModelAdmin):
 @admin.register(CartItem)
 class CartItemAdmin(admin.ModelAdmin):
     list_display = ('id', 'cart', 'product', 'quantity', 'price', 'created_at')
+    list_select_related = ('cart__user', 'product')
     search_fields = ('product__name',)
     readonly_fields = ('created_at', 'updated_at')
 
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'cart', 'product', 'quantity', 'created_at', 'expires_at')
+    list_select_related = ('cart__user', 'product')
+    search_fields = ('product__name',)
+    readonly_fields = ('created_at',)
+
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
     list_display = ('order', 'product', 'quantity', 'price', 'total_price')
+    list_select_related = ('order', 'product')
     list_filter = ('order__status', 'product')
     search_fields = ('order__id', 'product__name')
     readonly_fields = ('total_price',)
@@ -229,6 +254,7 @@ class FeedbackAdmin(admin.ModelAdmin):
 @admin.register(InventoryTransaction)
 class InventoryTransactionAdmin(admin.ModelAdmin):
     list_display = ('created_at', 'product', 'transaction_type', 'quantity_change_display', 'stock_before', 'stock_after', 'order_link', 'created_by')
+    list_select_related = ('product', 'order', 'created_by')
     list_filter = ('transaction_type', 'created_at', 'product__category')
     search_fields = ('product__name', 'order__id', 'notes', 'created_by__username')
     readonly_fields = ('created_at', 'stock_before', 'stock_after')
@@ -272,10 +298,11 @@ class InventoryTransactionAdmin(admin.ModelAdmin):
         ]
         return custom_urls + urls
     
+    @replica_reads()
     def inventory_dashboard(self, request):
         """Inventory Management Dashboard"""
         from django.db.models import Q
-        from datetime import datetime, timedelta
+        from datetime import timedelta
         
         # Low stock products (5 or less)
         low_stock_products = Product.objects.filter(
@@ -290,7 +317,7 @@ class InventoryTransactionAdmin(admin.ModelAdmin):
         ).count()
         
         # Recent transactions (last 30 days)
-        thirty_days_ago = datetime.now() - timedelta(days=30)
+        thirty_days_ago = timezone.now() - timedelta(days=30)
         recent_transactions = InventoryTransaction.objects.filter(
             created_at__gte=thirty_days_ago
         ).select_related('product', 'order', 'created_by').order_by('-created_at')[:50]
@@ -341,6 +368,7 @@ class InventoryTransactionAdmin(admin.ModelAdmin):
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ('id', 'full_name', 'email', 'total_amount', 'shipping_fee', 'status', 'placed_at', 'user')
+    list_select_related = ('user',)
     search_fields = ('full_name', 'email', 'address', 'user__username')
     list_filter = ('status', 'payment_method', 'placed_at')
     readonly_fields = ('placed_at', 'inventory_impact_display')
@@ -387,37 +415,36 @@ class OrderAdmin(admin.ModelAdmin):
         ]
         return custom_urls + urls
     
+    @replica_reads()
     def order_history_view(self, request):
         """Complete order history with analytics"""
-        from datetime import datetime, timedelta
-        
-        # All orders
-        all_orders = Order.objects.all().select_related('user').prefetch_related('items__product').order_by('-placed_at')
-        
-        # Order statistics
-        total_orders = all_orders.count()
-        total_revenue = all_orders.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
+        # Totals come from the daily rollups of the last 12 months, so their cost doesn't grow with every order placed
+        start_date = dashboard_start()
+        sales = DailySalesRollup.objects.filter(date__gte=start_date)
+        totals = sales.aggregate(orders=Sum('orders'), revenue=Sum('revenue'))
+        total_orders = totals['orders'] or 0
+        total_revenue = totals['revenue'] or 0
         
         # Orders by status
-        orders_by_status = all_orders.values('status').annotate(
-            count=Count('id'),
-            revenue=Sum('total_amount')
+        orders_by_status = sales.values('status').annotate(
+            count=Sum('orders'),
+            revenue=Sum('revenue')
         ).order_by('-count')
         
         # Recent orders (last 50)
-        recent_orders = all_orders[:50]
+        recent_orders = Order.objects.prefetch_related('items').order_by('-placed_at')[:50]
         
         # Monthly breakdown (last 12 months)
-        from django.db.models.functions import TruncMonth
-        monthly_orders = all_orders.annotate(
-            month=TruncMonth('placed_at')
+        monthly_orders = sales.annotate(
+            month=TruncMonth('date')
         ).values('month').annotate(
-            orders=Count('id'),
-            revenue=Sum('total_amount')
-        ).order_by('-month')[:12]
+            orders=Sum('orders'),
+            revenue=Sum('revenue')
+        ).order_by('-month')
         
-        # Top customers
-        top_customers = all_orders.filter(user__isnull=False).values(
+        # Top customers over the same 12 months (placed_at is indexed)
+        since = timezone.make_aware(datetime.combine(start_date, time.min))
+        top_customers = Order.objects.filter(user__isnull=False, placed_at__gte=since).values(
             'user__username', 'user__email'
         ).annotate(
             order_count=Count('id'),
@@ -432,6 +459,7 @@ class OrderAdmin(admin.ModelAdmin):
             orders_by_status=orders_by_status,
             monthly_orders=monthly_orders,
             top_customers=top_customers,
+            start_date=start_date,
             title="Order History & Analytics"
         )
         
@@ -463,5 +491,67 @@ class ProductAdmin(admin.ModelAdmin):
         
         return render(request, 'admin/product_inventory_history.html', context)
 
+# R E Q U E S T   P R O F I L E S
+# Not backed by a model, so these are plain staff-only views mounted at admin/profiles/
+def profile_list_view(request):
+    """Profiles saved by shop.middleware.ProfilingMiddleware, newest first"""
+    context = dict(
+        admin.site.each_context(request),
+        profiles=profiling.list_profiles(),
+        sample_rate=getattr(settings, 'SHOP_PROFILE_SAMPLE_RATE', 0),
+        header=profiling.PROFILE_HEADER,
+        title="Request Profiles",
+    )
+    return render(request, 'admin/profiles.html', context)
+
+
+def _get_profile(profile_id):
+    profile = profiling.load_profile(profile_id)
+    if profile is None:
+        raise Http404("Profile not found (it may have been rotated away)")
+    return profile
+
+
+def profile_detail_view(request, profile_id):
+    """Slowest functions, SQL timings and hottest stacks of one profile"""
+    profile = _get_profile(profile_id)
+    hot_stacks = sorted(profile['stacks'].items(), key=lambda item: item[1], reverse=True)[:15]
+    total_samples = sum(profile['stacks'].values()) or 1
+    context = dict(
+        admin.site.each_context(request),
+        profile=profile,
+        slowest_queries=sorted(profile['queries'], key=lambda query: query['ms'], reverse=True)[:25],
+        hot_stacks=[
+            {'leaf': stack.rsplit(';', 1)[-1], 'stack': stack, 'samples': samples, 'share': samples * 100 / total_samples}
+            for stack, samples in hot_stacks
+        ],
+        has_pstats=profiling.profile_path(profile_id, 'prof').exists(),
+        title=f"Profile {profile_id}",
+    )
+    return render(request, 'admin/profile_detail.html', context)
+
+
+def profile_stacks_view(request, profile_id):
+    """Collapsed stacks, for flamegraph.pl or https://www.speedscope.app"""
+    response = HttpResponse(profiling.collapsed_stacks(_get_profile(profile_id)), content_type='text/plain; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{profile_id}.folded"'
+    return response
+
+
+def profile_pstats_view(request, profile_id):
+    """Raw cProfile dump, for pstats or snakeviz"""
+    path = profiling.profile_path(profile_id, 'prof')
+    if path is None or not path.exists():
+        raise Http404("No cProfile data for this profile")
+    return FileResponse(path.open('rb'), as_attachment=True, filename=f'{profile_id}.prof')
+
+
+profile_urls = [
+    path('', admin.site.admin_view(profile_list_view), name='profile-list'),
+    path('<str:profile_id>/', admin.site.admin_view(profile_detail_view), name='profile-detail'),
+    path('<str:profile_id>/stacks.folded', admin.site.admin_view(profile_stacks_view), name='profile-stacks'),
+    path('<str:profile_id>/profile.prof', admin.site.admin_view(profile_pstats_view), name='profile-pstats'),
+]
+
 # LINK EXTENSION FOR CUSTOM ADMIN 
 admin.site.index_template = 'admin/custom_index.html'
\ No newline at end of file
@@ -0,0 +1,232 @@
+"""Async JSON endpoints for the catalog and the cart badge.
+
+These are the read-heavy endpoints the storefront polls, so under ASGI they
+wait on the database without holding a worker. Under WSGI Django runs them
+through ``async_to_sync`` and they behave like the old sync views.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Subquery
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_GET
+
+from ..cache import get_catalog_version, make_etag
+from ..carts import CART_ID_SESSION_KEY, aget_cart_badge_count
+from ..catalog import API_FIELDS, InvalidCursor, apaginate, columns_for, filter_products, page_size, serialize_rows
+from ..currency import aget_currency, get_rate_table, is_supported, localize
+from ..facets import get_facets
+from ..models import Product
+from ..reservations import held_subquery
+
+RELATED_FIELDS = ('id', 'name', 'price', 'image_url', 'url')
+RELATED_LIMIT = 4
+
+
+_read_pool = None
+
+
+def _get_read_pool():
+    global _read_pool
+    if _read_pool is None:
+        _read_pool = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'SHOP_ASYNC_READ_THREADS', 32), thread_name_prefix='shop-reads'
+        )
+    return _read_pool
+
+
+def _on_own_connection(function):
+    def run(*args):
+        try:
+            return function(*args)
+        finally:
+            # Pool threads outlive the request, so CONN_MAX_AGE is applied here rather than by request_finished
+            close_old_connections()
+    return run
+
+
+async def _request_currency(request):
+    """``?currency=`` if given, else the visitor's currency; ``None`` for an unsupported code"""
+    currency = request.GET.get('currency') or await aget_currency(request)
+    return currency if is_supported(currency) else None
+
+
+def _unknown_currency(request):
+    return JsonResponse({'error': f"Unknown currency: {request.GET.get('currency')}"}, status=400)
+
+
+async def _concurrently(*calls):
+    """Run independent blocking ORM calls at the same time and return their results in order.
+
+    The async ORM funnels every query through one thread per request, so
+    ``asyncio.gather`` over ``aget()``/``afirst()`` still runs them one after
+    another. Each call here runs on a ``SHOP_ASYNC_READ_THREADS`` pool thread
+    with its own database connection. Only for reads that don't need the
+    request's transaction.
+    """
+    pool = _get_read_pool()
+    return await asyncio.gather(*(
+        sync_to_async(_on_own_connection(function), thread_sensitive=False, executor=pool)(*args)
+        for function, *args in calls
+    ))
+
+
+async def _page_validators(products, cursor, limit, currency):
+    """ETag and Last-Modified of one page of ``products``, from its ids and modification times only"""
+    stamps, _ = await apaginate(
+        products.values(*columns_for(('id',), products.query.order_by), 'modified_at'), cursor, limit
+    )
+    version = await sync_to_async(get_catalog_version)()
+    last_modified = max((row['modified_at'] for row in stamps), default=None)
+    etag = make_etag(
+        version, currency, get_rate_table().version, last_modified, ','.join(str(row['id']) for row in stamps)
+    )
+    return etag, last_modified
+
+
+def _not_modified(request, etag, last_modified):
+    """``304 Not Modified`` if the client's copy is current, else ``None`` (like ``@condition``)"""
+    return get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp()) if last_modified else None
+    )
+
+
+def _set_validators(response, etag, last_modified):
+    response.headers.setdefault('ETag', etag)
+    if last_modified:
+        response.headers.setdefault('Last-Modified', http_date(last_modified.timestamp()))
+    return response
+
+
+@require_GET
+@cache_control(no_cache=True)
+async def products_api(request):
+    """API endpoint to get filtered products without page refresh
+
+    Results come in keyset pages of ``limit`` rows; pass the returned
+    ``next_cursor`` back as ``cursor`` for the next page. ``fields`` is a
+    comma-separated subset of ``catalog.API_FIELDS`` (all fields by default).
+    Prices are in ``currency`` (the visitor's by default). The first page
+    also carries ``facets``: product counts per category, price band and
+    stock status for the same search (see ``shop.facets``).
+
+    Responses carry an ETag and Last-Modified computed from the page's ids
+    and modification times alone, so a client revalidating an unchanged page
+    gets ``304 Not Modified`` without the rows being fetched or serialized.
+    """
+    requested_fields = request.GET.get('fields', '')
+    fields = [field for field in requested_fields.split(',') if field] or list(API_FIELDS)
+    unknown_fields = [field for field in fields if field not in API_FIELDS]
+    if unknown_fields:
+        return JsonResponse({
+            'error': f"Unknown fields: {', '.join(unknown_fields)}",
+            'allowed_fields': list(API_FIELDS),
+        }, status=400)
+
+    currency = await _request_currency(request)
+    if currency is None:
+        return _unknown_currency(request)
+
+    # Search backends are synchronous (and may rebuild their index), the rest is lazy
+    products, search_query, selected_categories, sort_by = await sync_to_async(filter_products)(request.GET)
+
+    cursor, limit = request.GET.get('cursor'), page_size(request.GET.get('limit'))
+    try:
+        etag, last_modified = await _page_validators(products, cursor, limit, currency)
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    not_modified = _not_modified(request, etag, last_modified)
+    if not_modified is not None:
+        return _set_validators(not_modified, etag, last_modified)
+
+    # Build rows from plain column values instead of model instances
+    rows = products.values(*columns_for(fields, products.query.order_by))
+    page, next_cursor = await apaginate(rows, cursor, limit)
+
+    if 'price' in fields:
+        # The cursor is already built, so the rows' prices can be replaced in place
+        localize(page, currency, target='price')
+    products_data = serialize_rows(page, fields)
+
+    data = {
+        'products': products_data,
+        'count': len(products_data),
+        'currency': currency,
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None,
+    }
+    if not cursor:
+        # The counts change with the catalog version, which is in the ETag
+        data['facets'] = await sync_to_async(get_facets)(request.GET, currency)
+    return _set_validators(JsonResponse(data), etag, last_modified)
+
+
+def _product_row(slug, cart_id):
+    # Stock held by other shoppers at checkout comes back with the product, in the same query
+    return (
+        Product.objects.filter(slug=slug)
+        .annotate(held=held_subquery(exclude_cart=cart_id))
+        .values(*columns_for(API_FIELDS), 'held')
+        .first()
+    )
+
+
+def _related_rows(slug):
+    # Same as recommendations.recommended_products, but by slug so it doesn't have to wait for the product
+    columns = columns_for(RELATED_FIELDS)
+    rows = list(
+        Product.objects.filter(recommended_for__product__slug=slug, is_active=True)
+        .order_by('recommended_for__rank')
+        .values(*columns)[:RELATED_LIMIT]
+    )
+    if len(rows) < RELATED_LIMIT:
+        category = Product.objects.filter(slug=slug).values('category')[:1]
+        rows += (
+            Product.objects.filter(category=Subquery(category), is_active=True)
+            .exclude(slug=slug)
+            .exclude(pk__in=[row['id'] for row in rows])
+            .values(*columns)[:RELATED_LIMIT - len(rows)]
+        )
+    return rows
+
+
+@require_GET
+async def product_detail_api(request, slug):
+    """Everything the product page shows, as JSON: the product, what's available to buy, and related products.
+
+    Prices are in ``currency`` (the visitor's by default).
+    """
+    currency = await _request_currency(request)
+    if currency is None:
+        return _unknown_currency(request)
+    cart_id = await request.session.aget(CART_ID_SESSION_KEY)
+    product, related = await _concurrently(
+        (_product_row, slug, cart_id),
+        (_related_rows, slug),
+    )
+    if product is None:
+        return JsonResponse({'error': 'Product not found'}, status=404)
+
+    localize([product, *related], currency, target='price')
+    available = max(0, product['stock_quantity'] - product['held'])
+    data = serialize_rows([product], API_FIELDS)[0]
+    data.update(
+        available_quantity=available,
+        stock_status=Product.describe_stock(available, product['is_active']),
+        currency=currency,
+        related_products=serialize_rows(related, RELATED_FIELDS),
+    )
+    return JsonResponse(data)
+
+
+@require_GET
+async def cart_count_api(request):
+    """API endpoint to get current cart count"""
+    # Return number of distinct items (CartItem rows), not the sum of quantities
+    return JsonResponse({'count': await aget_cart_badge_count(request)})
@@ -0,0 +1,6 @@
+"""Benchmark suite: seed data (``seed``), timed request scenarios (``scenarios``)
+and a WSGI vs ASGI concurrency load test (``load``).
+
+Run with ``manage.py seed_benchmark_data`` then ``manage.py run_benchmarks``
+or ``manage.py load_test_api``.
+"""
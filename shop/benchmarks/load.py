@@ -0,0 +1,162 @@
+"""In-process WSGI vs ASGI load test for the JSON endpoints.
+
+Both runs keep ``concurrency`` clients busy sending requests back to back,
+through Django's own WSGI and ASGI handlers so the full middleware stack
+runs. The WSGI run only lets ``workers`` requests in at once, like a
+threaded WSGI server; the ASGI run serves everything on one event loop.
+``db_latency`` adds a fixed delay to every query to stand in for a network
+round trip to MySQL, which is where async views pay off.
+"""
+import asyncio
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from wsgiref.util import setup_testing_defaults
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .scenarios import percentile
+
+HOST = 'testserver'
+
+
+@contextmanager
+def simulated_db_latency(seconds):
+    """Delay every query by ``seconds`` on every connection, in every thread, while active"""
+    if not seconds:
+        yield
+        return
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        if delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(delay)
+
+    connection_created.connect(install, weak=False)
+    for connection in connections.all():
+        install(None, connection)
+    try:
+        yield
+    finally:
+        connection_created.disconnect(install)
+        for connection in connections.all():
+            if delay in connection.execute_wrappers:
+                connection.execute_wrappers.remove(delay)
+
+
+def _summary(latencies, errors, elapsed):
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'seconds': round(elapsed, 2),
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else 0,
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def run_wsgi(urls, requests, concurrency, workers):
+    handler = WSGIHandler()
+    slots = threading.BoundedSemaphore(workers)
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+
+    def client(offset, count):
+        for number in range(count):
+            url = urlsplit(urls[(offset + number) % len(urls)])
+            environ = {'PATH_INFO': url.path, 'QUERY_STRING': url.query, 'HTTP_HOST': HOST, 'SERVER_NAME': HOST}
+            setup_testing_defaults(environ)
+            statuses = []
+            started = time.perf_counter()
+            # Waiting for a free worker counts towards latency, as it would behind a real server
+            with slots:
+                response = handler(environ, lambda status, headers, exc_info=None: statuses.append(status))
+                try:
+                    b''.join(response)
+                finally:
+                    response.close()
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if not statuses[0].startswith(('2', '3')):
+                    errors[0] += 1
+
+    threads = [
+        threading.Thread(target=client, args=(index, count))
+        for index, count in enumerate(_split(requests, concurrency))
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return _summary(latencies, errors[0], time.perf_counter() - started)
+
+
+def run_asgi(urls, requests, concurrency):
+    handler = ASGIHandler()
+    latencies, errors = [], [0]
+
+    async def request(url):
+        url = urlsplit(url)
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': url.path, 'raw_path': url.path.encode(), 'root_path': '',
+            'query_string': url.query.encode(), 'headers': [(b'host', HOST.encode())],
+            'client': ('127.0.0.1', 0), 'server': (HOST, 80),
+        }
+        disconnected = asyncio.Event()
+        sent_body = False
+        status = None
+
+        async def receive():
+            nonlocal sent_body
+            if not sent_body:
+                sent_body = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+
+        try:
+            await handler(scope, receive, send)
+        finally:
+            disconnected.set()
+        return status
+
+    async def client(offset, count):
+        for number in range(count):
+            started = time.perf_counter()
+            status = await request(urls[(offset + number) % len(urls)])
+            latencies.append(time.perf_counter() - started)
+            if not status or status >= 400:
+                errors[0] += 1
+
+    async def main():
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            client(index, count) for index, count in enumerate(_split(requests, concurrency))
+        ))
+        return time.perf_counter() - started
+
+    elapsed = asyncio.run(main())
+    return _summary(latencies, errors[0], elapsed)
+
+
+def _split(total, parts):
+    """Spread ``total`` requests over ``parts`` clients as evenly as possible"""
+    parts = max(1, min(parts, total))
+    return [total // parts + (1 if index < total % parts else 0) for index in range(parts)]
@@ -0,0 +1,148 @@
+"""Timed request scenarios run through Django's test client.
+
+Each scenario builds one request per iteration; ``run_scenario`` times it and
+counts its queries, then replays it once under ``tracemalloc`` for the peak
+memory figure (tracing slows Python down too much to run on timed requests).
+"""
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..carts import add_item
+from ..models import Cart, Product
+from .seed import ADMIN_USERNAME, SLUG_PREFIX, USERNAME_PREFIX, WORDS
+
+AJAX = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+
+class BenchmarkError(Exception):
+    """A scenario request failed, so its timings would be meaningless"""
+
+
+class Scenario:
+    """A named request recipe; ``build(context)`` returns ``(method, url, data, headers)``"""
+
+    def __init__(self, name, client, build, prepare=None):
+        self.name = name
+        self.client = client
+        self.build = build
+        self.prepare = prepare
+
+
+class BenchmarkContext:
+    """Clients and seeded rows shared by every scenario of a run"""
+
+    def __init__(self, random_seed=42):
+        self.rng = random.Random(random_seed)
+        products = Product.objects.filter(slug__startswith=SLUG_PREFIX, is_active=True)
+        self.slugs = list(products.values_list('slug', flat=True))
+        self.in_stock = list(products.filter(stock_quantity__gte=25))
+        if not self.slugs or not self.in_stock:
+            raise BenchmarkError("No benchmark data found; run `manage.py seed_benchmark_data` first")
+
+        customer = User.objects.filter(username__startswith=USERNAME_PREFIX, is_staff=False).order_by('pk').first()
+        admin = User.objects.get(username=ADMIN_USERNAME)
+        self.clients = {'anonymous': Client(), 'customer': Client(), 'admin': Client()}
+        self.clients['customer'].force_login(customer)
+        self.clients['admin'].force_login(admin)
+        self.customer = customer
+
+    def product(self):
+        return self.rng.choice(self.in_stock)
+
+
+def _prepare_checkout(context):
+    """Put one item in the customer's cart and start checkout, so the timed request places the order"""
+    client = context.clients['customer']
+    cart, created = Cart.objects.get_or_create(user=context.customer, is_active=True)
+    item = add_item(cart, context.product(), 1)
+    client.post(reverse('checkout'), {'selected_items': [item.pk]})
+
+
+SCENARIOS = [
+    Scenario('landing', 'anonymous', lambda context: ('get', reverse('landing'), {}, {})),
+    Scenario('shop', 'anonymous', lambda context: (
+        'get', reverse('shop'), {'sort_by': 'price-lowest-first', 'categories': 'pens'}, {}
+    )),
+    Scenario('shop_search', 'anonymous', lambda context: (
+        'get', reverse('shop'), {'search': context.rng.choice(WORDS)}, {}
+    )),
+    Scenario('shop_products_api', 'anonymous', lambda context: (
+        'get', reverse('shop-products-api'), {'sort_by': 'recently-added', 'limit': 24}, {}
+    )),
+    Scenario('pdp', 'anonymous', lambda context: (
+        'get', reverse('pdp', kwargs={'slug': context.rng.choice(context.slugs)}), {}, {}
+    )),
+    Scenario('add_to_cart', 'customer', lambda context: (
+        'post', reverse('add_to_cart'), {'product_id': context.product().pk, 'quantity': 1}, AJAX
+    )),
+    Scenario('checkout', 'customer', lambda context: (
+        'post', reverse('checkout'),
+        {'full_name': 'Bench Customer', 'email': 'customer@bench.example', 'address': '123 Benchmark Street',
+         'payment_method': 'COD'},
+        {},
+    ), prepare=_prepare_checkout),
+    Scenario('admin_sales_analytics', 'admin', lambda context: ('get', reverse('admin:sales-analytics'), {}, {})),
+    Scenario('admin_order_history', 'admin', lambda context: ('get', reverse('admin:order-history'), {}, {})),
+    Scenario('admin_inventory_dashboard', 'admin', lambda context: (
+        'get', reverse('admin:inventory-dashboard'), {}, {}
+    )),
+]
+
+
+def _send(context, scenario):
+    if scenario.prepare:
+        scenario.prepare(context)
+    method, url, data, headers = scenario.build(context)
+    client = context.clients[scenario.client]
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        response = getattr(client, method)(url, data, **headers)
+        elapsed = time.perf_counter() - started
+    if response.status_code >= 400:
+        raise BenchmarkError(f"{scenario.name}: {method.upper()} {url} returned {response.status_code}")
+    return elapsed * 1000, len(queries)
+
+
+def percentile(values, percent):
+    if len(values) < 2:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[percent - 1]
+
+
+def run_scenario(context, scenario, iterations=50, warmup=5):
+    """Time ``iterations`` requests of ``scenario``; returns a JSON-friendly summary"""
+    for _ in range(warmup):
+        _send(context, scenario)
+
+    timings = []
+    query_counts = []
+    for _ in range(iterations):
+        elapsed, queries = _send(context, scenario)
+        timings.append(elapsed)
+        query_counts.append(queries)
+
+    tracemalloc.start()
+    try:
+        _send(context, scenario)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'mean_ms': round(statistics.fmean(timings), 2),
+        'max_ms': round(max(timings), 2),
+        'queries_median': statistics.median(query_counts),
+        'queries_max': max(query_counts),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
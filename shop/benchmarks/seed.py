@@ -0,0 +1,196 @@
+"""Reproducible benchmark data.
+
+Everything generated here is recognisable (``bench-`` slugs, ``bench_``
+usernames, ``@bench.example`` emails) so it can be cleared without touching
+real data, and the same scale and seed always produce the same rows.
+"""
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from ..cache import bump_catalog_version
+from ..models import Cart, CartItem, InventoryTransaction, Order, OrderItem, Product
+from ..rollups import rebuild_rollups
+
+SCALES = {'1k': 1_000, '10k': 10_000, '100k': 100_000}
+
+SLUG_PREFIX = 'bench-'
+USERNAME_PREFIX = 'bench_'
+EMAIL_DOMAIN = 'bench.example'
+ADMIN_USERNAME = 'bench_admin'
+PASSWORD = 'bench-password'
+
+BATCH_SIZE = 2000
+
+ADJECTIVES = ['Classic', 'Premium', 'Eco', 'Recycled', 'Pocket', 'Spiral', 'Hardbound', 'Mini',
+              'Smooth', 'Retractable', 'Fine', 'Soft', 'Bold', 'Pastel', 'Matte', 'Glossy']
+NOUNS = {
+    'notebooks': ['Notebook', 'Journal', 'Planner', 'Sketchbook'],
+    'pens': ['Gel Pen', 'Ballpoint Pen', 'Fountain Pen', 'Marker'],
+    'pencils': ['Pencil', 'Mechanical Pencil', 'Colored Pencils'],
+    'art_materials': ['Watercolor Set', 'Brush Set', 'Acrylic Paint', 'Charcoal'],
+    'papers': ['Bond Paper', 'Cardstock', 'Sticky Notes', 'Tracing Paper'],
+    'other': ['Ruler', 'Scissors', 'Glue Stick', 'Folder'],
+}
+WORDS = ['ideal', 'for', 'school', 'office', 'art', 'drawing', 'writing', 'durable', 'cover',
+         'pages', 'grip', 'ink', 'colors', 'set', 'refillable', 'lightweight', 'travel']
+STATUSES = ['pending', 'out_for_delivery', 'delivered', 'delivered', 'delivered', 'returned', 'refunded']
+
+
+def volumes(products):
+    """How many rows of each kind a catalog of ``products`` comes with"""
+    return {
+        'products': products,
+        'users': max(20, products // 10),
+        'carts': max(20, products // 10),
+        'orders': max(50, products // 2),
+    }
+
+
+def clear(stdout=None):
+    """Delete everything a previous seed created"""
+    with transaction.atomic():
+        Order.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').delete()
+        Cart.objects.filter(user__username__startswith=USERNAME_PREFIX).delete()
+        Product.objects.filter(slug__startswith=SLUG_PREFIX).delete()
+        User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+    rebuild_rollups()
+
+
+def seed(products, random_seed=42, stdout=None):
+    """Create a catalog of ``products`` plus users, carts, orders and ledger rows"""
+    rng = random.Random(random_seed)
+    counts = volumes(products)
+    log = stdout.write if stdout else (lambda message: None)
+
+    clear()
+    with transaction.atomic():
+        log(f"Creating {counts['products']} products...")
+        product_rows = _products(rng, counts['products'])
+
+        log(f"Creating {counts['users']} users...")
+        users = _users(counts['users'])
+
+        log(f"Creating {counts['carts']} carts...")
+        _carts(rng, users[:counts['carts']], product_rows)
+
+        log(f"Creating {counts['orders']} orders with items and inventory transactions...")
+        _orders(rng, users, product_rows, counts['orders'])
+
+    rebuild_rollups()
+    bump_catalog_version()
+    return counts
+
+
+def _in_batches(model, objects):
+    if not connection.features.can_return_rows_from_bulk_insert:
+        # MySQL doesn't report ids from bulk inserts, so hand them out up front
+        start = (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+        for offset, obj in enumerate(objects):
+            obj.pk = start + offset
+    return model.objects.bulk_create(objects, batch_size=BATCH_SIZE)
+
+
+def _spread(model, objects, field, rng, days):
+    """Back-date ``auto_now_add`` columns, which bulk_create always sets to now"""
+    now = timezone.now()
+    for obj in objects:
+        setattr(obj, field, now - timedelta(days=rng.random() * days))
+    model.objects.bulk_update(objects, [field], batch_size=BATCH_SIZE)
+
+
+def _products(rng, count):
+    categories = list(NOUNS)
+    products = []
+    for index in range(count):
+        category = categories[index % len(categories)]
+        name = f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS[category])} {index}"
+        products.append(Product(
+            name=name,
+            slug=f"{SLUG_PREFIX}{index}",
+            description=' '.join(rng.choice(WORDS) for _ in range(20)),
+            price=Decimal(rng.randint(1000, 50000)) / 100,
+            category=category,
+            stock_quantity=rng.choice([0, 3, 8, 25, 50, 100, 500]),
+            is_active=rng.random() > 0.05,
+            is_featured=rng.random() < 0.01,
+            is_bestseller=rng.random() < 0.01,
+        ))
+    products = _in_batches(Product, products)
+    _spread(Product, products, 'created_at', rng, days=365)
+    return [product for product in products if product.is_active]
+
+
+def _users(count):
+    # Hashing is deliberately slow, so every user shares one hash
+    password = make_password(PASSWORD)
+    users = [
+        User(username=f"{USERNAME_PREFIX}{index}", email=f"user{index}@{EMAIL_DOMAIN}", password=password)
+        for index in range(count)
+    ]
+    users.append(User(
+        username=ADMIN_USERNAME, email=f"admin@{EMAIL_DOMAIN}", password=password,
+        is_staff=True, is_superuser=True,
+    ))
+    _in_batches(User, users)
+    return list(User.objects.filter(username__startswith=USERNAME_PREFIX, is_staff=False).order_by('pk'))
+
+
+def _carts(rng, users, products):
+    carts = _in_batches(Cart, [Cart(user=user) for user in users])
+    items = []
+    for cart in carts:
+        for product in rng.sample(products, rng.randint(1, 4)):
+            quantity = rng.randint(1, 3)
+            items.append(CartItem(cart=cart, product=product, quantity=quantity, price=product.price))
+            cart.item_count += quantity
+            cart.line_count += 1
+            cart.subtotal += product.price * quantity
+    _in_batches(CartItem, items)
+    Cart.objects.bulk_update(carts, ['item_count', 'line_count', 'subtotal'], batch_size=BATCH_SIZE)
+
+
+def _orders(rng, users, products, count):
+    orders = []
+    lines = []
+    for index in range(count):
+        user = rng.choice(users) if rng.random() < 0.8 else None
+        picked = [(product, rng.randint(1, 3)) for product in rng.sample(products, rng.randint(1, 3))]
+        subtotal = sum(product.price * quantity for product, quantity in picked)
+        shipping_fee = Decimal('50.00') if subtotal < 200 else Decimal('70.00')
+        orders.append(Order(
+            user=user,
+            full_name=user.username if user else f"Guest {index}",
+            email=user.email if user else f"guest{index}@{EMAIL_DOMAIN}",
+            address="123 Benchmark Street",
+            total_amount=subtotal + shipping_fee,
+            shipping_fee=shipping_fee,
+            status=rng.choice(STATUSES),
+        ))
+        lines.append(picked)
+
+    orders = _in_batches(Order, orders)
+    _spread(Order, orders, 'placed_at', rng, days=730)
+
+    order_items = []
+    ledger = []
+    for order, picked in zip(orders, lines):
+        for product, quantity in picked:
+            order_items.append(OrderItem(
+                order=order, product=product, quantity=quantity,
+                price=product.price, total_price=product.price * quantity,
+            ))
+            ledger.append(InventoryTransaction(
+                product=product, order=order, transaction_type='sale', quantity_change=-quantity,
+                stock_before=product.stock_quantity + quantity, stock_after=product.stock_quantity,
+                notes=f"Order #{order.pk} - {order.full_name}",
+            ))
+    _in_batches(OrderItem, order_items)
+    ledger = _in_batches(InventoryTransaction, ledger)
+    _spread(InventoryTransaction, ledger, 'created_at', rng, days=60)
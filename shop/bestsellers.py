@@ -0,0 +1,62 @@
+"""Bestseller ranking.
+
+``rank_bestsellers`` sums the units each product sold over the last
+``SHOP_BESTSELLER_WINDOW_DAYS`` in one grouped query and stores the result
+on the product: ``sales_score`` (the units), ``bestseller_rank`` and
+``is_bestseller`` for the top ``SHOP_BESTSELLER_COUNT``. The landing page
+rail and the shop's ``bestselling`` sort then read the
+``product_active_sales_idx`` index instead of aggregating orders per request.
+Run it on a schedule with ``manage.py rank_bestsellers``.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from .cache import bump_catalog_version
+from .models import OrderItem, Product
+
+# Returned and refunded orders didn't end up selling anything
+EXCLUDED_STATUSES = ('returned', 'refunded')
+
+RANKED_FIELDS = ('sales_score', 'bestseller_rank', 'is_bestseller')
+
+
+def window_days():
+    return getattr(settings, 'SHOP_BESTSELLER_WINDOW_DAYS', 30)
+
+
+def units_sold(since):
+    """``(product_id, units)`` sold since ``since``, best selling first (ties by id, like the shop sort)"""
+    return list(
+        OrderItem.objects.filter(product__isnull=False, order__placed_at__gte=since)
+        .exclude(order__status__in=EXCLUDED_STATUSES)
+        .values_list('product')
+        .annotate(units=Sum('quantity'))
+        .filter(units__gt=0)
+        .order_by('-units', 'product')
+    )
+
+
+def rank_bestsellers(days=None, top=None, now=None):
+    """Recompute every product's sales score and rank; returns the ranked ``(product_id, units)``"""
+    days = window_days() if days is None else days
+    top = getattr(settings, 'SHOP_BESTSELLER_COUNT', 20) if top is None else top
+    since = (now or timezone.now()) - timedelta(days=days)
+    ranked = units_sold(since)
+
+    products = [
+        Product(pk=product_id, sales_score=units, bestseller_rank=rank, is_bestseller=rank <= top)
+        for rank, (product_id, units) in enumerate(ranked, start=1)
+    ]
+    # Swap the whole ranking at once so the rail and the sort never see it half written
+    with transaction.atomic():
+        Product.objects.filter(
+            Q(sales_score__gt=0) | Q(bestseller_rank__isnull=False) | Q(is_bestseller=True)
+        ).update(sales_score=0, bestseller_rank=None, is_bestseller=False)
+        Product.objects.bulk_update(products, RANKED_FIELDS, batch_size=500)
+        # update() and bulk_update() send no signals, so invalidate the cached rails here
+        transaction.on_commit(bump_catalog_version)
+    return ranked
@@ -0,0 +1,74 @@
+"""Versioned caching for catalog-derived content.
+
+Anything rendered from the product catalog is cached under a key that
+includes the catalog version. Saving or deleting a ``Product`` bumps the
+version (see ``shop.signals``), so stale entries are simply never read
+again and expire on their own; nothing has to be deleted explicitly.
+
+The same version, together with the products' ``modified_at``, makes up
+the validators (ETag / Last-Modified) of catalog responses, so unchanged
+pages and API results can be answered with ``304 Not Modified``.
+"""
+import hashlib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+CATALOG_VERSION_KEY = 'shop:catalog-version'
+
+
+def get_catalog_version():
+    """Current catalog version, initialised on first use"""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Start from the clock so a restarted or evicted counter never reuses an old version
+        cache.add(CATALOG_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """Invalidate everything cached against the current catalog version"""
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        # Key missing (first write or evicted): any fresh clock value is newer than the old one
+        cache.set(CATALOG_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        return cache.get(CATALOG_VERSION_KEY)
+
+
+def get_landing_rails():
+    """Featured, bestseller and new-arrival product lists for the homepage"""
+    key = f'shop:landing-rails:{get_catalog_version()}'
+    rails = cache.get(key)
+    if rails is None:
+        rails = _build_landing_rails()
+        cache.set(key, rails, settings.SHOP_LANDING_CACHE_TIMEOUT)
+    return rails
+
+
+def _build_landing_rails():
+    from .catalog import SORT_ORDERS
+    from .models import Product
+
+    active = Product.objects.filter(is_active=True)
+    thirty_days_ago = timezone.now() - timedelta(days=30)
+    return {
+        # Get featured products (limit to 8)
+        'featured_products': list(active.filter(is_featured=True)[:8]),
+        # Get bestsellers (limit to 8), as ranked by manage.py rank_bestsellers
+        'bestsellers': list(active.filter(sales_score__gt=0).order_by(*SORT_ORDERS['bestselling'])[:8]),
+        # Get new arrivals (products from last 30 days, limit to 8)
+        'new_arrivals': list(active.filter(created_at__gte=thirty_days_ago).order_by('-created_at')[:8]),
+    }
+
+
+# C O N D I T I O N A L   G E T
+
+def make_etag(*parts, weak=False):
+    """Quoted ETag hashing ``parts``; weak for pages that aren't byte-for-byte identical (e.g. CSRF tokens)"""
+    digest = hashlib.md5(':'.join(str(part) for part in parts).encode(), usedforsecurity=False).hexdigest()
+    return f'W/"{digest}"' if weak else f'"{digest}"'
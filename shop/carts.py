@@ -0,0 +1,551 @@
+"""Cart helpers shared by the views, the context processor and signal handlers.
+
+Signed-in users always have a ``Cart`` row. An anonymous visitor's cart
+lives in a signed cookie (``CookieCart``) and only becomes a ``Cart`` row,
+with a session to find it by, at login, at checkout, or once it outgrows
+``SHOP_CART_COOKIE_MAX_LINES``. Browsing and filling a cart writes nothing.
+"""
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Cart, CartItem, Product
+
+# Session key holding the header badge count (number of distinct items in the cart)
+CART_COUNT_SESSION_KEY = 'cart_item_count'
+
+# Session key holding the id of the active cart, so lookups are a single primary-key hit
+CART_ID_SESSION_KEY = 'cart_id'
+
+# Denormalised Cart columns maintained by the helpers below
+TOTAL_FIELDS = ('item_count', 'line_count', 'subtotal')
+
+# Signed cookie holding an anonymous cart as ``product_id:quantity`` pairs
+CART_COOKIE = 'shop_cart'
+_CART_COOKIE_SALT = 'shop.carts'
+
+
+class CookieCartItem:
+    """A line of a ``CookieCart``, shaped like ``CartItem`` for the templates.
+
+    Its ``id`` is the product id, which is what the cart's update and remove
+    URLs carry for a cookie cart.
+    """
+
+    def __init__(self, cart, product, quantity):
+        self.cart = cart
+        self.product = product
+        self.product_id = self.id = self.pk = product.pk
+        self.quantity = quantity
+        self.price = product.price
+
+    def total_price(self):
+        return self.price * self.quantity
+
+
+class CookieCart:
+    """An anonymous visitor's cart, kept client side until it has to be stored.
+
+    Holds ``{product_id: quantity}`` only; prices come from the catalog when
+    the items are shown. ``CartCookieMiddleware`` writes it back to the
+    cookie when it changed.
+    """
+
+    pk = id = None
+    user = None
+
+    def __init__(self, lines=None):
+        self.lines = dict(lines or {})
+        self.modified = False
+        self._items = None
+
+    @classmethod
+    def decode(cls, value):
+        lines = {}
+        for pair in filter(None, (value or '').split(',')):
+            try:
+                product_id, quantity = (int(part) for part in pair.split(':'))
+            except ValueError:
+                continue
+            if product_id > 0 and quantity > 0:
+                lines[product_id] = quantity
+        return cls(lines)
+
+    def encode(self):
+        return ','.join(f'{product_id}:{quantity}' for product_id, quantity in self.lines.items())
+
+    @property
+    def line_count(self):
+        return len(self.lines)
+
+    @property
+    def item_count(self):
+        return sum(self.lines.values())
+
+    def is_full(self, product_id):
+        """Whether adding ``product_id`` would make the cookie hold too many lines"""
+        return product_id not in self.lines and len(self.lines) >= settings.SHOP_CART_COOKIE_MAX_LINES
+
+    def items(self):
+        """Lines with their products, loaded in one query; products that are gone are dropped"""
+        if self._items is None:
+            products = Product.objects.in_bulk(list(self.lines))
+            if len(products) < len(self.lines):
+                self.lines = {pk: quantity for pk, quantity in self.lines.items() if pk in products}
+                self.modified = True
+            self._items = [CookieCartItem(self, products[pk], quantity) for pk, quantity in self.lines.items()]
+        return self._items
+
+    def total_price(self):
+        return sum((item.total_price() for item in self.items()), Decimal('0.00'))
+
+    def set_quantity(self, product_id, quantity):
+        if quantity > 0:
+            self.lines[product_id] = quantity
+        else:
+            self.lines.pop(product_id, None)
+        self.modified = True
+        self._items = None
+
+    def clear(self):
+        self.lines = {}
+        self.modified = True
+        self._items = None
+
+
+def cookie_cart(request):
+    """The anonymous cart carried by this request's cookie (loaded once per request)"""
+    if not hasattr(request, '_cookie_cart'):
+        value = request.get_signed_cookie(
+            CART_COOKIE, default='', salt=_CART_COOKIE_SALT, max_age=settings.SHOP_CART_COOKIE_AGE
+        )
+        request._cookie_cart = CookieCart.decode(value)
+    return request._cookie_cart
+
+
+def has_cookie_cart(request):
+    return hasattr(request, '_cookie_cart') or bool(request.COOKIES.get(CART_COOKIE))
+
+
+def save_cookie_cart(request, response):
+    """Write the cookie cart back to the browser if this request changed it"""
+    cart = getattr(request, '_cookie_cart', None)
+    if cart is None or not cart.modified:
+        return
+    if cart.lines:
+        response.set_signed_cookie(
+            CART_COOKIE, cart.encode(), salt=_CART_COOKIE_SALT,
+            max_age=settings.SHOP_CART_COOKIE_AGE, httponly=True, samesite='Lax',
+        )
+    else:
+        response.delete_cookie(CART_COOKIE, samesite='Lax')
+
+
+def _cached_cart(request):
+    """The cart remembered in the session, if it still belongs to this visitor"""
+    cart_id = request.session.get(CART_ID_SESSION_KEY)
+    if not cart_id:
+        return None
+    owner = request.user if request.user.is_authenticated else None
+    return Cart.objects.filter(pk=cart_id, user=owner, is_active=True).first()
+
+
+def find_active_cart(request):
+    """Return the current user's or session's active Cart without creating one"""
+    cart = _cached_cart(request)
+    if cart:
+        return cart
+    if request.user.is_authenticated:
+        return Cart.objects.filter(user=request.user, is_active=True).first()
+    session_key = request.session.session_key
+    if not session_key:
+        return None
+    return Cart.objects.filter(session_key=session_key, user=None, is_active=True).first()
+
+
+def current_cart(request):
+    """The visitor's cart for browsing: a ``Cart`` row, or a ``CookieCart`` for anonymous visitors"""
+    if request.user.is_authenticated:
+        return get_or_create_cart(request)
+    if not has_cookie_cart(request) and request.session.session_key:
+        # An anonymous cart already stored at checkout
+        cart = find_active_cart(request)
+        if cart:
+            return cart
+    return cookie_cart(request)
+
+
+def get_or_create_cart(request):
+    """Return an active ``Cart`` row for the current user or session.
+
+    For anonymous visitors this is where the cookie cart is stored (at
+    checkout, or when it gets too big for the cookie) and where their
+    session is first created. Anonymous carts are merged into the user's
+    cart once, at login (see ``merge_session_cart``), so this never has to
+    look for them here.
+    """
+    cart = _cached_cart(request)
+    if cart is None:
+        if request.user.is_authenticated:
+            cart, created = Cart.objects.get_or_create(
+                user=request.user, is_active=True, defaults={'session_key': request.session.session_key}
+            )
+        else:
+            if not request.session.session_key:
+                request.session.save()
+            cart, created = Cart.objects.get_or_create(
+                session_key=request.session.session_key, user=None, is_active=True
+            )
+        request.session[CART_ID_SESSION_KEY] = cart.pk
+
+    if not request.user.is_authenticated and has_cookie_cart(request) and cookie_cart(request).lines:
+        store_cookie_cart(cookie_cart(request), cart)
+        cart.refresh_from_db(fields=TOTAL_FIELDS)
+        refresh_cart_badge(request, cart)
+    return cart
+
+
+def store_cookie_cart(cookie, cart):
+    """Move the lines of a ``CookieCart`` into ``cart``, adding up products it already holds"""
+    if not cookie.lines:
+        return
+    with transaction.atomic():
+        products = Product.objects.in_bulk(list(cookie.lines))
+        now = timezone.now()
+        existing = list(cart.items.filter(product_id__in=products))
+        for item in existing:
+            item.quantity += cookie.lines[item.product_id]
+            item.updated_at = now
+        CartItem.objects.bulk_update(existing, ['quantity', 'updated_at'])
+
+        existing_ids = {item.product_id for item in existing}
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, product=product, quantity=cookie.lines[pk], price=product.price)
+            for pk, product in products.items()
+            if pk not in existing_ids
+        ])
+        recalculate_totals(Cart.objects.filter(pk=cart.pk))
+    cookie.clear()
+
+
+def merge_session_cart(request, user):
+    """Fold the visitor's anonymous cart into ``user``'s cart, once, at login.
+
+    Runs after Django has cycled the session key, so the anonymous cart is
+    found through the cart id kept in the session data. Items for products
+    already in the user's cart are added up with one bulk update; the rest
+    are moved over with a single UPDATE instead of being copied. A cookie
+    cart is folded in the same way and its cookie dropped.
+    """
+    anon_cart_id = request.session.get(CART_ID_SESSION_KEY)
+    anon_cart = None
+    if anon_cart_id:
+        anon_cart = Cart.objects.filter(pk=anon_cart_id, user=None, is_active=True).first()
+
+    cart, created = Cart.objects.get_or_create(
+        user=user, is_active=True, defaults={'session_key': request.session.session_key}
+    )
+
+    if anon_cart:
+        with transaction.atomic():
+            anon_items = dict(anon_cart.items.values_list('product_id', 'quantity'))
+            overlapping = list(cart.items.filter(product_id__in=anon_items))
+            now = timezone.now()
+            for item in overlapping:
+                item.quantity += anon_items[item.product_id]
+                item.updated_at = now
+            CartItem.objects.bulk_update(overlapping, ['quantity', 'updated_at'])
+
+            overlapping_ids = [item.product_id for item in overlapping]
+            anon_cart.items.exclude(product_id__in=overlapping_ids).update(cart=cart, updated_at=now)
+            anon_cart.items.all().delete()
+            Cart.objects.filter(pk=anon_cart.pk).update(
+                is_active=False, item_count=0, line_count=0, subtotal=0, updated_at=now
+            )
+            # Overlapping lines keep the user's price, so recount rather than add the two carts up
+            recalculate_totals(Cart.objects.filter(pk=cart.pk))
+
+    merged = anon_cart is not None
+    if has_cookie_cart(request) and cookie_cart(request).lines:
+        store_cookie_cart(cookie_cart(request), cart)
+        merged = True
+    if merged:
+        cart.refresh_from_db(fields=TOTAL_FIELDS)
+
+    request.session[CART_ID_SESSION_KEY] = cart.pk
+    # Storing the count now saves the first page after login from looking the cart up again
+    refresh_cart_badge(request, cart)
+    return cart
+
+
+def get_cart_badge_count(request):
+    """Number of distinct items in the cart, served from the session once known"""
+    if not request.user.is_authenticated and has_cookie_cart(request):
+        return cookie_cart(request).line_count
+
+    count = request.session.get(CART_COUNT_SESSION_KEY)
+    if count is not None:
+        return count
+
+    if not request.user.is_authenticated and not request.session.session_key:
+        # No session means no anonymous cart; don't create a session just to say 0
+        return 0
+
+    cart = find_active_cart(request)
+    count = cart.line_count if cart else 0
+    request.session[CART_COUNT_SESSION_KEY] = count
+    return count
+
+
+async def afind_active_cart(request, user):
+    """Async ``find_active_cart``; ``user`` is ``await request.auser()``"""
+    cart_id = await request.session.aget(CART_ID_SESSION_KEY)
+    if cart_id:
+        owner = user if user.is_authenticated else None
+        cart = await Cart.objects.filter(pk=cart_id, user=owner, is_active=True).afirst()
+        if cart:
+            return cart
+    if user.is_authenticated:
+        return await Cart.objects.filter(user=user, is_active=True).afirst()
+    session_key = request.session.session_key
+    if not session_key:
+        return None
+    return await Cart.objects.filter(session_key=session_key, user=None, is_active=True).afirst()
+
+
+async def aget_cart_badge_count(request):
+    """Async ``get_cart_badge_count`` for the async API views"""
+    user = await request.auser()
+    if not user.is_authenticated and has_cookie_cart(request):
+        return cookie_cart(request).line_count
+
+    count = await request.session.aget(CART_COUNT_SESSION_KEY)
+    if count is not None:
+        return count
+
+    if not user.is_authenticated and not request.session.session_key:
+        return 0
+
+    cart = await afind_active_cart(request, user)
+    count = cart.line_count if cart else 0
+    await request.session.aset(CART_COUNT_SESSION_KEY, count)
+    return count
+
+
+def refresh_cart_badge(request, cart):
+    """Store the badge count of a cart just changed by one of the helpers below"""
+    count = cart.line_count
+    if cart.pk:
+        # A cookie cart carries its own count, and mustn't create a session just for it
+        request.session[CART_COUNT_SESSION_KEY] = count
+    return count
+
+
+# Cart mutations. Each one changes the items and shifts the cart's stored
+# totals by the same amount in a single transaction, so reading a cart's
+# count or subtotal never has to touch its items. Cookie carts just change
+# their lines.
+
+def cart_items(cart, ids=None):
+    """Items of either kind of cart with their products, optionally only those with the given ids"""
+    if cart.pk is None:
+        items = cart.items()
+        if ids is not None:
+            wanted = {str(item_id) for item_id in ids}
+            items = [item for item in items if str(item.id) in wanted]
+        return items
+    items = cart.items.select_related('product')
+    return items.filter(id__in=ids) if ids is not None else items.all()
+
+
+def get_cart_item(cart, item_id):
+    if cart.pk is None:
+        return next((item for item in cart.items() if item.id == item_id), None)
+    return cart.items.filter(pk=item_id).first()
+
+
+def items_subtotal(cart, items):
+    """PHP subtotal of loaded ``items`` of ``cart``: its stored subtotal when they are all of its lines"""
+    if cart.pk is not None and len(items) == cart.line_count:
+        return cart.subtotal
+    return sum((item.price * item.quantity for item in items), Decimal('0.00'))
+
+
+def quantity_in_cart(cart, product):
+    if cart.pk is None:
+        return cart.lines.get(product.pk, 0)
+    return CartItem.objects.filter(cart=cart, product=product).values_list('quantity', flat=True).first() or 0
+
+
+def _adjust_totals(cart, quantity=0, lines=0, amount=0):
+    """Shift the stored totals of ``cart`` with one UPDATE and reload them"""
+    Cart.objects.filter(pk=cart.pk).update(
+        item_count=F('item_count') + quantity,
+        line_count=F('line_count') + lines,
+        subtotal=F('subtotal') + amount,
+        updated_at=timezone.now(),
+    )
+    cart.refresh_from_db(fields=TOTAL_FIELDS)
+
+
+def add_item(cart, product, quantity):
+    """Add ``quantity`` of ``product``, as a new line or on top of the existing one"""
+    if cart.pk is None:
+        cart.set_quantity(product.pk, cart.lines.get(product.pk, 0) + quantity)
+        return
+    with transaction.atomic():
+        item, created = CartItem.objects.get_or_create(
+            cart=cart,
+            product=product,
+            defaults={'quantity': quantity, 'price': product.price}
+        )
+        if not created:
+            CartItem.objects.filter(pk=item.pk).update(quantity=F('quantity') + quantity, updated_at=timezone.now())
+        _adjust_totals(cart, quantity, 1 if created else 0, item.price * quantity)
+    return item
+
+
+def set_item_quantity(cart, item, quantity):
+    """Change the quantity of a line; zero or less removes it"""
+    if quantity <= 0:
+        return remove_item(cart, item)
+    if cart.pk is None:
+        cart.set_quantity(item.product_id, quantity)
+        return
+    with transaction.atomic():
+        current = CartItem.objects.select_for_update().filter(pk=item.pk).values_list('quantity', flat=True).first()
+        if current is None:
+            return
+        CartItem.objects.filter(pk=item.pk).update(quantity=quantity, updated_at=timezone.now())
+        _adjust_totals(cart, quantity - current, 0, item.price * (quantity - current))
+
+
+def remove_item(cart, item):
+    if cart.pk is None:
+        cart.set_quantity(item.product_id, 0)
+        return
+    with transaction.atomic():
+        row = CartItem.objects.select_for_update().filter(pk=item.pk).values_list('quantity', 'price').first()
+        if row is None:
+            return
+        quantity, price = row
+        CartItem.objects.filter(pk=item.pk).delete()
+        _adjust_totals(cart, -quantity, -1, -quantity * price)
+
+
+def discard_items(items):
+    """Delete loaded cart ``items`` (e.g. just ordered) and take them off their carts' totals"""
+    with transaction.atomic():
+        CartItem.objects.filter(pk__in=[item.pk for item in items]).delete()
+        per_cart = {}
+        for item in items:
+            quantity, lines, amount = per_cart.get(item.cart_id, (0, 0, 0))
+            per_cart[item.cart_id] = (quantity + item.quantity, lines + 1, amount + item.price * item.quantity)
+        now = timezone.now()
+        for cart_id, (quantity, lines, amount) in per_cart.items():
+            Cart.objects.filter(pk=cart_id).update(
+                item_count=F('item_count') - quantity,
+                line_count=F('line_count') - lines,
+                subtotal=F('subtotal') - amount,
+                updated_at=now,
+            )
+
+
+def _computed_totals():
+    """Subquery expressions recomputing each total from the cart's items"""
+    items = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+    money = DecimalField(max_digits=12, decimal_places=2)
+    return {
+        'item_count': Coalesce(Subquery(items.annotate(total=Sum('quantity')).values('total')), 0),
+        'line_count': Coalesce(Subquery(items.annotate(total=Count('id')).values('total')), 0),
+        'subtotal': Coalesce(
+            Subquery(items.annotate(total=Sum(F('price') * F('quantity'), output_field=money)).values('total')),
+            Value(Decimal('0.00')),
+            output_field=money,
+        ),
+    }
+
+
+def drifted_carts(queryset=None):
+    """Carts whose stored totals disagree with their items"""
+    queryset = Cart.objects.all() if queryset is None else queryset
+    computed = {f'computed_{field}': expression for field, expression in _computed_totals().items()}
+    return queryset.annotate(**computed).filter(
+        ~Q(item_count=F('computed_item_count'))
+        | ~Q(line_count=F('computed_line_count'))
+        | ~Q(subtotal=F('computed_subtotal'))
+    )
+
+
+def recalculate_totals(queryset):
+    """Recompute the stored totals of every cart in ``queryset`` with one UPDATE"""
+    return queryset.update(**_computed_totals())
+
+
+def reprice_items(product_ids):
+    """Bring open cart lines of ``product_ids`` to the current product price and recount their carts.
+
+    A line's ``price`` is what the cart shows and what checkout charges, so
+    it has to follow the catalog. Returns the number of carts repriced.
+    """
+    with transaction.atomic():
+        stale = list(
+            CartItem.objects.filter(cart__is_active=True, product_id__in=product_ids)
+            .exclude(price=F('product__price'))
+            .values_list('pk', 'cart_id')
+        )
+        if not stale:
+            return 0
+        CartItem.objects.filter(pk__in=[pk for pk, cart_id in stale]).update(
+            price=Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('price')),
+        )
+        cart_ids = {cart_id for pk, cart_id in stale}
+        recalculate_totals(Cart.objects.filter(pk__in=cart_ids))
+    return len(cart_ids)
+
+
+# Garbage collection. Carts left inactive by a login merge and anonymous
+# carts nobody came back to pile up with their items, as do the sessions
+# that pointed at them. ``delete_in_chunks`` removes them a bounded
+# primary-key range at a time, so no single DELETE holds long locks.
+
+def stale_carts(inactive_before, anonymous_before):
+    """Inactive carts untouched since ``inactive_before`` and anonymous carts untouched since ``anonymous_before``"""
+    return Cart.objects.filter(
+        Q(is_active=False, updated_at__lt=inactive_before)
+        | Q(is_active=True, user__isnull=True, updated_at__lt=anonymous_before)
+    )
+
+
+def expired_sessions(now=None):
+    return Session.objects.filter(expire_date__lt=now or timezone.now())
+
+
+def delete_in_chunks(queryset, chunk_size=1000, pause=0):
+    """Delete ``queryset`` in primary-key ranges of at most ``chunk_size`` rows.
+
+    Yields ``{model label: rows}`` for each chunk, cascaded rows included.
+    Every range is deleted through ``queryset`` again, so a row that stopped
+    matching in the meantime (e.g. a cart that was just used) survives.
+    ``pause`` seconds between chunks leaves room for live traffic.
+    """
+    last_pk = None
+    while True:
+        chunk = queryset.order_by('pk')
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        keys = list(chunk.values_list('pk', flat=True)[:chunk_size])
+        if not keys:
+            return
+        last_pk = keys[-1]
+        with transaction.atomic():
+            deleted, per_model = queryset.filter(pk__gte=keys[0], pk__lte=last_pk).delete()
+        yield per_model
+        if pause:
+            time.sleep(pause)
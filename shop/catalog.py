@@ -0,0 +1,355 @@
+"""Product listing helpers shared by the shop page and the products API.
+
+Listings are paginated with keyset cursors: the cursor carries the sort
+values of the last row sent, so fetching the next page is an indexed range
+scan instead of an ``OFFSET`` that gets slower the deeper a client scrolls.
+"""
+import base64
+import hashlib
+import json
+import math
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import IntegerField, Q, Value
+from django.urls import reverse
+
+from .cache import get_catalog_version
+from .facets import facet_filter
+from .models import Product
+from .search import search_product_ids
+
+# sort_by value -> ordering; ``id`` is always last so every row has a unique position
+SORT_ORDERS = {
+    'a-to-z': ('name', 'id'),
+    'z-to-a': ('-name', '-id'),
+    'price-lowest-first': ('price', 'id'),
+    'price-highest-first': ('-price', '-id'),
+    'recently-added': ('-created_at', '-id'),
+    # sales_score is kept by manage.py rank_bestsellers (see shop.bestsellers)
+    'bestselling': ('-sales_score', 'id'),
+    # The search backend's order (see SearchRank); without a search it's DEFAULT_SORT
+    'relevance': ('search_rank', 'id'),
+}
+DEFAULT_SORT = 'a-to-z'
+RELEVANCE_SORT = 'relevance'
+
+# API field -> model columns needed to build it
+API_FIELDS = {
+    'id': ('id',),
+    'name': ('name',),
+    'description': ('description',),
+    'price': ('price',),
+    'image_url': ('image',),
+    'category': ('category',),
+    'category_display': ('category',),
+    'stock_quantity': ('stock_quantity',),
+    'stock_status': ('stock_quantity', 'is_active'),
+    'is_active': ('is_active',),
+    'is_in_stock': ('stock_quantity', 'is_active'),
+    'url': ('slug',),
+}
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+# Most ranked search ids a best-match page looks up in one query
+MAX_RANK_WINDOW = 2000
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+class SearchRank(Value):
+    """``search_rank`` annotation: a product's position in ``ids``, the search results best match first.
+
+    Ranking every match in SQL would need a ``CASE`` with a branch per match,
+    evaluated for every row, so the database only sees a placeholder.
+    A best-match listing isn't restricted to the matches either: ``paginate``
+    walks ``ids`` from the cursor on and asks the database which of the next
+    few are left by the other filters, so a page never sends more than a
+    slice of the matches to SQL, however broad the search.
+    """
+
+    def __init__(self, ids):
+        super().__init__(len(ids), output_field=IntegerField())
+        self.ids = ids
+        # (cursor, limit) -> {id: rank} of the rows found for that page, so the
+        # second pass over a page (API validators, then rows) skips the walk
+        self.pages = {}
+
+
+def search_results(search_query):
+    """Ids of every active product matching ``search_query``, best match first.
+
+    Text matches come in the search backend's order; a query that looks
+    like a number also matches prices starting with it, after the text
+    matches. Cached per query and catalog version, so the pages, facets and
+    validators of one search share a single backend lookup.
+    """
+    search_query = search_query.strip()
+    key = f"shop:search:{get_catalog_version()}:{hashlib.md5(search_query.encode(), usedforsecurity=False).hexdigest()}"
+    ids = cache.get(key)
+    if ids is None:
+        ids = search_product_ids(search_query)
+        if re.fullmatch(r'[\d.]+', search_query):
+            text_matches = set(ids)
+            # Convert price to string for partial matching
+            by_price = Product.objects.filter(is_active=True, price__startswith=search_query).order_by('id')
+            ids += [pk for pk in by_price.values_list('pk', flat=True) if pk not in text_matches]
+        cache.set(key, ids, settings.SHOP_SEARCH_CACHE_TIMEOUT)
+    return ids
+
+
+def search_products(search_query, ranked=False):
+    """Active products matching ``search_query`` - by indexed text, and also by price when it looks like a number.
+
+    Restricted to the best ``SHOP_SEARCH_MAX_RESULTS`` matches, so other
+    sort orders and facet counts never send more ids than that to SQL. With
+    ``ranked``, the products carry a ``SearchRank`` instead, and must be
+    paginated (see ``paginate``) to list every match best match first.
+    """
+    products = Product.objects.filter(is_active=True)
+    if search_query:
+        ids = search_results(search_query)
+        if ranked:
+            products = products.annotate(search_rank=SearchRank(ids))
+        else:
+            products = products.filter(pk__in=ids[:settings.SHOP_SEARCH_MAX_RESULTS])
+    return products
+
+
+def filter_products(params):
+    """Apply the shop's search, category, facet and sort parameters.
+
+    Returns ``(queryset, search_query, selected_categories, sort_by)``.
+    """
+    search_query = params.get('search', '')
+    sort_by = params.get('sort_by') or RELEVANCE_SORT
+    products = search_products(search_query, ranked=sort_by == RELEVANCE_SORT)
+
+    # Handle category filtering
+    selected_categories = params.getlist('categories')
+    if selected_categories:
+        products = products.filter(category__in=selected_categories)
+
+    # Handle price band and stock status facets
+    products = products.filter(facet_filter(params))
+
+    # Handle sorting; best match first when searching, unless another order was picked
+    if sort_by == RELEVANCE_SORT and not search_query:
+        products = products.order_by(*SORT_ORDERS[DEFAULT_SORT])
+    else:
+        products = products.order_by(*SORT_ORDERS.get(sort_by, SORT_ORDERS[DEFAULT_SORT]))
+
+    return products, search_query, selected_categories, sort_by
+
+
+def encode_cursor(values):
+    """Pack the sort values of a row into an opaque URL-safe token"""
+    raw = json.dumps([str(value) if not isinstance(value, int) else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, ordering):
+    """Unpack a cursor made by ``encode_cursor`` back into typed sort values"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw_values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(raw_values, list) or len(raw_values) != len(ordering):
+            raise InvalidCursor(cursor)
+        return [
+            _sort_field(field.lstrip('-')).to_python(value)
+            for field, value in zip(ordering, raw_values)
+        ]
+    except (ValueError, TypeError, ValidationError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def _sort_field(name):
+    if name == 'search_rank':
+        return IntegerField()
+    return Product._meta.get_field(name)
+
+
+def _after_cursor(ordering, values):
+    """Build the ``(a, b) > (x, y)`` keyset condition for the given ordering"""
+    condition = Q()
+    for position, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        step = Q(**{f'{name}__{lookup}': values[position]})
+        for previous_field, previous_value in zip(ordering[:position], values[:position]):
+            step &= Q(**{previous_field.lstrip('-'): previous_value})
+        condition |= step
+    return condition
+
+
+def _page_query(queryset, cursor, limit):
+    ordering = queryset.query.order_by
+    if cursor:
+        queryset = queryset.filter(_after_cursor(ordering, decode_cursor(cursor, ordering)))
+    return queryset[:limit + 1], ordering
+
+
+def _split_page(rows, ordering, limit):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([_sort_value(rows[-1], field.lstrip('-')) for field in ordering])
+    return rows, next_cursor
+
+
+def paginate(queryset, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Return one keyset page of ``queryset``.
+
+    ``queryset`` must be ordered by one of ``SORT_ORDERS``. Returns the
+    rows of the page and the cursor for the next one (``None`` on the last
+    page). Works with model instances as well as ``.values()`` dicts.
+    """
+    queryset, search_rank = _search_rank(queryset)
+    if search_rank is not None:
+        known = search_rank.pages.get((cursor, limit))
+        if known is not None:
+            return _ranked_page(search_rank, cursor, limit, list(queryset.filter(pk__in=list(known)).order_by()), known)
+        rows, ranks, start = [], {}, _rank_start(cursor)
+        while len(rows) <= limit:
+            window = _rank_window(search_rank, start, len(rows), len(ranks), limit)
+            if not window:
+                break
+            rows += queryset.filter(pk__in=list(window)).order_by()
+            ranks.update(window)
+            start += len(window)
+        return _ranked_page(search_rank, cursor, limit, rows, ranks)
+    page_query, ordering = _page_query(queryset, cursor, limit)
+    return _split_page(list(page_query), ordering, limit)
+
+
+async def apaginate(queryset, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Async ``paginate``, fetching the page with the async ORM"""
+    queryset, search_rank = _search_rank(queryset)
+    if search_rank is not None:
+        known = search_rank.pages.get((cursor, limit))
+        if known is not None:
+            rows = [row async for row in queryset.filter(pk__in=list(known)).order_by()]
+            return _ranked_page(search_rank, cursor, limit, rows, known)
+        rows, ranks, start = [], {}, _rank_start(cursor)
+        while len(rows) <= limit:
+            window = _rank_window(search_rank, start, len(rows), len(ranks), limit)
+            if not window:
+                break
+            rows += [row async for row in queryset.filter(pk__in=list(window)).order_by()]
+            ranks.update(window)
+            start += len(window)
+        return _ranked_page(search_rank, cursor, limit, rows, ranks)
+    page_query, ordering = _page_query(queryset, cursor, limit)
+    return _split_page([row async for row in page_query], ordering, limit)
+
+
+def _search_rank(queryset):
+    """``(queryset, SearchRank)`` for a best-match-first listing, else ``(queryset, None)``
+
+    A ranked search re-sorted by something else is restricted to its best
+    ``SHOP_SEARCH_MAX_RESULTS`` matches, like an unranked one.
+    """
+    annotation = queryset.query.annotations.get('search_rank')
+    if not isinstance(annotation, SearchRank):
+        return queryset, None
+    if tuple(queryset.query.order_by) != SORT_ORDERS[RELEVANCE_SORT]:
+        return queryset.filter(pk__in=annotation.ids[:settings.SHOP_SEARCH_MAX_RESULTS]), None
+    return queryset, annotation
+
+
+def _rank_start(cursor):
+    """Position in the ranked ids a best-match page starts at"""
+    if not cursor:
+        return 0
+    return max(0, decode_cursor(cursor, SORT_ORDERS[RELEVANCE_SORT])[0] + 1)
+
+
+def _rank_window(search_rank, start, found, scanned, limit):
+    """``{id: rank}`` for the next ranked ids to look up, from ``start`` (empty once they run out).
+
+    The first window is one page. When other filters left some matches out,
+    the next one is sized from the share they let through so far, so the
+    page usually fills on the second query.
+    """
+    needed = limit + 1 - found
+    if scanned:
+        size = min(max(math.ceil(2 * needed * scanned / max(found, 1)), needed), MAX_RANK_WINDOW)
+    else:
+        size = needed
+    return {pk: rank for rank, pk in enumerate(search_rank.ids[start:start + size], start)}
+
+
+def _ranked_page(search_rank, cursor, limit, rows, ranks):
+    rows = _in_rank_order(rows, ranks)[:limit + 1]
+    search_rank.pages[cursor, limit] = {_sort_value(row, 'id'): _sort_value(row, 'search_rank') for row in rows}
+    return _split_page(rows, SORT_ORDERS[RELEVANCE_SORT], limit)
+
+
+def _in_rank_order(rows, ranks):
+    for row in rows:
+        if isinstance(row, dict):
+            row['search_rank'] = ranks[row['id']]
+        else:
+            row.search_rank = ranks[row.pk]
+    return sorted(rows, key=lambda row: (_sort_value(row, 'search_rank'), _sort_value(row, 'id')))
+
+
+def _sort_value(row, field):
+    return row[field] if isinstance(row, dict) else getattr(row, field)
+
+
+def page_size(value, default=DEFAULT_PAGE_SIZE):
+    """Parse a ``limit`` query parameter, clamped to ``MAX_PAGE_SIZE``"""
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return default
+
+
+def pdp_url_builder():
+    """Return a function mapping a slug to its product page URL.
+
+    ``reverse()`` runs once here instead of once per row.
+    """
+    marker = 'slug-placeholder'
+    prefix, suffix = reverse('pdp', kwargs={'slug': marker}).split(marker)
+    return lambda slug: f'{prefix}{slug}{suffix}'
+
+
+def serialize_rows(rows, fields):
+    """Turn ``.values()`` rows into API dicts containing only ``fields``"""
+    category_names = dict(Product.CATEGORIES_CHOICES)
+    image_storage = Product._meta.get_field('image').storage
+    product_url = pdp_url_builder()
+
+    builders = {
+        'id': lambda row: row['id'],
+        'name': lambda row: row['name'],
+        'description': lambda row: row['description'],
+        'price': lambda row: str(row['price']),
+        'image_url': lambda row: image_storage.url(row['image']) if row['image'] else Product.PLACEHOLDER_IMAGE_URL,
+        'category': lambda row: row['category'],
+        'category_display': lambda row: category_names.get(row['category'], row['category']),
+        'stock_quantity': lambda row: row['stock_quantity'],
+        'stock_status': lambda row: Product.describe_stock(row['stock_quantity'], row['is_active']),
+        'is_active': lambda row: row['is_active'],
+        'is_in_stock': lambda row: row['stock_quantity'] > 0 and row['is_active'],
+        'url': lambda row: product_url(row['slug']),
+    }
+    selected = [(field, builders[field]) for field in fields]
+    return [{field: build(row) for field, build in selected} for row in rows]
+
+
+def columns_for(fields, ordering=()):
+    """Model columns needed to build ``fields`` and to resume after the last row"""
+    columns = {'id'}
+    for field in fields:
+        columns.update(API_FIELDS[field])
+    columns.update(field.lstrip('-') for field in ordering)
+    return sorted(columns)
@@ -0,0 +1,118 @@
+"""Order placement.
+
+Stock is decremented with conditional ``UPDATE ... WHERE stock_quantity >= n``
+statements inside the order transaction. The row lock taken by each UPDATE
+is held until commit, so two concurrent checkouts can never both take the
+last units of a product, no matter what they read beforehand.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cache import bump_catalog_version
+from .carts import discard_items
+from .models import InventoryTransaction, Order, OrderItem, Product, StockReservation
+from .rollups import add_order_items
+
+
+# Orders under this subtotal (PHP) ship for the lower fee
+SHIPPING_BAND_LIMIT = Decimal('200.00')
+
+
+class InsufficientStock(Exception):
+    """Raised when a product no longer has enough stock for an order line"""
+
+    def __init__(self, product, requested):
+        self.product = product
+        self.requested = requested
+        super().__init__(f"Insufficient stock for {product.name}")
+
+
+def shipping_fee_for(subtotal):
+    """Shipping fee of an order with this PHP subtotal"""
+    return Decimal('50.00') if subtotal < SHIPPING_BAND_LIMIT else Decimal('70.00')
+
+
+def place_order(items, *, user, full_name, email, address, payment_method, shipping_fee):
+    """Turn cart ``items`` (with ``product`` loaded) into an Order, at the lines' ``price``.
+
+    Decrements stock, writes order items and inventory ledger rows in bulk,
+    and removes the items from the cart, all in one transaction. Raises
+    ``InsufficientStock`` (rolling everything back) if any line can't be met.
+    """
+    # Lock rows in a fixed order so concurrent checkouts can't deadlock each other
+    items = sorted(items, key=lambda item: item.product_id)
+    subtotal = sum(item.price * item.quantity for item in items)
+    now = timezone.now()
+
+    with transaction.atomic():
+        for item in items:
+            updated = Product.objects.filter(
+                pk=item.product_id,
+                stock_quantity__gte=item.quantity,
+            ).update(stock_quantity=F('stock_quantity') - item.quantity, modified_at=now)
+            if not updated:
+                raise InsufficientStock(item.product, item.quantity)
+
+        # Rows are locked by the updates above, so these are exactly our post-sale levels
+        stock_after = dict(
+            Product.objects.filter(pk__in=[item.product_id for item in items]).values_list('id', 'stock_quantity')
+        )
+
+        order = Order.objects.create(
+            user=user,
+            full_name=full_name,
+            email=email,
+            address=address,
+            payment_method=payment_method,
+            total_amount=subtotal + shipping_fee,
+            shipping_fee=shipping_fee,
+            status='pending'
+        )
+
+        order_items = OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product=item.product,
+                quantity=item.quantity,
+                price=item.price,
+                total_price=item.price * item.quantity,
+            )
+            for item in items
+        ])
+        add_order_items(order, order_items)
+
+        InventoryTransaction.objects.bulk_create([
+            InventoryTransaction(
+                product_id=item.product_id,
+                order=order,
+                transaction_type='sale',
+                quantity_change=-item.quantity,
+                stock_before=stock_after[item.product_id] + item.quantity,
+                stock_after=stock_after[item.product_id],
+                notes=f"Order #{order.id} - {full_name}",
+                created_by=user,
+            )
+            for item in items
+        ])
+
+        # Clear the cart (only the ordered items) and the holds taken when checkout started
+        discard_items(items)
+        StockReservation.objects.filter(
+            cart_id__in={item.cart_id for item in items},
+            product_id__in=[item.product_id for item in items],
+        ).delete()
+
+        # Each product's modified_at already moved its own validators (PDP, products API pages).
+        # Cached listings (landing rails, facet counts) only show stock as a band, so they
+        # only need invalidating when a sale moves a product into another one.
+        if any(
+            Product.describe_stock(stock_after[item.product_id] + item.quantity, True)
+            != Product.describe_stock(stock_after[item.product_id], True)
+            for item in items
+        ):
+            transaction.on_commit(bump_catalog_version)
+
+    return order
@@ -1,29 +1,30 @@
-from .models import Cart
+from django.utils.functional import SimpleLazyObject
+from .carts import get_cart_badge_count
+from .currency import BASE_CURRENCY, get_currency
 
 def cart_context(request):
-    """Add cart information to all template contexts"""
-    cart_item_count = 0
-    
-    if hasattr(request, 'user'):
-        try:
-            session_key = request.session.session_key
-            if not session_key:
-                request.session.create()
-                session_key = request.session.session_key
+    """Add cart information to all template contexts
+
+    The count is lazy: templates that never show the cart badge cost no
+    queries, and the ones that do read it from the session once known.
+    """
+    if not hasattr(request, 'user') or not hasattr(request, 'session'):
+        return {'cart_item_count': 0}
 
-            if request.user.is_authenticated:
-                cart = Cart.objects.filter(user=request.user, is_active=True).first()
-            else:
-                cart = Cart.objects.filter(session_key=session_key, user=None, is_active=True).first()
-            
-            if cart:
-                # Count distinct items (number of CartItem rows) rather than summing quantities
-                # This makes the navbar reflect how many different products are in the cart
-                cart_item_count = cart.items.count()
-                
+    def cart_item_count():
+        try:
+            # Count distinct items (number of CartItem rows) rather than summing quantities
+            # This makes the navbar reflect how many different products are in the cart
+            return get_cart_badge_count(request)
         except Exception:
-            cart_item_count = 0
-    
+            return 0
+
     return {
-        'cart_item_count': cart_item_count
-    }
\ No newline at end of file
+        'cart_item_count': SimpleLazyObject(cart_item_count)
+    }
+
+def currency_context(request):
+    """Currency code printed next to prices (``display_price`` values are already converted to it)"""
+    if not hasattr(request, 'user') or not hasattr(request, 'session'):
+        return {'currency': BASE_CURRENCY}
+    return {'currency': SimpleLazyObject(lambda: get_currency(request))}
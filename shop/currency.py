@@ -0,0 +1,177 @@
+"""Showing prices in the visitor's ``UserProfile.preferred_currency``.
+
+Prices are stored in PHP. Exchange rates come from a local JSON table
+(``SHOP_CURRENCY_RATES_FILE``) that each process loads once and reloads
+only when the file changes, checking at most every
+``SHOP_CURRENCY_REFRESH_SECONDS``. Every table has a ``version``, which goes
+into the key of anything cached with converted prices in it.
+
+Conversion is done a list at a time: views hand whole product lists, cart
+lines or API rows to ``localize``/``convert_prices``, which look the rate up
+once and quantize every price in one pass, and templates only print the
+precomputed ``display_price``.
+"""
+import json
+import threading
+import time
+from decimal import ROUND_HALF_UP, Context, Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .models import UserProfile
+
+BASE_CURRENCY = 'PHP'
+
+# Session key caching the visitor's currency, so the profile is read once per session
+CURRENCY_SESSION_KEY = 'currency'
+
+CENT = Decimal('0.01')
+_ROUNDING = Context(rounding=ROUND_HALF_UP)
+
+
+class UnknownCurrency(ValueError):
+    """Raised for a currency the rate table has no rate for"""
+
+
+class RateTable:
+    """Exchange rates from ``BASE_CURRENCY``, as loaded from one version of the rates file"""
+
+    def __init__(self, version, rates, modified=None):
+        self.version = version
+        self.rates = rates
+        self.modified = modified  # mtime of the file it was read from
+
+    def rate(self, currency):
+        try:
+            return self.rates[currency]
+        except KeyError:
+            raise UnknownCurrency(currency) from None
+
+
+def rates_file():
+    return Path(getattr(settings, 'SHOP_CURRENCY_RATES_FILE', Path(__file__).parent / 'data' / 'currency_rates.json'))
+
+
+def load_rate_table(path):
+    """Read a rates file: ``{"version": ..., "base": "PHP", "rates": {"USD": "0.0172", ...}}``"""
+    modified = path.stat().st_mtime_ns
+    data = json.loads(path.read_text())
+    if data.get('base', BASE_CURRENCY) != BASE_CURRENCY:
+        raise ImproperlyConfigured(f"{path}: rates must be relative to {BASE_CURRENCY}")
+    # Strings keep the rates exact; floats would bring binary rounding into every price
+    rates = {code: Decimal(str(rate)) for code, rate in data['rates'].items()}
+    rates[BASE_CURRENCY] = Decimal(1)
+    return RateTable(str(data.get('version') or modified), rates, modified)
+
+
+_table = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_rate_table():
+    """The current rate table, reloaded when the rates file has changed"""
+    global _table, _checked_at
+    refresh = getattr(settings, 'SHOP_CURRENCY_REFRESH_SECONDS', 60)
+    if _table is not None and time.monotonic() - _checked_at < refresh:
+        return _table
+    with _lock:
+        if _table is None or time.monotonic() - _checked_at >= refresh:
+            path = rates_file()
+            if _table is None or path.stat().st_mtime_ns != _table.modified:
+                _table = load_rate_table(path)
+            _checked_at = time.monotonic()
+    return _table
+
+
+def is_supported(currency):
+    return currency in get_rate_table().rates
+
+
+def convert_prices(prices, currency, table=None):
+    """Convert PHP prices to ``currency``, rounded to the cent, with one rate lookup for the whole list"""
+    rate = (table or get_rate_table()).rate(currency)
+    if rate == 1:
+        return list(prices)
+    multiply, quantize = _ROUNDING.multiply, _ROUNDING.quantize
+    return [quantize(multiply(price, rate), CENT) for price in prices]
+
+
+def localize(objects, currency, source='price', target='display_price'):
+    """Set ``target`` on each object (or dict) to its ``source`` price in ``currency``; returns the list"""
+    objects = list(objects)
+    if not objects:
+        return objects
+    if isinstance(objects[0], dict):
+        for row, price in zip(objects, convert_prices([row[source] for row in objects], currency)):
+            row[target] = price
+    else:
+        for obj, price in zip(objects, convert_prices([getattr(obj, source) for obj in objects], currency)):
+            setattr(obj, target, price)
+    return objects
+
+
+def localize_cart(items, currency, shipping_fee=Decimal('0.00'), subtotal=None):
+    """Set ``display_price`` and ``display_total`` on cart lines and return the converted totals.
+
+    Lines are priced at their ``price``, which follows the product price and
+    is what checkout charges. ``subtotal`` is the PHP amount being charged
+    (the lines added up when not given); the summary shows it converted, so
+    it can't drift from the order by the rounding of each line.
+    """
+    items = list(items)
+    prices = [item.price for item in items]
+    line_totals = [price * item.quantity for price, item in zip(prices, items)]
+    if subtotal is None:
+        subtotal = sum(line_totals, Decimal('0.00'))
+    converted = convert_prices(prices + line_totals + [subtotal, shipping_fee], currency)
+    count = len(items)
+    for item, price, total in zip(items, converted[:count], converted[count:2 * count]):
+        item.display_price = price
+        item.display_total = total
+    subtotal, shipping_fee = converted[-2:]
+    return {'subtotal': subtotal, 'shipping_fee': shipping_fee, 'total': subtotal + shipping_fee}
+
+
+# V I S I T O R   C U R R E N C Y
+
+def get_currency(request):
+    """Currency to show prices in: the session's, else the signed-in user's preference.
+
+    Anonymous visitors get ``BASE_CURRENCY`` without a session being created.
+    """
+    if hasattr(request, '_currency'):
+        return request._currency
+    currency = request.session.get(CURRENCY_SESSION_KEY)
+    if currency is None:
+        currency = BASE_CURRENCY
+        if request.user.is_authenticated:
+            preferences = UserProfile.objects.filter(user=request.user).values_list('preferred_currency', flat=True)
+            currency = preferences.first() or BASE_CURRENCY
+            request.session[CURRENCY_SESSION_KEY] = currency
+    request._currency = currency if is_supported(currency) else BASE_CURRENCY
+    return request._currency
+
+
+async def aget_currency(request):
+    """Async ``get_currency`` for the async API views"""
+    if hasattr(request, '_currency'):
+        return request._currency
+    currency = await request.session.aget(CURRENCY_SESSION_KEY)
+    if currency is None:
+        currency = BASE_CURRENCY
+        user = await request.auser()
+        if user.is_authenticated:
+            preferences = UserProfile.objects.filter(user=user).values_list('preferred_currency', flat=True)
+            currency = await preferences.afirst() or BASE_CURRENCY
+            await request.session.aset(CURRENCY_SESSION_KEY, currency)
+    request._currency = currency if is_supported(currency) else BASE_CURRENCY
+    return request._currency
+
+
+def set_currency(request, currency):
+    """Remember a newly chosen currency for the rest of the session"""
+    request.session[CURRENCY_SESSION_KEY] = currency
+    request._currency = currency if is_supported(currency) else BASE_CURRENCY
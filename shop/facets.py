@@ -0,0 +1,159 @@
+"""Facet counts for the shop sidebar and the products API.
+
+Counts products per category, price band and stock status for the current
+search. Each facet is counted with the *other* facets' selections applied,
+so an option's count is how many products it matches among what the other
+filters let through, whether or not it's ticked itself. All three facets
+come from one grouped query over ``(category, price band, stock status)``,
+cached per search and catalog version (see ``shop.cache``), so paging or
+re-filtering a listing doesn't query for it again.
+"""
+import hashlib
+from collections import Counter
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, CharField, Count, Q, Value, When
+
+from .cache import get_catalog_version
+from .currency import BASE_CURRENCY, convert_prices
+from .models import Product
+
+# (value, lower bound, upper bound) in PHP; lower bound included, upper excluded
+PRICE_BANDS = [
+    ('under-100', None, Decimal('100')),
+    ('100-250', Decimal('100'), Decimal('250')),
+    ('250-500', Decimal('250'), Decimal('500')),
+    ('500-plus', Decimal('500'), None),
+]
+
+# Same thresholds as Product.describe_stock
+LOW_STOCK = 5
+STOCK_STATUSES = [
+    ('in-stock', 'In Stock', Q(stock_quantity__gt=LOW_STOCK)),
+    ('low-stock', 'Low Stock', Q(stock_quantity__gt=0, stock_quantity__lte=LOW_STOCK)),
+    ('out-of-stock', 'Out of Stock', Q(stock_quantity=0)),
+]
+
+FACETS = ('category', 'price', 'stock')
+
+
+def _price_q(low, high):
+    q = Q()
+    if low is not None:
+        q &= Q(price__gte=low)
+    if high is not None:
+        q &= Q(price__lt=high)
+    return q
+
+
+_PRICE_QS = {value: _price_q(low, high) for value, low, high in PRICE_BANDS}
+_STOCK_QS = {value: q for value, label, q in STOCK_STATUSES}
+
+
+def selected_facets(params):
+    """The options ticked in ``params``, per facet, ignoring unknown price and stock values"""
+    return {
+        'category': set(params.getlist('categories')),
+        'price': set(params.getlist('price')) & _PRICE_QS.keys(),
+        'stock': set(params.getlist('stock')) & _STOCK_QS.keys(),
+    }
+
+
+def facet_filter(params):
+    """``Q`` for the ticked price bands and stock statuses (options of one facet are OR-ed)"""
+    selected = selected_facets(params)
+    q = Q()
+    for values, qs in ((selected['price'], _PRICE_QS), (selected['stock'], _STOCK_QS)):
+        if values:
+            either = Q()
+            for value in values:
+                either |= qs[value]
+            q &= either
+    return q
+
+
+def grouped_counts(products):
+    """``(category, price band, stock status, count)`` rows for ``products``, in one grouped query"""
+    text = CharField()
+    return list(
+        products.order_by()
+        .annotate(
+            price_band=Case(*(When(q, then=Value(value)) for value, q in _PRICE_QS.items()), output_field=text),
+            stock_status=Case(*(When(q, then=Value(value)) for value, q in _STOCK_QS.items()), output_field=text),
+        )
+        .values_list('category', 'price_band', 'stock_status')
+        .annotate(count=Count('pk'))
+    )
+
+
+def facet_rows(search_query):
+    """Grouped counts of the active products matching ``search_query``, cached per search and catalog version.
+
+    A search reuses the cached ``catalog.search_results``, so its counts cover
+    the same best ``SHOP_SEARCH_MAX_RESULTS`` matches as the other sort orders.
+    """
+    from .catalog import search_products
+
+    search_query = search_query.strip()
+    key = f'shop:facets:{get_catalog_version()}'
+    if search_query:
+        key += f":{hashlib.md5(search_query.encode(), usedforsecurity=False).hexdigest()}"
+    rows = cache.get(key)
+    if rows is None:
+        rows = grouped_counts(search_products(search_query))
+        cache.set(key, rows, settings.SHOP_LANDING_CACHE_TIMEOUT)
+    return rows
+
+
+def get_facets(params, currency=BASE_CURRENCY):
+    """Sidebar facets for the shop ``params``: ``{facet: [{value, label, count, selected}, ...]}``.
+
+    Price band labels are in ``currency``.
+    """
+    selected = selected_facets(params)
+    rows = facet_rows(params.get('search', ''))
+    counts = {facet: Counter() for facet in FACETS}
+    for category, price_band, stock_status, count in rows:
+        row = {'category': category, 'price': price_band, 'stock': stock_status}
+        for facet in FACETS:
+            if all(not selected[other] or row[other] in selected[other] for other in FACETS if other != facet):
+                counts[facet][row[facet]] += count
+
+    # Categories with products in the search, plus any ticked one so it can be unticked
+    category_names = dict(Product.CATEGORIES_CHOICES)
+    categories = sorted(
+        {category for category, *rest in rows if category} | selected['category'],
+        key=lambda category: (category_names.get(category, category) or '').lower(),
+    )
+    return {
+        'category': [
+            _option(category, category_names.get(category, category), counts['category'], selected['category'])
+            for category in categories
+        ],
+        'price': [
+            _option(value, label, counts['price'], selected['price'])
+            for (value, low, high), label in zip(PRICE_BANDS, price_band_labels(currency))
+        ],
+        'stock': [_option(value, label, counts['stock'], selected['stock']) for value, label, q in STOCK_STATUSES],
+    }
+
+
+def _option(value, label, counts, selected):
+    return {'value': value, 'label': label, 'count': counts[value], 'selected': value in selected}
+
+
+def price_band_labels(currency=BASE_CURRENCY):
+    """Labels of ``PRICE_BANDS`` with their bounds converted to ``currency`` in one batch"""
+    bounds = convert_prices([bound or Decimal(0) for value, low, high in PRICE_BANDS for bound in (low, high)], currency)
+    labels = []
+    for index, (value, low, high) in enumerate(PRICE_BANDS):
+        lower, upper = (f"{amount:,.2f}".removesuffix('.00') for amount in bounds[2 * index:2 * index + 2])
+        if low is None:
+            labels.append(f"Under {currency} {upper}")
+        elif high is None:
+            labels.append(f"{currency} {lower} and up")
+        else:
+            labels.append(f"{currency} {lower} – {upper}")
+    return labels
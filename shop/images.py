@@ -0,0 +1,114 @@
+"""Responsive derivatives (resized WebP/JPEG copies) of uploaded images.
+
+Derivatives live next to the originals under ``derivatives/``, e.g.
+``products/pen_3.png`` -> ``derivatives/products/pen_3_320w.webp``.
+They are generated when a ``Product`` or ``UserProfile`` image is saved,
+deleted when it is replaced or its row is deleted (see ``shop.signals``),
+and can be backfilled with
+``manage.py generate_image_derivatives``.
+"""
+import io
+import os
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+DERIVATIVES_DIR = 'derivatives'
+DERIVATIVE_WIDTHS = (160, 320, 640)
+# file extension -> Pillow format
+DERIVATIVE_FORMATS = {'webp': 'WEBP', 'jpg': 'JPEG'}
+QUALITY = 82
+
+
+def derivative_name(name, width, extension):
+    """Storage name of one derivative of the original ``name``"""
+    stem = os.path.splitext(name)[0]
+    return f"{DERIVATIVES_DIR}/{stem}_{width}w.{extension}"
+
+
+def has_derivatives(name, storage=default_storage):
+    """Whether derivatives of ``name`` have been generated.
+
+    The largest JPEG is written last, so its presence means the set is complete.
+    """
+    return storage.exists(derivative_name(name, DERIVATIVE_WIDTHS[-1], 'jpg'))
+
+
+def needs_derivatives(name, storage=default_storage):
+    """Whether derivatives are missing or older than the original (re-uploaded under the same name)"""
+    last = derivative_name(name, DERIVATIVE_WIDTHS[-1], 'jpg')
+    if not storage.exists(last):
+        return True
+    try:
+        return storage.get_modified_time(name) > storage.get_modified_time(last)
+    except NotImplementedError:
+        return False
+
+
+def derivative_urls(name, storage=default_storage):
+    """Map ``(extension, width)`` to derivative URLs, or ``{}`` when none exist yet"""
+    if not name or not has_derivatives(name, storage):
+        return {}
+    return {
+        (extension, width): storage.url(derivative_name(name, width, extension))
+        for extension in DERIVATIVE_FORMATS
+        for width in DERIVATIVE_WIDTHS
+    }
+
+
+def srcset(urls, extension):
+    """Build an ``<img srcset>`` value from ``derivative_urls`` output"""
+    return ', '.join(f"{urls[(extension, width)]} {width}w" for width in DERIVATIVE_WIDTHS if (extension, width) in urls)
+
+
+def _flatten(image):
+    """Drop transparency onto white, as JPEG has no alpha channel"""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def generate_derivatives(name, force=False, storage=default_storage):
+    """Write every width/format derivative of ``name``; returns how many files were written"""
+    if not force and not needs_derivatives(name, storage):
+        return 0
+
+    with storage.open(name, 'rb') as original:
+        image = Image.open(original)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+
+    written = 0
+    # Smallest first so the largest JPEG (checked by has_derivatives) lands last
+    for width in DERIVATIVE_WIDTHS:
+        resized = image.copy()
+        if resized.width > width:
+            resized.thumbnail((width, width * resized.height // resized.width), Image.Resampling.LANCZOS)
+
+        for extension, image_format in sorted(DERIVATIVE_FORMATS.items(), key=lambda item: item[0] == 'jpg'):
+            if image_format == 'JPEG':
+                frame = _flatten(resized)
+            else:
+                frame = resized if resized.mode in ('RGB', 'RGBA') else resized.convert('RGBA')
+            buffer = io.BytesIO()
+            frame.save(buffer, image_format, quality=QUALITY, optimize=True)
+
+            target = derivative_name(name, width, extension)
+            if storage.exists(target):
+                storage.delete(target)
+            storage.save(target, ContentFile(buffer.getvalue()))
+            written += 1
+    return written
+
+
+def delete_derivatives(name, storage=default_storage):
+    """Remove every derivative of ``name``"""
+    for extension in DERIVATIVE_FORMATS:
+        for width in DERIVATIVE_WIDTHS:
+            target = derivative_name(name, width, extension)
+            if storage.exists(target):
+                storage.delete(target)
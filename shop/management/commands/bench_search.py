@@ -0,0 +1,95 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from shop.models import Product
+from shop.search import InvertedIndexBackend
+
+ADJECTIVES = ['classic', 'premium', 'eco', 'recycled', 'pocket', 'spiral', 'hardbound', 'mini',
+              'smooth', 'retractable', 'fine', 'soft', 'bold', 'pastel', 'neon', 'matte', 'glossy']
+NOUNS = ['notebook', 'journal', 'pen', 'pencil', 'marker', 'eraser', 'sketchpad', 'brush',
+         'paper', 'crayon', 'highlighter', 'planner', 'folder', 'ruler', 'scissors', 'glue']
+SYLLABLES = ['ka', 'lo', 'mi', 'ra', 'ten', 'zu', 'vo', 'pel', 'dri', 'sa', 'nor', 'qui', 'bex', 'tor']
+FILLER = ['ideal', 'for', 'school', 'office', 'art', 'drawing', 'writing', 'durable', 'cover',
+          'pages', 'grip', 'ink', 'colors', 'set', 'refillable', 'lightweight', 'travel']
+
+
+class Command(BaseCommand):
+    help = "Compare the indexed catalog search against the old icontains scan on a seeded catalog"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10000, help="Number of products to seed")
+        parser.add_argument('--queries', type=int, default=200, help="Number of search queries to time")
+        parser.add_argument('--seed', type=int, default=42, help="Random seed for reproducible catalogs")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        # A long tail of brand names so term frequencies look like a real catalog
+        self.brands = sorted({
+            ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+            for _ in range(max(50, options['products'] // 20))
+        })
+
+        # Everything happens inside a transaction that is rolled back at the end
+        with transaction.atomic():
+            self.stdout.write(f"Seeding {options['products']} products...")
+            Product.objects.bulk_create(
+                (self._make_product(rng, i) for i in range(options['products'])),
+                batch_size=1000,
+            )
+
+            backend = InvertedIndexBackend()
+            started = time.perf_counter()
+            backend.rebuild()
+            self.stdout.write(f"Built inverted index in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+            queries = [self._make_query(rng) for _ in range(options['queries'])]
+            base = Product.objects.filter(is_active=True)
+
+            def icontains(query):
+                return list(base.filter(
+                    Q(name__icontains=query) | Q(description__icontains=query)
+                ).values_list('id', flat=True))
+
+            def indexed(query):
+                return list(base.filter(pk__in=backend.search(query, limit=1000)).values_list('id', flat=True))
+
+            self._report('icontains scan', icontains, queries)
+            self._report('inverted index', indexed, queries)
+
+            transaction.set_rollback(True)
+
+    def _make_product(self, rng, index):
+        name = f"{rng.choice(self.brands).title()} {rng.choice(ADJECTIVES).title()} {rng.choice(NOUNS).title()}"
+        return Product(
+            name=name,
+            slug=f"bench-search-{index}",
+            description=' '.join(rng.choice(FILLER + NOUNS) for _ in range(20)),
+            price=rng.randint(10, 500),
+            category=rng.choice(Product.CATEGORIES_CHOICES)[0],
+            stock_quantity=rng.randint(0, 100),
+        )
+
+    def _make_query(self, rng):
+        # Mix of full words and the half-typed prefixes the AJAX search box sends
+        brand = rng.choice(self.brands)
+        if rng.random() < 0.5:
+            return brand[:rng.randint(3, len(brand))]
+        return f"{brand} {rng.choice(NOUNS)}"
+
+    def _report(self, label, search, queries):
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            search(query)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1] if timings else 0
+        self.stdout.write(
+            f"{label:<16} mean {statistics.mean(timings):8.2f} ms   "
+            f"p50 {statistics.median(timings):8.2f} ms   p95 {p95:8.2f} ms"
+        )
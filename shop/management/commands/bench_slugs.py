@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils.text import slugify
+
+from shop.models import Product
+from shop.slugs import allocate_slugs, unique_slug
+
+
+def legacy_slug(product):
+    """The old Product.save loop: one exists() query per taken suffix"""
+    base_slug = slugify(product.name)
+    slug = base_slug
+    counter = 1
+    while Product.objects.filter(slug=slug).exclude(pk=product.pk).exists():
+        slug = f"{base_slug}-{counter}"
+        counter += 1
+    return slug
+
+
+class Command(BaseCommand):
+    help = "Compare queries and time per slug allocation as same-named products pile up"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--variants', type=int, nargs='+', default=[1, 10, 100, 1000],
+                            help="Numbers of existing same-name products to measure at")
+        parser.add_argument('--name', default="Benchmark Slug Notebook")
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'existing':>9} {'old queries':>12} {'old ms':>8} {'new queries':>12} {'new ms':>8} {'save() queries':>15}"
+        )
+        # Everything happens inside a transaction that is rolled back at the end
+        with transaction.atomic():
+            existing = 0
+            for target in sorted(options['variants']):
+                # Pad with variants in one bulk insert, using the bulk allocator
+                padding = [
+                    Product(name=options['name'], description='', price=1, category='other')
+                    for _ in range(target - existing)
+                ]
+                Product.objects.bulk_create(
+                    allocate_slugs(Product.objects.all(), padding), batch_size=500
+                )
+                existing = target
+
+                probe = Product(name=options['name'], description='', price=1, category='other')
+                old_queries, old_ms = self._measure(lambda: legacy_slug(probe))
+                new_queries, new_ms = self._measure(lambda: unique_slug(Product.objects.all(), probe.name))
+                # Whole save(): slug lookup, savepoint, insert, release
+                save_queries, save_ms = self._measure(probe.save)
+                probe.delete()
+                self.stdout.write(
+                    f"{existing:>9} {old_queries:>12} {old_ms:>8.2f} {new_queries:>12} {new_ms:>8.2f} {save_queries:>15}"
+                )
+            transaction.set_rollback(True)
+
+    def _measure(self, func):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            func()
+            elapsed = (time.perf_counter() - started) * 1000
+        return len(queries), elapsed
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.recommendations import build_recommendations, per_product
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh the \"customers also bought\" recommendations shown on product pages from order history; "
+        "only products affected by orders since the last run are rewritten"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Rewrite every product's recommendations")
+        parser.add_argument('--limit', type=int, default=None,
+                            help="Recommendations kept per product (default SHOP_RECOMMENDATIONS_PER_PRODUCT)")
+
+    def handle(self, *args, **options):
+        limit = options['limit'] or per_product()
+        if limit < 1:
+            raise CommandError("--limit must be at least 1")
+
+        started = time.perf_counter()
+        products, rows = build_recommendations(full=options['full'], limit=limit)
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed recommendations of {products} product(s): {rows} row(s) written "
+            f"in {time.perf_counter() - started:.1f}s"
+        ))
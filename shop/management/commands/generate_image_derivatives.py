@@ -0,0 +1,55 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from shop.images import generate_derivatives
+from shop.models import Product, UserProfile
+
+
+def _generate(name, force):
+    """Worker entry point; errors are returned so one bad file does not stop the run"""
+    try:
+        return name, generate_derivatives(name, force=force), None
+    except Exception as exc:
+        return name, 0, str(exc)
+
+
+class Command(BaseCommand):
+    help = "Backfill responsive thumbnails for existing product images and profile pictures"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help="Worker processes (defaults to the CPU count)")
+        parser.add_argument('--force', action='store_true', help="Regenerate derivatives that already exist")
+
+    def handle(self, *args, **options):
+        names = set(Product.objects.exclude(image='').exclude(image__isnull=True).values_list('image', flat=True))
+        names.update(
+            UserProfile.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+            .values_list('profile_picture', flat=True)
+        )
+        if not names:
+            self.stdout.write("No images to process.")
+            return
+
+        # Workers only touch storage, never the database; don't hand them open connections
+        connections.close_all()
+
+        started = time.perf_counter()
+        written = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as pool:
+            futures = [pool.submit(_generate, name, options['force']) for name in sorted(names)]
+            for future in as_completed(futures):
+                name, count, error = future.result()
+                if error:
+                    failed += 1
+                    self.stderr.write(self.style.ERROR(f"{name}: {error}"))
+                else:
+                    written += count
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {len(names)} images ({written} derivatives written, {failed} failed) in {elapsed:.1f}s"
+        ))
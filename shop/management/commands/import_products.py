@@ -0,0 +1,206 @@
+import csv
+import json
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from pathlib import Path
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from shop.cache import bump_catalog_version
+from shop.carts import reprice_items
+from shop.models import Product
+from shop.search import get_search_backend
+from shop.slugs import SlugAllocator
+
+# Columns a feed may provide; rows are matched to existing products by slug
+# (``is_bestseller`` is not one of them: ``rank_bestsellers`` sets it from sales)
+IMPORT_FIELDS = ('name', 'slug', 'description', 'price', 'category', 'stock_quantity', 'weight',
+                 'dimensions', 'image', 'is_active', 'is_featured')
+REQUIRED_FIELDS = ('name', 'price')
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'on'}
+
+
+class RowError(ValueError):
+    """A feed row that can't be imported"""
+
+
+class Command(BaseCommand):
+    help = "Stream products from a CSV or JSONL feed and upsert them in batches (matched by slug)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or JSONL file; '.csv' is read as CSV, anything else as JSON lines")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Override format detection")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows per upsert statement")
+        parser.add_argument('--workers', type=int, default=8, help="Threads checking that image files exist")
+        parser.add_argument('--dry-run', action='store_true', help="Validate the feed without writing anything")
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f"{path} does not exist")
+        feed_format = options['format'] or ('csv' if path.suffix.lower() == '.csv' else 'jsonl')
+
+        self.categories = {value for value, label in Product.CATEGORIES_CHOICES}
+        self.slugs = SlugAllocator()
+        self.verbosity = options['verbosity']
+        stats = {'created': 0, 'updated': 0, 'skipped': 0, 'missing_images': 0}
+
+        started = time.perf_counter()
+        with path.open(newline='', encoding='utf-8-sig') as handle, \
+                ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            rows = self._read(handle, feed_format)
+            while batch := list(islice(rows, options['batch_size'])):
+                products = self._build(batch, stats)
+                self._check_images(products, pool, stats)
+                if products and not options['dry_run']:
+                    self._upsert(products, stats)
+        elapsed = time.perf_counter() - started
+
+        imported = stats['created'] + stats['updated']
+        if imported and not options['dry_run']:
+            # bulk_create skips the post_save signals, so refresh what they would have
+            bump_catalog_version()
+            get_search_backend().rebuild()
+
+        total = imported + stats['skipped']
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Validated' if options['dry_run'] else 'Imported'} {total} rows in {elapsed:.2f}s "
+            f"({total / elapsed if elapsed else 0:.0f} rows/s): {stats['created']} created, "
+            f"{stats['updated']} updated, {stats['skipped']} skipped, "
+            f"{stats['missing_images']} missing image(s)"
+        ))
+        if imported and not options['dry_run']:
+            self.stdout.write("Run `manage.py generate_image_derivatives` to build thumbnails for new images.")
+
+    # Reading
+
+    def _read(self, handle, feed_format):
+        """Yield ``(line_number, row_dict)`` without loading the whole file"""
+        if feed_format == 'csv':
+            reader = csv.DictReader(handle)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        for line_number, line in enumerate(handle, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield line_number, exc
+                continue
+            yield line_number, row
+
+    def _build(self, batch, stats):
+        products = []
+        for line_number, row in batch:
+            try:
+                if not isinstance(row, dict):
+                    raise RowError(f"not a JSON object ({row})")
+                products.append(self._product(row))
+            except RowError as exc:
+                stats['skipped'] += 1
+                self.stderr.write(f"Line {line_number}: skipped, {exc}")
+        return products
+
+    def _product(self, row):
+        row = {key.strip(): value for key, value in row.items() if key and key.strip() in IMPORT_FIELDS}
+        row = {key: value.strip() if isinstance(value, str) else value for key, value in row.items()}
+        missing = [field for field in REQUIRED_FIELDS if row.get(field) in (None, '')]
+        if missing:
+            raise RowError(f"missing {', '.join(missing)}")
+
+        product = Product(
+            name=row['name'],
+            description=row.get('description') or '',
+            price=self._decimal(row, 'price'),
+            category=row.get('category') or 'other',
+            stock_quantity=self._integer(row, 'stock_quantity'),
+            weight=self._decimal(row, 'weight') if row.get('weight') not in (None, '') else None,
+            dimensions=row.get('dimensions') or '',
+            image=row.get('image') or '',
+            is_active=self._boolean(row, 'is_active', True),
+            is_featured=self._boolean(row, 'is_featured', False),
+        )
+        if product.category not in self.categories:
+            raise RowError(f"unknown category {product.category!r}")
+        if len(product.name) > Product._meta.get_field('name').max_length:
+            raise RowError("name too long")
+        product.slug = self.slugs.allocate(row.get('slug') or product.name)
+        # Only overwrite columns this row actually provides (a blank CSV cell provides nothing)
+        product._import_fields = frozenset(key for key, value in row.items() if value not in (None, ''))
+        return product
+
+    def _decimal(self, row, field):
+        try:
+            value = Decimal(str(row[field]))
+        except (InvalidOperation, ValueError):
+            raise RowError(f"{field} is not a number")
+        if value < 0:
+            raise RowError(f"{field} is negative")
+        return value
+
+    def _integer(self, row, field):
+        value = row.get(field)
+        if value in (None, ''):
+            return 0
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            raise RowError(f"{field} is not a whole number")
+        if value < 0:
+            raise RowError(f"{field} is negative")
+        return value
+
+    def _boolean(self, row, field, default):
+        value = row.get(field)
+        if value in (None, ''):
+            return default
+        if isinstance(value, bool):
+            return value
+        return str(value).lower() in TRUE_VALUES
+
+    # Writing
+
+    def _check_images(self, products, pool, stats):
+        """Drop image paths that don't exist in storage (checked concurrently, storage may be remote).
+
+        A new product gets the placeholder; an existing one keeps its stored image.
+        """
+        names = {product.image.name for product in products if product.image}
+        found = dict(zip(names, pool.map(default_storage.exists, names)))
+        for product in products:
+            if product.image and not found[product.image.name]:
+                stats['missing_images'] += 1
+                if self.verbosity > 1:
+                    self.stderr.write(f"{product.slug}: image {product.image.name} not found, ignored")
+                product.image = ''
+                product._import_fields -= {'image'}
+
+    def _upsert(self, products, stats):
+        # Rows missing a column are built with its default, which must not overwrite the stored value,
+        # so each set of provided columns gets its own upsert (a uniform feed is still one statement)
+        groups = defaultdict(list)
+        for product in products:
+            groups[product._import_fields].append(product)
+
+        with transaction.atomic():
+            existing = set(
+                Product.objects.filter(slug__in=[product.slug for product in products]).values_list('slug', flat=True)
+            )
+            for fields, group in groups.items():
+                kwargs = {'update_conflicts': True, 'update_fields': sorted((fields - {'slug'}) | {'modified_at'})}
+                if connection.features.supports_update_conflicts_with_target:
+                    kwargs['unique_fields'] = ['slug']
+                Product.objects.bulk_create(group, **kwargs)
+            if existing:
+                # bulk_create sends no post_save, so move the open cart lines of updated products to their new price
+                reprice_items(Product.objects.filter(slug__in=existing).values('pk'))
+        stats['updated'] += len(existing)
+        stats['created'] += len(products) - len(existing)
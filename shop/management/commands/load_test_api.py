@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment
+from django.urls import reverse
+
+from shop.benchmarks.load import run_asgi, run_wsgi, simulated_db_latency
+from shop.models import Product
+
+
+class Command(BaseCommand):
+    help = "Compare WSGI and ASGI throughput of the async JSON endpoints at high concurrency"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help="Requests per run")
+        parser.add_argument('--concurrency', type=int, default=200, help="Clients sending requests at once")
+        parser.add_argument('--workers', type=int, default=16,
+                            help="Requests the WSGI run serves at once (server processes x threads)")
+        parser.add_argument('--db-latency', type=float, default=5.0,
+                            help="Milliseconds added to every query to stand in for a network round trip (0 = off)")
+        parser.add_argument('--mode', choices=('both', 'wsgi', 'asgi'), default='both')
+        parser.add_argument('--url', action='append', dest='urls',
+                            help="Path to request (repeatable); default is the products, product detail and cart count APIs")
+
+    def handle(self, *args, **options):
+        try:
+            setup_test_environment()
+        except RuntimeError:
+            pass  # Already set up, e.g. when called from a test
+
+        urls = options['urls'] or self._default_urls()
+        self.stdout.write(
+            f"{options['requests']} requests, {options['concurrency']} concurrent clients, "
+            f"{options['db_latency']:g} ms per query, over: {', '.join(urls)}"
+        )
+
+        results = {}
+        with simulated_db_latency(options['db_latency'] / 1000):
+            if options['mode'] in ('both', 'wsgi'):
+                results['wsgi'] = run_wsgi(urls, options['requests'], options['concurrency'], options['workers'])
+                self._print_row(f"WSGI ({options['workers']} workers)", results['wsgi'])
+            if options['mode'] in ('both', 'asgi'):
+                results['asgi'] = run_asgi(urls, options['requests'], options['concurrency'])
+                self._print_row('ASGI', results['asgi'])
+
+        if len(results) == 2 and results['wsgi']['throughput_rps']:
+            ratio = results['asgi']['throughput_rps'] / results['wsgi']['throughput_rps']
+            self.stdout.write(f"ASGI throughput is {ratio:.2f}x WSGI")
+
+    def _default_urls(self):
+        product = Product.objects.filter(is_active=True).order_by('pk').only('slug').first()
+        if product is None:
+            raise CommandError("No active products; run seed_benchmark_data or import_products first")
+        return [
+            reverse('shop-products-api') + '?limit=24&fields=id,name,price,image_url,url',
+            reverse('product-detail-api', kwargs={'slug': product.slug}),
+            reverse('cart-count-api'),
+        ]
+
+    def _print_row(self, name, result):
+        self.stdout.write(
+            f"{name:<20} {result['throughput_rps']:>8.1f} req/s  p50 {result['p50_ms']:>8.2f} ms  "
+            f"p95 {result['p95_ms']:>8.2f} ms  p99 {result['p99_ms']:>8.2f} ms  errors {result['errors']}"
+        )
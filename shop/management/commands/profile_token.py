@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from shop.profiling import PROFILE_HEADER, make_profile_token
+
+
+class Command(BaseCommand):
+    help = "Print a signed header that makes ProfilingMiddleware profile the requests carrying it"
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{PROFILE_HEADER}: {make_profile_token()}")
+        self.stderr.write(f"Valid for {settings.SHOP_PROFILE_TOKEN_MAX_AGE} seconds")
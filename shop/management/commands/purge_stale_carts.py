@@ -0,0 +1,78 @@
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from shop.carts import delete_in_chunks, expired_sessions, stale_carts
+from shop.models import CartItem
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete inactive and abandoned anonymous carts (with their items) and expired sessions "
+        "in small primary-key chunks; safe to run alongside traffic"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inactive-days', type=float, default=7,
+                            help="Delete inactive (merged) carts untouched for this many days")
+        parser.add_argument('--anonymous-days', type=float, default=30,
+                            help="Delete anonymous carts untouched for this many days")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Rows deleted per statement")
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help="Seconds to sleep between chunks, to leave the database to live traffic")
+        parser.add_argument('--skip-sessions', action='store_true', help="Leave expired sessions alone")
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be deleted")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+        now = timezone.now()
+        carts = stale_carts(
+            inactive_before=now - timedelta(days=options['inactive_days']),
+            anonymous_before=now - timedelta(days=options['anonymous_days']),
+        )
+        sessions = None if options['skip_sessions'] else expired_sessions(now)
+
+        if options['dry_run']:
+            self._report(carts, sessions, now)
+            return
+
+        self._purge('stale carts', carts, options)
+        if sessions is not None:
+            self._purge('expired sessions', sessions, options)
+
+    def _report(self, carts, sessions, now):
+        stats = carts.aggregate(carts=Count('pk'), oldest=Min('updated_at'))
+        inactive = carts.filter(is_active=False).count()
+        items = CartItem.objects.filter(cart__in=carts).count()
+        self.stdout.write(
+            f"Would delete {stats['carts']} cart(s) ({inactive} inactive, {stats['carts'] - inactive} abandoned "
+            f"anonymous) with {items} item(s)"
+        )
+        if stats['oldest']:
+            self.stdout.write(f"Oldest stale cart last touched {(now - stats['oldest']).days} day(s) ago")
+        if sessions is not None:
+            self.stdout.write(f"Would delete {sessions.count()} expired session(s)")
+
+    def _purge(self, name, queryset, options):
+        totals = Counter()
+        chunks = 0
+        started = time.perf_counter()
+        for per_model in delete_in_chunks(queryset, options['chunk_size'], options['pause']):
+            totals.update(per_model)
+            chunks += 1
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  chunk {chunks}: {dict(per_model)}")
+        elapsed = time.perf_counter() - started
+
+        rows = sum(totals.values())
+        # Pauses are waiting, not work, so leave them out of the rate
+        working = max(elapsed - options['pause'] * chunks, 1e-9)
+        detail = ', '.join(f"{count} {label}" for label, count in sorted(totals.items())) or 'nothing'
+        self.stdout.write(self.style.SUCCESS(
+            f"Purged {name}: {detail} in {chunks} chunk(s), {elapsed:.1f}s ({rows / working:,.0f} rows/s)"
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.bestsellers import rank_bestsellers, window_days
+from shop.models import Product
+
+
+class Command(BaseCommand):
+    help = "Rank products by units sold over a trailing window for the bestseller rail and the bestselling sort"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help="Length of the sales window (default SHOP_BESTSELLER_WINDOW_DAYS)")
+        parser.add_argument('--top', type=int, default=None,
+                            help="How many products to flag as bestsellers (default SHOP_BESTSELLER_COUNT)")
+
+    def handle(self, *args, **options):
+        days = window_days() if options['days'] is None else options['days']
+        if days < 1 or (options['top'] is not None and options['top'] < 1):
+            raise CommandError("--days and --top must be at least 1")
+
+        ranked = rank_bestsellers(days=days, top=options['top'])
+        self.stdout.write(self.style.SUCCESS(f"Ranked {len(ranked)} product(s) by units sold over {days} day(s)"))
+        if options['verbosity'] > 1:
+            names = dict(Product.objects.filter(pk__in=[pk for pk, units in ranked[:10]]).values_list('pk', 'name'))
+            for rank, (product_id, units) in enumerate(ranked[:10], start=1):
+                self.stdout.write(f"  {rank:>2}. {names.get(product_id, product_id)}: {units} unit(s)")
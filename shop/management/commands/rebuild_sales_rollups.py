@@ -0,0 +1,25 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily sales rollups behind the admin analytics from the orders table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="Only rebuild days from this date on (YYYY-MM-DD); default is all history")
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError("--since must be a date in YYYY-MM-DD format")
+
+        days, product_days = rebuild_rollups(since)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {days} daily status rollup(s) and {product_days} daily product rollup(s)"
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from shop.carts import drifted_carts, recalculate_totals
+from shop.models import Cart
+
+
+class Command(BaseCommand):
+    help = "Find carts whose stored item count, line count or subtotal disagree with their items and fix them"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Also check inactive carts")
+        parser.add_argument('--dry-run', action='store_true', help="Only report drifted carts")
+
+    def handle(self, *args, **options):
+        carts = Cart.objects.all() if options['all'] else Cart.objects.filter(is_active=True)
+        drifted = list(drifted_carts(carts).values_list('pk', flat=True))
+
+        if options['verbosity'] > 1:
+            for cart_id in drifted:
+                self.stdout.write(f"Cart {cart_id} drifted")
+        if drifted and not options['dry_run']:
+            recalculate_totals(Cart.objects.filter(pk__in=drifted))
+
+        verb = "Found" if options['dry_run'] else "Fixed"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(drifted)} cart(s) with drifted totals"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from shop.reservations import purge_expired_reservations
+
+
+class Command(BaseCommand):
+    help = "Delete stock reservations whose hold has expired (run from cron every few minutes)"
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_reservations()
+        self.stdout.write(self.style.SUCCESS(f"Released {deleted} expired reservation(s)"))
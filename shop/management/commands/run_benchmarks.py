@@ -0,0 +1,88 @@
+import json
+import platform
+from datetime import datetime, timezone
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import setup_test_environment
+
+from shop.benchmarks.scenarios import SCENARIOS, BenchmarkContext, BenchmarkError, run_scenario
+from shop.benchmarks.seed import SLUG_PREFIX
+from shop.models import Order, Product
+
+
+class Command(BaseCommand):
+    help = "Time the main pages, APIs and admin dashboards against the seeded benchmark data"
+
+    def add_arguments(self, parser):
+        names = [scenario.name for scenario in SCENARIOS]
+        parser.add_argument('--scenario', action='append', choices=names, dest='scenarios',
+                            help="Run only this scenario (repeatable); default is all")
+        parser.add_argument('--iterations', type=int, default=50, help="Timed requests per scenario")
+        parser.add_argument('--warmup', type=int, default=5, help="Untimed requests per scenario first")
+        parser.add_argument('--seed', type=int, default=42, help="Random seed for picking products")
+        parser.add_argument('--label', default='', help="Free-form name for this run, stored in the JSON")
+        parser.add_argument('--output', help="Write results as JSON to this file")
+        parser.add_argument('--compare', help="JSON file from an earlier run to print differences against")
+
+    def handle(self, *args, **options):
+        # Lets the test client talk to 'testserver' and records rendered templates like the test runner
+        try:
+            setup_test_environment()
+        except RuntimeError:
+            pass  # Already set up, e.g. when called from a test
+        selected = [s for s in SCENARIOS if not options['scenarios'] or s.name in options['scenarios']]
+
+        results = {}
+        # Requests really write (carts, orders); roll it all back so runs stay comparable
+        with transaction.atomic():
+            try:
+                context = BenchmarkContext(options['seed'])
+                for scenario in selected:
+                    results[scenario.name] = run_scenario(
+                        context, scenario, iterations=options['iterations'], warmup=options['warmup']
+                    )
+                    self._print_row(scenario.name, results[scenario.name])
+            except BenchmarkError as exc:
+                raise CommandError(exc)
+            finally:
+                transaction.set_rollback(True)
+
+        report = {
+            'label': options['label'],
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'environment': {
+                'database': connection.vendor,
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'products': Product.objects.filter(slug__startswith=SLUG_PREFIX).count(),
+                'orders': Order.objects.count(),
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+        if options['compare']:
+            self._compare(options['compare'], results)
+
+    def _print_row(self, name, result):
+        self.stdout.write(
+            f"{name:<28} p50 {result['p50_ms']:>8.2f} ms  p95 {result['p95_ms']:>8.2f} ms  "
+            f"queries {result['queries_median']:>5g}  peak {result['peak_memory_kb']:>8.1f} KiB"
+        )
+
+    def _compare(self, path, results):
+        with open(path) as handle:
+            baseline = json.load(handle)['results']
+        self.stdout.write(f"\nChange against {path}:")
+        for name, result in results.items():
+            before = baseline.get(name)
+            if not before:
+                continue
+            p50 = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0
+            p95 = (result['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0
+            queries = result['queries_median'] - before['queries_median']
+            self.stdout.write(f"{name:<28} p50 {p50:+7.1f}%  p95 {p95:+7.1f}%  queries {queries:+g}")
@@ -0,0 +1,132 @@
+import threading
+import time
+from queue import Empty, Queue
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connection
+from django.db.models import Sum
+
+from shop.checkout import InsufficientStock, place_order
+from shop.models import Cart, CartItem, InventoryTransaction, Order, Product
+
+# SQLite serialises writers and reports "database is locked" under contention
+MAX_ATTEMPTS = 20
+
+
+class Command(BaseCommand):
+    help = "Hammer the checkout service from many threads and verify a product is never oversold"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help="Concurrent checkout workers")
+        parser.add_argument('--orders', type=int, default=200, help="Checkout attempts in total")
+        parser.add_argument('--stock', type=int, default=100, help="Starting stock of the contested product")
+        parser.add_argument('--quantity', type=int, default=1, help="Units per order")
+        parser.add_argument('--keep', action='store_true', help="Keep the generated product, carts and orders")
+
+    def handle(self, *args, **options):
+        product = Product.objects.create(
+            name=f"Stress Checkout {time.time_ns()}",
+            description="Temporary product for stress_checkout",
+            price=10,
+            category='other',
+            stock_quantity=options['stock'],
+        )
+        carts = []
+        try:
+            carts = Cart.objects.bulk_create(
+                Cart(item_count=options['quantity'], line_count=1, subtotal=product.price * options['quantity'])
+                for _ in range(options['orders'])
+            )
+            CartItem.objects.bulk_create(
+                CartItem(cart=cart, product=product, quantity=options['quantity'], price=product.price) for cart in carts
+            )
+            results = self._run(carts, options['threads'])
+            self._verify(product, options, results)
+        finally:
+            if not options['keep']:
+                Order.objects.filter(items__product=product).delete()
+                Cart.objects.filter(pk__in=[cart.pk for cart in carts]).delete()
+                product.delete()
+
+    def _run(self, carts, thread_count):
+        work = Queue()
+        for cart in carts:
+            work.put(cart.pk)
+        results = {'placed': 0, 'rejected': 0, 'retries': 0, 'errors': []}
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                while True:
+                    try:
+                        cart_id = work.get_nowait()
+                    except Empty:
+                        return
+                    outcome, retries = self._checkout(cart_id)
+                    with lock:
+                        results['retries'] += retries
+                        if isinstance(outcome, Exception):
+                            results['errors'].append(outcome)
+                        else:
+                            results[outcome] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(thread_count)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        results['elapsed'] = time.perf_counter() - started
+        return results
+
+    def _checkout(self, cart_id):
+        close_old_connections()
+        items = list(CartItem.objects.select_related('product').filter(cart_id=cart_id))
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                place_order(
+                    items,
+                    user=None,
+                    full_name="Stress Test",
+                    email="stress@example.com",
+                    address="Nowhere",
+                    payment_method='COD',
+                    shipping_fee=0,
+                )
+                return 'placed', attempt
+            except InsufficientStock:
+                return 'rejected', attempt
+            except OperationalError as exc:
+                if 'locked' not in str(exc):
+                    return exc, attempt
+                time.sleep(0.005 * (attempt + 1))
+        return OperationalError("database stayed locked"), MAX_ATTEMPTS
+
+    def _verify(self, product, options, results):
+        product.refresh_from_db()
+        sold = results['placed'] * options['quantity']
+        ledger = InventoryTransaction.objects.filter(product=product, transaction_type='sale')
+        ledger_units = -(ledger.aggregate(total=Sum('quantity_change'))['total'] or 0)
+
+        self.stdout.write(
+            f"{results['placed']} orders placed, {results['rejected']} rejected, "
+            f"{results['retries']} lock retries, {len(results['errors'])} errors "
+            f"in {results['elapsed']:.2f}s ({results['placed'] / results['elapsed']:.1f} orders/s "
+            f"on {options['threads']} threads)"
+        )
+        self.stdout.write(
+            f"Stock {options['stock']} -> {product.stock_quantity}, {sold} units sold, ledger records {ledger_units}"
+        )
+
+        if results['errors']:
+            raise CommandError(f"Checkout failed: {results['errors'][0]}")
+        if product.stock_quantity < 0 or sold > options['stock']:
+            raise CommandError("Product was oversold")
+        if product.stock_quantity != options['stock'] - sold or ledger_units != sold:
+            raise CommandError("Stock level and inventory ledger disagree with the orders placed")
+        expected = min(options['orders'], options['stock'] // options['quantity'])
+        if results['placed'] != expected:
+            raise CommandError(f"Expected {expected} orders to succeed, got {results['placed']}")
+        self.stdout.write(self.style.SUCCESS("No oversell"))
@@ -0,0 +1,296 @@
+"""Request middleware for the shop."""
+import cProfile
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.urls import reverse
+
+from . import routers
+from .carts import save_cookie_cart
+from .profiling import StackSampler, profile_reason, save_profile
+
+logger = logging.getLogger(__name__)
+
+# Literals that vary between otherwise identical statements
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN\s*\((?:\s*(?:\?|%s)\s*,?)+\)', re.IGNORECASE)
+_SPACE_RE = re.compile(r'\s+')
+# Several atomic blocks in one request repeat these without being an N+1
+_TRANSACTION_RE = re.compile(r'\s*(BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE SAVEPOINT)\b', re.IGNORECASE)
+
+
+def normalize_sql(sql):
+    """Reduce a statement to its shape, so queries differing only in parameters group together"""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised (when configured to) if a view runs more queries than its budget or repeats one too often"""
+
+
+class QueryRecorder:
+    """``connection.execute_wrapper`` that keeps every statement run while it is installed"""
+
+    def __init__(self):
+        self.queries = []  # (sql, seconds)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    def record(self):
+        """Install on every configured database for the duration of a ``with`` block"""
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+    @property
+    def count(self):
+        # Savepoints come from nested atomic blocks (every one of them, in a test case), not from data access
+        return sum(1 for sql, seconds in self.queries if not _TRANSACTION_RE.match(sql))
+
+    def repeated(self, threshold):
+        """Normalized statements run at least ``threshold`` times: likely N+1 loops"""
+        shapes = Counter(
+            normalize_sql(sql) for sql, seconds in self.queries if not _TRANSACTION_RE.match(sql)
+        )
+        return [(shape, count) for shape, count in shapes.most_common() if count >= threshold]
+
+    def problems(self, budget=None, threshold=None):
+        """Human-readable budget and N+1 violations"""
+        problems = []
+        if budget is not None and self.count > budget:
+            problems.append(f"{self.count} queries, budget is {budget}")
+        if threshold:
+            for shape, count in self.repeated(threshold):
+                problems.append(f"possible N+1, {count}x: {shape[:300]}")
+        return problems
+
+
+def query_budget(url_name):
+    return getattr(settings, 'SHOP_QUERY_BUDGETS', {}).get(url_name)
+
+
+class QueryBudgetMiddleware:
+    """Count the SQL each request runs and check it against ``SHOP_QUERY_BUDGETS``.
+
+    Budgets are keyed by URL name. Requests over budget, or repeating one
+    statement shape ``SHOP_N_PLUS_ONE_THRESHOLD`` times, are logged as
+    warnings, or raise ``QueryBudgetExceeded`` when ``SHOP_QUERY_BUDGET_RAISE``
+    is on (see ``shop.testing``). Async views are counted too, except reads
+    they hand to their own worker threads.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        with recorder.record():
+            response = self.get_response(request)
+        self.check(request, recorder)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        # The async ORM runs queries on the request's sync thread, so the wrappers go on that thread's connections
+        recording = await sync_to_async(recorder.record)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(recording.close)()
+        self.check(request, recorder)
+        return response
+
+    def check(self, request, recorder):
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.view_name if match else None
+        problems = recorder.problems(
+            budget=query_budget(url_name),
+            threshold=getattr(settings, 'SHOP_N_PLUS_ONE_THRESHOLD', 5),
+        )
+        if problems:
+            message = f"{request.method} {request.path} ({url_name}): " + '; '.join(problems)
+            if getattr(settings, 'SHOP_QUERY_BUDGET_RAISE', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+
+class ProfilingMiddleware:
+    """Profile sampled requests and save the result with ``shop.profiling``.
+
+    Requests are picked at ``SHOP_PROFILE_SAMPLE_RATE`` or by a signed
+    ``X-Shop-Profile`` header (``manage.py profile_token``). Everything
+    else passes straight through. Under ASGI the function profile and stacks
+    are those of the event loop thread, so they include any other request
+    being served at the same time; the SQL timings are the request's own.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        reason = profile_reason(request)
+        if reason is None:
+            return self.get_response(request)
+
+        profiler, sampler, recorder = self.start()
+        started = time.perf_counter()
+        try:
+            with recorder.record():
+                response = self.get_response(request)
+        finally:
+            self.stop(profiler, sampler)
+        self.save(request, response, reason, time.perf_counter() - started, profiler, sampler, recorder)
+        return response
+
+    async def __acall__(self, request):
+        reason = profile_reason(request)
+        if reason is None:
+            return await self.get_response(request)
+
+        profiler, sampler, recorder = self.start()
+        started = time.perf_counter()
+        try:
+            recording = await sync_to_async(recorder.record)()
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(recording.close)()
+        finally:
+            self.stop(profiler, sampler)
+        await sync_to_async(self.save)(request, response, reason, time.perf_counter() - started, profiler, sampler, recorder)
+        return response
+
+    def start(self):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            profiler = None  # Another profiler (debugger, coverage) owns this thread; keep the stack samples
+        sampler = StackSampler(threading.get_ident(), getattr(settings, 'SHOP_PROFILE_SAMPLE_INTERVAL', 0.005))
+        sampler.start()
+        return profiler, sampler, QueryRecorder()
+
+    def stop(self, profiler, sampler):
+        if profiler is not None:
+            profiler.disable()
+        sampler.stop()
+
+    def save(self, request, response, reason, duration, profiler, sampler, recorder):
+        try:
+            save_profile(request, response, reason, duration, profiler, sampler.stacks, recorder.queries)
+        except OSError:
+            logger.exception("Could not save profile of %s %s", request.method, request.path)
+
+
+class ReplicaRoutingMiddleware:
+    """Scope ``shop.routers.ReplicaRouter`` decisions to the request.
+
+    Storefront requests may read the catalog from a replica; the admin stays
+    on the primary except for views wrapped in ``routers.replica_reads``. A
+    request that writes sets a short-lived cookie keeping the visitor on the
+    primary for ``SHOP_REPLICA_STICKY_SECONDS``, so they see their own
+    changes even while the replicas catch up.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        self._admin_prefix = None
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = self.begin(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = routers.end_request(token)
+        return self.finish(response, wrote)
+
+    async def __acall__(self, request):
+        token = self.begin(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            wrote = routers.end_request(token)
+        return self.finish(response, wrote)
+
+    def begin(self, request):
+        if self._admin_prefix is None:
+            self._admin_prefix = reverse('admin:index')
+        return routers.begin_request(
+            catalog=not request.path_info.startswith(self._admin_prefix),
+            pinned=routers.STICKY_COOKIE in request.COOKIES,
+        )
+
+    def finish(self, response, wrote):
+        if wrote and routers.read_replicas():
+            response.set_cookie(
+                routers.STICKY_COOKIE, '1',
+                max_age=getattr(settings, 'SHOP_REPLICA_STICKY_SECONDS', 10),
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class CartCookieMiddleware:
+    """Write anonymous cookie carts (``shop.carts.CookieCart``) back when a request changed them"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        save_cookie_cart(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        save_cookie_cart(request, response)
+        return response
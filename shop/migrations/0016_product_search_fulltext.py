@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+def create_fulltext_index(apps, schema_editor):
+    """Add the FULLTEXT index used by shop.search.MySQLFullTextBackend"""
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute(
+        'CREATE FULLTEXT INDEX shop_product_search_ft ON shop_product (name, description)'
+    )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute('DROP INDEX shop_product_search_ft ON shop_product')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0015_alter_order_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:29
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_cart_totals(apps, schema_editor):
+    Cart = apps.get_model('shop', 'Cart')
+    CartItem = apps.get_model('shop', 'CartItem')
+    items = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+    money = DecimalField(max_digits=12, decimal_places=2)
+    Cart.objects.update(
+        item_count=Coalesce(Subquery(items.annotate(total=Sum('quantity')).values('total')), 0),
+        line_count=Coalesce(Subquery(items.annotate(total=Count('id')).values('total')), 0),
+        subtotal=Coalesce(
+            Subquery(items.annotate(total=Sum(F('price') * F('quantity'), output_field=money)).values('total')),
+            Value(Decimal('0.00')),
+            output_field=money,
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0019_daily_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='item_count',
+            field=models.IntegerField(default=0, help_text='Total quantity of all items'),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='line_count',
+            field=models.IntegerField(default=0, help_text='Number of distinct items'),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(backfill_cart_totals, migrations.RunPython.noop),
+    ]
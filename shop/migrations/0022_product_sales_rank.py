@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0021_product_recommendations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='bestseller_rank',
+            field=models.PositiveIntegerField(blank=True, help_text='1 = best selling; empty if nothing sold', null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='sales_score',
+            field=models.PositiveIntegerField(default=0, help_text='Units sold over the bestseller window'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='is_bestseller',
+            field=models.BooleanField(default=False, help_text='Among the top sellers (set by manage.py rank_bestsellers)'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_active', '-sales_score', 'id'], name='product_active_sales_idx'),
+        ),
+    ]
@@ -1,8 +1,10 @@
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.urls import reverse
-from django.utils.text import slugify
+from django.utils.functional import cached_property
 import os
+from .images import derivative_urls, srcset
+from .slugs import unique_slug
 
 def product_image_upload_path(instance, filename):
     """Generate upload path for product images"""
@@ -70,6 +72,15 @@ class UserProfile(models.Model):
         if self.profile_picture and hasattr(self.profile_picture, 'url'):
             return self.profile_picture.url
         return None
+    
+    @cached_property
+    def _profile_picture_derivatives(self):
+        return derivative_urls(self.profile_picture.name) if self.profile_picture else {}
+    
+    @property
+    def profile_picture_thumbnail_url(self):
+        """Small WebP copy of the profile picture, falling back to the original"""
+        return self._profile_picture_derivatives.get(('webp', 160)) or self.profile_picture_url
 
 class Address(models.Model):
     """Address model for user addresses"""
@@ -169,6 +180,11 @@ class Product(models.Model):
         ('other', 'Other')
     ]
 
+    PLACEHOLDER_IMAGE_URL = '/static/shop/images/placeholder-product.jpg'
+
+    # Times save() re-picks an auto-generated slug that a concurrent insert took first
+    SLUG_ATTEMPTS = 5
+
     name = models.CharField(max_length=200)
     slug = models.SlugField(max_length=250, unique=True, blank=True, help_text="URL-friendly version of the product name (auto-generated)")
     description = models.TextField()
@@ -195,7 +211,10 @@ class Product(models.Model):
     stock_quantity = models.PositiveIntegerField(default=0, help_text="Number of items in stock")
     is_active = models.BooleanField(default=True, help_text="Whether this product is available for purchase")
     is_featured = models.BooleanField(default=False, help_text="Mark as featured product (shown on homepage)")
-    is_bestseller = models.BooleanField(default=False, help_text="Mark as bestseller")
+    is_bestseller = models.BooleanField(default=False, help_text="Among the top sellers (set by manage.py rank_bestsellers)")
+    # Written by manage.py rank_bestsellers (see shop.bestsellers)
+    sales_score = models.PositiveIntegerField(default=0, help_text="Units sold over the bestseller window")
+    bestseller_rank = models.PositiveIntegerField(null=True, blank=True, help_text="1 = best selling; empty if nothing sold")
     
     created_at = models.DateTimeField(auto_now_add=True)
     modified_at = models.DateTimeField(auto_now=True)
@@ -204,25 +223,34 @@ class Product(models.Model):
         verbose_name = "Product"
         verbose_name_plural = "Products"
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination over the shop sort orders (see shop.catalog.SORT_ORDERS)
+            models.Index(fields=['is_active', 'name', 'id'], name='product_active_name_idx'),
+            models.Index(fields=['is_active', 'price', 'id'], name='product_active_price_idx'),
+            models.Index(fields=['is_active', 'created_at', 'id'], name='product_active_created_idx'),
+            models.Index(fields=['is_active', '-sales_score', 'id'], name='product_active_sales_idx'),
+        ]
 
     def __str__(self):
         return f"{ self.name } - PHP { self.price }"
     
     def save(self, *args, **kwargs):
         """Override save to auto-generate slug"""
-        if not self.slug:
-            base_slug = slugify(self.name)
-            slug = base_slug
-            counter = 1
-            
-            # Ensure slug is unique
-            while Product.objects.filter(slug=slug).exclude(pk=self.pk).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            
-            self.slug = slug
-        
-        super().save(*args, **kwargs)
+        if self.slug:
+            return super().save(*args, **kwargs)
+
+        others = Product.objects.exclude(pk=self.pk)
+        for attempt in range(self.SLUG_ATTEMPTS):
+            self.slug = unique_slug(others, self.name)
+            try:
+                # Savepoint so a lost race for the slug doesn't break an outer transaction
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                # Someone else took the slug between our lookup and insert: pick again
+                if attempt == self.SLUG_ATTEMPTS - 1 or not others.filter(slug=self.slug).exists():
+                    self.slug = ''
+                    raise
     
     def get_category_display_name(self):
         """Getter function for category name"""
@@ -237,25 +265,54 @@ class Product(models.Model):
         """Get the image URL or return a placeholder"""
         if self.image and hasattr(self.image, 'url'):
             return self.image.url
-        return '/static/shop/images/placeholder-product.jpg'
+        return self.PLACEHOLDER_IMAGE_URL
+    
+    @cached_property
+    def _image_derivatives(self):
+        return derivative_urls(self.image.name) if self.image else {}
+    
+    @property
+    def image_thumbnail_url(self):
+        """Card-sized JPEG of the product image, falling back to the original"""
+        return self._image_derivatives.get(('jpg', 320)) or self.image_url
+    
+    @property
+    def image_admin_thumbnail_url(self):
+        """Smallest JPEG of the product image, for admin previews"""
+        return self._image_derivatives.get(('jpg', 160)) or self.image_url
+    
+    @property
+    def image_srcset(self):
+        """JPEG srcset for responsive <img> tags (empty until derivatives exist)"""
+        return srcset(self._image_derivatives, 'jpg')
+    
+    @property
+    def image_webp_srcset(self):
+        """WebP srcset for <picture> sources (empty until derivatives exist)"""
+        return srcset(self._image_derivatives, 'webp')
     
     @property
     def is_in_stock(self):
         """Check if product is in stock"""
         return self.stock_quantity > 0 and self.is_active
     
-    @property
-    def stock_status(self):
-        """Get stock status as a string"""
-        if not self.is_active:
+    @staticmethod
+    def describe_stock(stock_quantity, is_active):
+        """Stock status string for raw column values (used by .values() serializers)"""
+        if not is_active:
             return "Discontinued"
-        elif self.stock_quantity == 0:
+        elif stock_quantity == 0:
             return "Out of Stock"
-        elif self.stock_quantity <= 5:
+        elif stock_quantity <= 5:
             return "Low Stock"
         else:
             return "In Stock"
     
+    @property
+    def stock_status(self):
+        """Get stock status as a string"""
+        return self.describe_stock(self.stock_quantity, self.is_active)
+    
     @property
     def is_new_arrival(self):
         """Check if product is a new arrival (added within last 30 days)"""
@@ -269,6 +326,10 @@ class Cart(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='carts')
     session_key = models.CharField(max_length=40, blank=True, null=True, help_text="Session key for anonymous carts")
     is_active = models.BooleanField(default=True)
+    # Kept in step with the cart's items by the helpers in shop.carts (see reconcile_cart_totals)
+    item_count = models.IntegerField(default=0, help_text="Total quantity of all items")
+    line_count = models.IntegerField(default=0, help_text="Number of distinct items")
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -279,15 +340,8 @@ class Cart(models.Model):
         owner = self.user.username if self.user else f"session:{self.session_key}"
         return f"Cart {self.pk} ({owner})"
 
-    def item_count(self):
-        return sum(item.quantity for item in self.items.all())
-
     def total_price(self):
-        from decimal import Decimal
-        total = Decimal('0.00')
-        for item in self.items.all():
-            total += item.total_price()
-        return total
+        return self.subtotal
 
 class CartItem(models.Model):
     """Line item inside a Cart"""
@@ -304,7 +358,7 @@ class CartItem(models.Model):
         unique_together = ('cart', 'product')
 
     def __str__(self):
-        return f"{self.quantity} × {self.product.name} (cart {self.cart.pk})"
+        return f"{self.quantity} × {self.product.name} (cart {self.cart_id})"
 
     def save(self, *args, **kwargs):
         # default price to current product price if not set
@@ -314,6 +368,30 @@ class CartItem(models.Model):
 
     def total_price(self):
         return self.price * self.quantity
+
+
+class StockReservation(models.Model):
+    """Stock held for a cart while its owner goes through checkout.
+
+    Holds expire on their own after ``SHOP_STOCK_RESERVATION_TTL`` seconds;
+    expired rows are ignored when computing availability and swept by
+    ``manage.py release_expired_reservations``.
+    """
+    product = models.ForeignKey('Product', on_delete=models.CASCADE, related_name='reservations')
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ('cart', 'product')
+        indexes = [
+            # Live holds of a product: WHERE product_id = ? AND expires_at > now
+            models.Index(fields=['product', 'expires_at'], name='reservation_product_live_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} × product {self.product_id} held for cart {self.cart_id}"
     
 
     # O R D E R S
@@ -333,7 +411,7 @@ class Order(models.Model):
     payment_method = models.CharField(max_length=20, default='COD')
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     shipping_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
-    placed_at = models.DateTimeField(auto_now_add=True)
+    placed_at = models.DateTimeField(auto_now_add=True, db_index=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
 
     def __str__(self):
@@ -350,11 +428,68 @@ class OrderItem(models.Model):
     total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
 
     def __str__(self):
-        return f"{self.quantity} × {self.product.name if self.product else 'Deleted Product'} (Order #{self.order.pk})"
+        return f"{self.quantity} × {self.product.name if self.product else 'Deleted Product'} (Order #{self.order_id})"
         
     def get_subtotal(self):
         return self.price * self.quantity
     
+# S A L E S   R O L L U P S
+class DailySalesRollup(models.Model):
+    """Orders and revenue per day and order status.
+
+    Maintained by the ``Order`` signals in ``shop.signals`` and rebuilt with
+    ``manage.py rebuild_sales_rollups``; the admin analytics read these
+    instead of scanning every order.
+    """
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('date', 'status')
+        ordering = ['-date', 'status']
+
+    def __str__(self):
+        return f"{self.date} {self.status}: {self.orders} orders, PHP {self.revenue}"
+
+class DailyProductSalesRollup(models.Model):
+    """Units sold and line revenue per day and product"""
+    date = models.DateField()
+    product = models.ForeignKey('Product', on_delete=models.SET_NULL, null=True, related_name='daily_sales')
+    # Kept so history still reads sensibly after a product is renamed or deleted
+    product_name = models.CharField(max_length=200)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('date', 'product')
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"{self.date} {self.product_name}: {self.units} units"
+
+# R E C O M M E N D A T I O N S
+class ProductRecommendation(models.Model):
+    """A product often bought together with another, ranked best first.
+
+    Precomputed from order history by ``manage.py build_recommendations``
+    (see ``shop.recommendations``); the PDP reads a product's rows through
+    the ``(product, rank)`` index.
+    """
+    product = models.ForeignKey('Product', on_delete=models.CASCADE, related_name='recommendations')
+    recommended = models.ForeignKey('Product', on_delete=models.CASCADE, related_name='recommended_for')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField(help_text="Cosine similarity of the two products' orders")
+    built_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ('product', 'rank')
+        ordering = ['product', 'rank']
+
+    def __str__(self):
+        return f"{self.product_id} → {self.recommended_id} (#{self.rank + 1}, {self.score:.3f})"
+
 class Feedback(models.Model):
     """Customer feedback model"""
     
@@ -0,0 +1,208 @@
+"""Sampled request profiling.
+
+A fraction of requests (``SHOP_PROFILE_SAMPLE_RATE``), plus any request
+carrying a valid signed ``X-Shop-Profile`` header, run under cProfile and a
+wall-clock stack sampler (see ``shop.middleware.ProfilingMiddleware``).
+Each profile - slowest functions, collapsed stacks for flamegraphs and SQL
+timings - is written to ``SHOP_PROFILE_DIR``, which keeps only the newest
+``SHOP_PROFILE_KEEP`` profiles. Staff browse them under ``/admin/profiles/``.
+"""
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+PROFILE_HEADER = 'X-Shop-Profile'
+_SIGNING_SALT = 'shop.profiling'
+_PROFILE_ID_RE = re.compile(r'^\d{8}-\d{12}-[0-9a-f]{8}$')
+
+# How many rows of each kind a stored profile keeps
+TOP_FUNCTIONS = 40
+MAX_QUERIES = 200
+
+
+def make_profile_token():
+    """Signed value for the ``X-Shop-Profile`` header, valid for ``SHOP_PROFILE_TOKEN_MAX_AGE`` seconds"""
+    return signing.TimestampSigner(salt=_SIGNING_SALT).sign('profile')
+
+
+def has_profile_token(request):
+    token = request.headers.get(PROFILE_HEADER)
+    if not token:
+        return False
+    try:
+        signing.TimestampSigner(salt=_SIGNING_SALT).unsign(
+            token, max_age=getattr(settings, 'SHOP_PROFILE_TOKEN_MAX_AGE', 60 * 60)
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def profile_reason(request):
+    """Why ``request`` should be profiled (``'header'`` or ``'sample'``), or ``None``"""
+    if has_profile_token(request):
+        return 'header'
+    rate = getattr(settings, 'SHOP_PROFILE_SAMPLE_RATE', 0)
+    if rate > 0 and random.random() < rate:
+        return 'sample'
+    return None
+
+
+def _short_path(filename):
+    """Trim a source path to something readable in a flamegraph"""
+    if 'site-packages' + os.sep in filename:
+        return filename.split('site-packages' + os.sep, 1)[1]
+    base = str(settings.BASE_DIR) + os.sep
+    if filename.startswith(base):
+        return filename[len(base):]
+    return os.path.basename(filename)
+
+
+def _label(filename, line, function):
+    return f"{function} ({_short_path(filename)}:{line})"
+
+
+class StackSampler:
+    """Background thread recording another thread's call stack every ``interval`` seconds.
+
+    Stacks are kept in collapsed form (``outer;inner;innermost``), the input
+    format of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='shop-profile-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None:
+                code = frame.f_code
+                labels.append(_label(code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(labels))] += 1
+
+
+def top_functions(profiler, limit=TOP_FUNCTIONS):
+    """The ``limit`` functions with the highest cumulative time in a cProfile run"""
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {
+            'function': _label(filename, line, function),
+            'calls': calls,
+            'own_ms': round(own * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3),
+        }
+        for (filename, line, function), (primitive_calls, calls, own, cumulative, callers) in rows
+    ]
+
+
+# S T O R E
+
+def profile_dir():
+    return Path(getattr(settings, 'SHOP_PROFILE_DIR', settings.BASE_DIR / 'profiles'))
+
+
+def profile_path(profile_id, extension='json'):
+    """File of a stored profile, or ``None`` for ids that aren't ours (keeps lookups inside the store)"""
+    if not _PROFILE_ID_RE.match(profile_id or ''):
+        return None
+    return profile_dir() / f'{profile_id}.{extension}'
+
+
+def save_profile(request, response, reason, duration, profiler, stacks, queries):
+    """Write one profile to the store and drop the oldest beyond ``SHOP_PROFILE_KEEP``.
+
+    ``queries`` are ``(sql, seconds)`` pairs as collected by ``shop.middleware.QueryRecorder``.
+    """
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    started_at = timezone.now()
+    profile_id = f"{started_at:%Y%m%d-%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+
+    match = getattr(request, 'resolver_match', None)
+    record = {
+        'id': profile_id,
+        'created_at': started_at.isoformat(),
+        'method': request.method,
+        'path': request.get_full_path(),
+        'view': match.view_name if match else None,
+        'status': response.status_code,
+        'reason': reason,
+        'duration_ms': round(duration * 1000, 3),
+        'query_count': len(queries),
+        'sql_ms': round(sum(seconds for sql, seconds in queries) * 1000, 3),
+        'queries': [{'sql': sql, 'ms': round(seconds * 1000, 3)} for sql, seconds in queries[:MAX_QUERIES]],
+        'functions': [],
+        'stacks': dict(stacks),
+    }
+    if profiler is not None:
+        record['functions'] = top_functions(profiler)
+        profiler.dump_stats(directory / f'{profile_id}.prof')
+
+    # Write then rename so the admin page never reads a half-written file
+    target = directory / f'{profile_id}.json'
+    temporary = target.with_suffix('.tmp')
+    temporary.write_text(json.dumps(record))
+    os.replace(temporary, target)
+
+    rotate_profiles(directory, getattr(settings, 'SHOP_PROFILE_KEEP', 200))
+    return profile_id
+
+
+def rotate_profiles(directory, keep):
+    # Ids start with the timestamp, so name order is age order
+    for old in sorted(directory.glob('*.json'))[:-keep or None]:
+        old.unlink(missing_ok=True)
+        old.with_suffix('.prof').unlink(missing_ok=True)
+
+
+def load_profile(profile_id):
+    path = profile_path(profile_id)
+    if path is None or not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def list_profiles():
+    """Stored profiles, newest first, without their bulky detail"""
+    profiles = []
+    for path in sorted(profile_dir().glob('*.json'), reverse=True):
+        try:
+            record = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue  # Rotated away or being replaced
+        for detail in ('queries', 'functions', 'stacks'):
+            record.pop(detail, None)
+        profiles.append(record)
+    return profiles
+
+
+def collapsed_stacks(profile):
+    """Stacks of a profile as flamegraph.pl / speedscope input, one ``stack count`` per line"""
+    return ''.join(f'{stack} {count}\n' for stack, count in sorted(profile['stacks'].items()))
@@ -0,0 +1,152 @@
+"""'Customers also bought' recommendations.
+
+``build_recommendations`` reads which products were bought in the same
+order, scores every co-purchased pair by cosine similarity (orders with
+both / sqrt(orders with one x orders with the other)) with vectorised NumPy
+over the pair list, and stores each product's best
+``SHOP_RECOMMENDATIONS_PER_PRODUCT`` neighbours as ``ProductRecommendation``
+rows. The PDP then reads them with one indexed join (``recommended_products``)
+instead of guessing from the category.
+
+Scoring always covers the whole order history, which is cheap in NumPy;
+what's incremental is the writing: after the first build only products
+bought since the last one, and the products bought with them, whose scores
+shifted as a result, get their rows replaced.
+"""
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import OrderItem, Product, ProductRecommendation
+
+# Orders that were undone don't say anything about what goes together
+EXCLUDED_STATUSES = ('returned', 'refunded')
+
+# Bigger orders (stock-ups, resellers) would add size² pairs of noise
+MAX_ORDER_LINES = 50
+
+WRITE_BATCH = 500
+
+
+def per_product():
+    return getattr(settings, 'SHOP_RECOMMENDATIONS_PER_PRODUCT', 8)
+
+
+def order_lines(since=None):
+    """``(order_id, product_id)`` of every counted order line as an ``n x 2`` array"""
+    lines = OrderItem.objects.filter(product__isnull=False).exclude(order__status__in=EXCLUDED_STATUSES)
+    if since is not None:
+        lines = lines.filter(order__placed_at__gte=since)
+    rows = lines.values_list('order_id', 'product_id').order_by()
+    return np.array(list(rows.iterator(chunk_size=10000)), dtype=np.int64).reshape(-1, 2)
+
+
+def co_purchase_scores(lines):
+    """Score every ordered pair of products bought together in ``lines`` (from ``order_lines``).
+
+    Returns three aligned arrays ``(product, other, score)``.
+    """
+    if not len(lines):
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0)
+
+    # One line per product per order, sorted by order
+    lines = np.unique(lines, axis=0)
+    orders = lines[:, 0]
+    sizes = np.diff(np.r_[np.flatnonzero(np.r_[True, orders[1:] != orders[:-1]]), len(orders)])
+    counted = sizes <= MAX_ORDER_LINES
+    lines, sizes = lines[np.repeat(counted, sizes)], sizes[counted]
+    starts = np.cumsum(sizes) - sizes
+
+    # Products as dense indexes, and how many orders each appears in
+    products, index = np.unique(lines[:, 1], return_inverse=True)
+    orders_with = np.bincount(index)
+
+    # Pair every line with every line of its own order: line i repeats once
+    # per line in its order, against the lines from its order's start on
+    line_sizes = np.repeat(sizes, sizes)
+    left = np.repeat(np.arange(len(lines)), line_sizes)
+    first = np.repeat(np.repeat(starts, sizes), line_sizes)
+    offset = np.arange(len(left)) - np.repeat(np.cumsum(line_sizes) - line_sizes, line_sizes)
+    right = first + offset
+    pairs = left != right
+    a, b = index[left[pairs]], index[right[pairs]]
+
+    # Count each pair once across all orders
+    keys, together = np.unique(a * len(products) + b, return_counts=True)
+    a, b = np.divmod(keys, len(products))
+    score = together / np.sqrt(orders_with[a] * orders_with[b])
+    return products[a], products[b], score
+
+
+def top_neighbours(product, other, score, limit):
+    """Keep the ``limit`` best-scored ``other`` products of each product, with their 0-based rank"""
+    # By product, then best score first, then lowest id so ties are stable between builds
+    order = np.lexsort((other, -score, product))
+    product, other, score = product[order], other[order], score[order]
+    starts = np.flatnonzero(np.r_[True, product[1:] != product[:-1]])
+    rank = np.arange(len(product)) - np.repeat(starts, np.diff(np.r_[starts, len(product)]))
+    kept = rank < limit
+    return product[kept], other[kept], rank[kept], score[kept]
+
+
+def build_recommendations(full=False, limit=None):
+    """Refresh ``ProductRecommendation`` from the order history.
+
+    Only products whose neighbours may have changed since the last build are
+    rewritten, unless ``full`` (or there's no previous build). Returns
+    ``(products, rows)``: products refreshed and recommendation rows written.
+    """
+    limit = limit or per_product()
+    built_at = timezone.now()
+    last_built = None if full else ProductRecommendation.objects.aggregate(last=Max('built_at'))['last']
+
+    product, other, score = co_purchase_scores(order_lines())
+    if last_built is None:
+        # Products that lost all their pairs (e.g. orders since refunded) lose their old rows too
+        built = ProductRecommendation.objects.values_list('product_id', flat=True).distinct()
+        stale = np.union1d(product, np.array(list(built), dtype=np.int64))
+    else:
+        bought = np.unique(order_lines(since=last_built)[:, 1])
+        # Their neighbours' scores moved too: the norms of the bought products changed
+        stale = np.union1d(bought, product[np.isin(other, bought)])
+
+    product, other, rank, score = top_neighbours(product, other, score, limit)
+    wanted = np.isin(product, stale)
+    product, other, rank, score = product[wanted], other[wanted], rank[wanted], score[wanted]
+
+    stale = stale.tolist()
+    rows = 0
+    for start in range(0, len(stale), WRITE_BATCH):
+        batch = stale[start:start + WRITE_BATCH]
+        selected = np.isin(product, batch)
+        recommendations = [
+            ProductRecommendation(product_id=p, recommended_id=o, rank=r, score=s, built_at=built_at)
+            for p, o, r, s in zip(
+                product[selected].tolist(), other[selected].tolist(), rank[selected].tolist(), score[selected].tolist()
+            )
+        ]
+        # Readers see either the old or the new list of a product, never half of each
+        with transaction.atomic():
+            ProductRecommendation.objects.filter(product_id__in=batch).delete()
+            ProductRecommendation.objects.bulk_create(recommendations)
+        rows += len(recommendations)
+    return len(stale), rows
+
+
+def recommended_products(product, limit):
+    """Active products bought together with ``product``, topped up from its category when there are too few.
+
+    One join query while the precomputed list has ``limit`` active products.
+    """
+    recommended = list(
+        Product.objects.filter(recommended_for__product=product, is_active=True)
+        .order_by('recommended_for__rank')[:limit]
+    )
+    if len(recommended) < limit:
+        recommended += (
+            Product.objects.filter(category=product.category, is_active=True)
+            .exclude(pk__in=[product.pk, *(other.pk for other in recommended)])[:limit - len(recommended)]
+        )
+    return recommended
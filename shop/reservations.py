@@ -0,0 +1,101 @@
+"""Time-limited stock holds taken when a customer starts checkout.
+
+Available-to-sell is ``Product.stock_quantity`` minus every live hold placed
+by *other* carts, so a customer never competes with their own hold. Holds
+are converted into real stock decrements by ``shop.checkout.place_order``.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .checkout import InsufficientStock
+from .models import Product, StockReservation
+
+
+def reservation_ttl():
+    return timedelta(seconds=getattr(settings, 'SHOP_STOCK_RESERVATION_TTL', 600))
+
+
+def live_reservations(now=None):
+    return StockReservation.objects.filter(expires_at__gt=now or timezone.now())
+
+
+def held_quantities(product_ids, exclude_cart=None):
+    """Map product id to the units held by live reservations, in one query"""
+    holds = live_reservations().filter(product_id__in=product_ids)
+    if exclude_cart is not None:
+        holds = holds.exclude(cart=exclude_cart)
+    return dict(holds.values_list('product_id').annotate(total=Sum('quantity')).order_by())
+
+
+def held_subquery(exclude_cart=None):
+    """Units held by live reservations, as an annotation for a ``Product`` queryset"""
+    holds = live_reservations().filter(product=OuterRef('pk'))
+    if exclude_cart is not None:
+        holds = holds.exclude(cart=exclude_cart)
+    total = holds.values('product').annotate(total=Sum('quantity')).values('total')[:1]
+    return Coalesce(Subquery(total), 0)
+
+
+def available_quantities(products, cart=None):
+    """Map product id to available-to-sell units for ``products``.
+
+    Holds belonging to ``cart`` are not subtracted.
+    """
+    held = held_quantities([product.pk for product in products], exclude_cart=cart)
+    return {product.pk: max(0, product.stock_quantity - held.get(product.pk, 0)) for product in products}
+
+
+def available_quantity(product, cart=None):
+    return available_quantities([product], cart)[product.pk]
+
+
+def reserve_items(cart, items):
+    """Hold stock for cart ``items`` until the reservation TTL runs out.
+
+    Re-reserving refreshes the hold. Raises ``InsufficientStock`` without
+    holding anything if any line exceeds what other carts left available.
+    """
+    items = sorted(items, key=lambda item: item.product_id)
+    product_ids = [item.product_id for item in items]
+    now = timezone.now()
+
+    with transaction.atomic():
+        # Lock the products so two carts can't both claim the last units
+        products = {
+            product.pk: product
+            for product in Product.objects.select_for_update().filter(pk__in=product_ids).order_by('pk')
+        }
+        available = available_quantities(products.values(), cart)
+        for item in items:
+            if item.quantity > available.get(item.product_id, 0):
+                raise InsufficientStock(item.product, item.quantity)
+
+        StockReservation.objects.filter(cart=cart, product_id__in=product_ids).delete()
+        StockReservation.objects.bulk_create([
+            StockReservation(
+                cart=cart,
+                product_id=item.product_id,
+                quantity=item.quantity,
+                expires_at=now + reservation_ttl(),
+            )
+            for item in items
+        ])
+
+
+def release_reservations(cart, product_ids=None):
+    """Drop the holds of ``cart``, or only those for ``product_ids``"""
+    holds = StockReservation.objects.filter(cart=cart)
+    if product_ids is not None:
+        holds = holds.filter(product_id__in=product_ids)
+    holds.delete()
+
+
+def purge_expired_reservations(now=None):
+    """Delete expired holds; returns how many were removed"""
+    deleted, _ = StockReservation.objects.filter(expires_at__lte=now or timezone.now()).delete()
+    return deleted
@@ -0,0 +1,128 @@
+"""Daily sales rollups.
+
+``DailySalesRollup`` and ``DailyProductSalesRollup`` are kept current as
+orders are placed, edited and deleted (see ``shop.signals`` and
+``shop.checkout``), so the admin analytics only ever read one row per day
+instead of aggregating the whole order history. ``rebuild_rollups`` recomputes
+them from scratch for when they drift (raw SQL edits, ``QuerySet.update``).
+"""
+from datetime import date
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyProductSalesRollup, DailySalesRollup, Order, OrderItem
+
+
+def rollup_date(moment):
+    """Calendar day, in the shop's time zone, a timestamp is counted under"""
+    return timezone.localdate(moment)
+
+
+def dashboard_start(months=12, today=None):
+    """First day of the oldest month an analytics dashboard covers (this month and the ``months - 1`` before it)"""
+    today = today or timezone.localdate()
+    year, month = divmod(today.year * 12 + today.month - months, 12)
+    return date(year, month + 1, 1)
+
+
+def _add(model, lookup, defaults=None, **deltas):
+    """Add ``deltas`` to the rollup row matching ``lookup``, creating it if needed"""
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if model.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **(defaults or {}), **deltas)
+    except IntegrityError:
+        # A concurrent order created the row first
+        model.objects.filter(**lookup).update(**changes)
+
+
+def add_order(placed_at, status, total_amount, sign=1):
+    """Count (``sign=1``) or uncount (``sign=-1``) one order"""
+    _add(
+        DailySalesRollup,
+        {'date': rollup_date(placed_at), 'status': status},
+        orders=sign,
+        revenue=sign * total_amount,
+    )
+
+
+def add_order_line(placed_at, product_id, product_name, quantity, price, sign=1):
+    """Count or uncount one order line.
+
+    Lines whose product was deleted are left out: the rows of deleted
+    products all share a NULL ``product``, so there is no telling which one
+    such a line was counted in. ``rebuild_rollups`` recounts them.
+    """
+    if product_id is None:
+        return
+    _add(
+        DailyProductSalesRollup,
+        {'date': rollup_date(placed_at), 'product_id': product_id},
+        {'product_name': product_name},
+        units=sign * quantity,
+        revenue=sign * quantity * price,
+    )
+
+
+def add_order_items(order, items):
+    """Count the lines of a freshly placed order (``bulk_create`` sends no signals)"""
+    for item in items:
+        add_order_line(order.placed_at, item.product_id, item.product.name, item.quantity, item.price)
+
+
+def rebuild_rollups(since=None):
+    """Recompute the rollups from orders, for every day or from ``since`` on.
+
+    Returns ``(days, product_days)``, the number of rollup rows written.
+    """
+    tz = timezone.get_current_timezone()
+    orders = Order.objects.all()
+    items = OrderItem.objects.all()
+    sales_rollups = DailySalesRollup.objects.all()
+    product_rollups = DailyProductSalesRollup.objects.all()
+    if since:
+        orders = orders.filter(placed_at__date__gte=since)
+        items = items.filter(order__placed_at__date__gte=since)
+        sales_rollups = sales_rollups.filter(date__gte=since)
+        product_rollups = product_rollups.filter(date__gte=since)
+
+    order_rows = (
+        orders.annotate(day=TruncDate('placed_at', tzinfo=tz))
+        .values('day', 'status')
+        .annotate(count=Count('id'), total=Sum('total_amount'))
+        .order_by()
+    )
+    line_rows = (
+        items.annotate(day=TruncDate('order__placed_at', tzinfo=tz))
+        .values('day', 'product_id')
+        .annotate(
+            name=Max('product__name'),
+            units=Sum('quantity'),
+            total=Sum(F('price') * F('quantity'), output_field=DecimalField(max_digits=14, decimal_places=2)),
+        )
+        .order_by()
+    )
+
+    with transaction.atomic():
+        sales_rollups.delete()
+        product_rollups.delete()
+        days = DailySalesRollup.objects.bulk_create([
+            DailySalesRollup(date=row['day'], status=row['status'], orders=row['count'], revenue=row['total'] or 0)
+            for row in order_rows
+        ], batch_size=1000)
+        product_days = DailyProductSalesRollup.objects.bulk_create([
+            DailyProductSalesRollup(
+                date=row['day'],
+                product_id=row['product_id'],
+                product_name=row['name'] or 'Deleted Product',
+                units=row['units'],
+                revenue=row['total'] or 0,
+            )
+            for row in line_rows
+        ], batch_size=1000)
+    return len(days), len(product_days)
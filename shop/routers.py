@@ -0,0 +1,107 @@
+"""Send catalog and admin analytics reads to read replicas.
+
+Inside a request (see ``shop.middleware.ReplicaRoutingMiddleware``) reads of
+the catalog models go to one of ``SHOP_READ_REPLICAS``, and so does every
+read made inside ``replica_reads()`` (the admin dashboards). Everything
+else stays on the primary:
+
+* all writes, and reads inside a transaction on the primary
+* the rest of a request once it has written anything
+* visitors who wrote within the last ``SHOP_REPLICA_STICKY_SECONDS``, so
+  they read their own writes instead of a lagging replica
+* management commands, the shell and anything else outside a request
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Models whose reads may be served by a replica during storefront requests
+CATALOG_MODELS = {'shop.product', 'shop.productrecommendation'}
+
+# Cookie marking a visitor who wrote recently
+STICKY_COOKIE = 'shop_primary'
+
+
+class ReadState:
+    """Where the current request may read from"""
+
+    def __init__(self, catalog=True, pinned=False):
+        self.catalog = catalog  # Catalog models may come from a replica
+        self.analytics = False  # Every model may come from a replica (inside replica_reads)
+        self.pinned = pinned  # Read-your-writes: this visitor wrote recently
+        self.wrote = False  # Something was written during this request
+
+
+_state = ContextVar('shop_read_state', default=None)
+
+
+def read_replicas():
+    return getattr(settings, 'SHOP_READ_REPLICAS', [])
+
+
+def begin_request(catalog=True, pinned=False):
+    """Start routing reads for one request; pass the returned token to ``end_request``"""
+    return _state.set(ReadState(catalog=catalog, pinned=pinned))
+
+
+def end_request(token):
+    """Finish the request started by ``begin_request``; returns whether it wrote anything"""
+    state = _state.get()
+    _state.reset(token)
+    return state is not None and state.wrote
+
+
+@contextmanager
+def replica_reads():
+    """Let every read in the block use a replica (for reports that tolerate replication lag)"""
+    state = _state.get()
+    token = None
+    if state is None:
+        token = _state.set(ReadState(catalog=False))
+        state = _state.get()
+    previous, state.analytics = state.analytics, True
+    try:
+        yield
+    finally:
+        state.analytics = previous
+        if token is not None:
+            _state.reset(token)
+
+
+class ReplicaRouter:
+    """Database router implementing the rules in the module docstring"""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        replicas = read_replicas()
+        if state is None or not replicas or state.pinned or state.wrote:
+            return None
+        if not (state.analytics or (state.catalog and model._meta.label_lower in CATALOG_MODELS)):
+            return None
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # Related objects come from wherever their parent was read
+            return instance._state.db
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        # Saving the session happens on almost every request and isn't something the visitor reads back
+        if state is not None and model._meta.app_label != 'sessions':
+            state.wrote = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from replication
+        if db in read_replicas():
+            return False
+        return None
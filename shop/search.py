@@ -0,0 +1,303 @@
+"""Catalog search backends.
+
+Every backend answers the same question: which active products match a
+query, best match first. Views never talk to a backend directly, they go
+through ``filter_by_search`` so the backend can be swapped with the
+``SHOP_SEARCH_BACKEND`` setting.
+"""
+import bisect
+import heapq
+import math
+import operator
+import re
+import threading
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .cache import get_catalog_version
+
+TOKEN_RE = re.compile(r'[^\W_]+')
+
+# Words in the product name count this many times more than description words
+NAME_WEIGHT = 2
+
+# Upper bound on how many dictionary terms the last (still being typed) query word may expand to
+MAX_PREFIX_EXPANSIONS = 50
+
+# Products saved this long before the last sync are read again, for transactions committed late
+SYNC_OVERLAP = timedelta(minutes=1)
+
+
+def tokenize(text):
+    """Split text into lowercase alphanumeric terms"""
+    return TOKEN_RE.findall((text or '').lower())
+
+
+class BaseSearchBackend:
+    """Interface shared by all search backends"""
+
+    def search(self, query, limit=None):
+        """Return ids of active products matching ``query``, best match first"""
+        raise NotImplementedError
+
+    def index_product(self, product):
+        """Add or refresh a single product in the index"""
+
+    def remove_product(self, product_id):
+        """Drop a single product from the index"""
+
+    def rebuild(self):
+        """Re-index the whole catalog"""
+
+
+class InvertedIndexBackend(BaseSearchBackend):
+    """In-process inverted index ranked with Okapi BM25.
+
+    The index is built lazily from the database on first use and kept current
+    by the ``Product`` save/delete signals. Other worker processes cannot see
+    those signals, so each search also compares the shared catalog version
+    (``shop.cache``) with the one the index last caught up with; when it has
+    moved, only the products modified since then are re-read and re-indexed.
+    Products deleted elsewhere linger in the index, which is harmless: ids
+    are always matched against the database.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = defaultdict(dict)  # term -> {product_id: weighted term frequency}
+        self._doc_terms = {}  # product_id -> {term: weighted term frequency}
+        self._doc_lengths = {}  # product_id -> weighted document length
+        self._doc_norms = {}  # product_id -> BM25 length normalisation, precomputed per document
+        self._average_length = 0
+        self._total_length = 0
+        self._sorted_terms = []
+        self._terms_dirty = False
+        self._built = False
+        self._version = None  # Catalog version the index has caught up with
+        self._synced_at = None  # When the products read for that version were read
+
+    # Indexing
+
+    def rebuild(self):
+        from .models import Product
+
+        version, synced_at = get_catalog_version(), timezone.now()
+        rows = Product.objects.filter(is_active=True).values_list('id', 'name', 'description')
+        with self._lock:
+            self._postings = defaultdict(dict)
+            self._doc_terms = {}
+            self._doc_lengths = {}
+            self._doc_norms = {}
+            self._total_length = 0
+            for product_id, name, description in rows.iterator(chunk_size=2000):
+                self._add_document(product_id, name, description)
+            self._average_length = self._total_length / len(self._doc_lengths) if self._doc_lengths else 0
+            self._doc_norms = {pid: self._norm(length) for pid, length in self._doc_lengths.items()}
+            self._sorted_terms = sorted(self._postings)
+            self._terms_dirty = False
+            self._built = True
+            self._version, self._synced_at = version, synced_at
+
+    def index_product(self, product):
+        with self._lock:
+            if not self._built:
+                # Nothing to keep in sync yet, the first search builds everything
+                return
+            self._remove_document(product.pk)
+            if product.is_active:
+                self._add_document(product.pk, product.name, product.description)
+            self._terms_dirty = True
+
+    def remove_product(self, product_id):
+        with self._lock:
+            if not self._built:
+                return
+            self._remove_document(product_id)
+            self._terms_dirty = True
+
+    def _add_document(self, product_id, name, description):
+        frequencies = defaultdict(int)
+        for term in tokenize(name):
+            frequencies[term] += NAME_WEIGHT
+        for term in tokenize(description):
+            frequencies[term] += 1
+        if not frequencies:
+            return
+
+        length = sum(frequencies.values())
+        self._doc_terms[product_id] = dict(frequencies)
+        self._doc_lengths[product_id] = length
+        self._total_length += length
+        # Incremental updates reuse the average from the last rebuild (the document's own length if there was none)
+        self._doc_norms[product_id] = self._norm(length)
+        for term, frequency in frequencies.items():
+            self._postings[term][product_id] = frequency
+
+    def _remove_document(self, product_id):
+        terms = self._doc_terms.pop(product_id, None)
+        if terms is None:
+            return
+        self._total_length -= self._doc_lengths.pop(product_id)
+        self._doc_norms.pop(product_id, None)
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(product_id, None)
+            if not postings:
+                del self._postings[term]
+
+    def _norm(self, length):
+        average_length = self._average_length or length
+        return self.k1 * (1 - self.b + self.b * length / average_length)
+
+    def _ensure_fresh(self):
+        """Build the index on first use, then catch up with products other processes changed"""
+        from .models import Product
+
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self.rebuild()
+            return
+        version = get_catalog_version()
+        if version == self._version:
+            return
+
+        # Read outside the lock so searches keep using the current index meanwhile
+        synced_at = timezone.now()
+        rows = list(
+            Product.objects.filter(modified_at__gte=self._synced_at - SYNC_OVERLAP)
+            .values_list('id', 'name', 'description', 'is_active')
+        )
+        with self._lock:
+            for product_id, name, description, is_active in rows:
+                self._remove_document(product_id)
+                if is_active:
+                    self._add_document(product_id, name, description)
+            self._terms_dirty = self._terms_dirty or bool(rows)
+            self._version, self._synced_at = version, synced_at
+
+    # Querying
+
+    def _expand_prefix(self, prefix):
+        """Return indexed terms starting with ``prefix`` (search-as-you-type)"""
+        if self._terms_dirty:
+            self._sorted_terms = sorted(self._postings)
+            self._terms_dirty = False
+        start = bisect.bisect_left(self._sorted_terms, prefix)
+        expansions = []
+        for term in self._sorted_terms[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not term.startswith(prefix):
+                break
+            expansions.append(term)
+        return expansions
+
+    def _score_terms(self, terms):
+        """BM25 score of every document containing at least one of ``terms``"""
+        doc_count = len(self._doc_lengths)
+        norms = self._doc_norms
+        boost = self.k1 + 1
+        scores = defaultdict(float)
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for product_id, frequency in postings.items():
+                scores[product_id] += idf * frequency * boost / (frequency + norms[product_id])
+        return scores
+
+    def search(self, query, limit=None):
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        self._ensure_fresh()
+        with self._lock:
+            # Every query word must match; the last one may still be half typed
+            totals = None
+            for position, term in enumerate(terms):
+                if position == len(terms) - 1:
+                    candidates = self._expand_prefix(term)
+                else:
+                    candidates = [term]
+                scores = self._score_terms(candidates)
+                if totals is None:
+                    totals = scores
+                else:
+                    totals = {pid: totals[pid] + score for pid, score in scores.items() if pid in totals}
+                if not totals:
+                    return []
+
+        by_score = operator.itemgetter(1)
+        if limit:
+            ranked = heapq.nlargest(limit, totals.items(), key=by_score)
+        else:
+            ranked = sorted(totals.items(), key=by_score, reverse=True)
+        return [product_id for product_id, score in ranked]
+
+
+class MySQLFullTextBackend(BaseSearchBackend):
+    """Delegate to the ``shop_product_search_ft`` FULLTEXT index on MySQL.
+
+    MySQL keeps the index up to date itself, so the indexing hooks are no-ops.
+    """
+
+    def search(self, query, limit=None):
+        from .models import Product
+
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        # Boolean mode: every word required, the last one as a prefix
+        boolean_query = ' '.join(f'+{term}' for term in terms[:-1])
+        boolean_query = f'{boolean_query} +{terms[-1]}*'.strip()
+
+        sql = (
+            f'SELECT id FROM {Product._meta.db_table} '
+            'WHERE is_active = 1 AND MATCH(name, description) AGAINST (%s IN BOOLEAN MODE) '
+            'ORDER BY MATCH(name, description) AGAINST (%s IN BOOLEAN MODE) DESC, id'
+        )
+        params = [boolean_query, boolean_query]
+        if limit:
+            sql += ' LIMIT %s'
+            params.append(limit)
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_search_backend():
+    """Return the process-wide backend configured by ``SHOP_SEARCH_BACKEND``"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                path = getattr(settings, 'SHOP_SEARCH_BACKEND', 'shop.search.InvertedIndexBackend')
+                _backend = import_string(path)()
+    return _backend
+
+
+def search_product_ids(query):
+    """Ids of every matching product, best match first (pages are cut from the listing, not here)"""
+    return get_search_backend().search(query)
+
+
+def filter_by_search(queryset, query):
+    """Restrict a product queryset to the ids the search backend matched"""
+    return queryset.filter(pk__in=search_product_ids(query))
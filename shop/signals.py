@@ -0,0 +1,185 @@
+import logging
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from .cache import bump_catalog_version
+from .carts import merge_session_cart, reprice_items
+from .currency import BASE_CURRENCY, set_currency
+from .images import delete_derivatives, generate_derivatives, needs_derivatives
+from .models import Order, OrderItem, Product, UserProfile
+from .rollups import add_order, add_order_line
+from .search import get_search_backend
+
+logger = logging.getLogger(__name__)
+
+# C A T A L O G   V E R S I O N
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def bump_catalog_version_on_change(sender, **kwargs):
+    """Invalidate cached catalog fragments; also covers ProductAdmin list_editable saves"""
+    transaction.on_commit(bump_catalog_version)
+
+# S E A R C H
+@receiver(post_save, sender=Product)
+def index_product_on_save(sender, instance, **kwargs):
+    """Keep the search index in sync once the save is committed"""
+    transaction.on_commit(lambda: get_search_backend().index_product(instance))
+
+@receiver(post_delete, sender=Product)
+def remove_product_on_delete(sender, instance, **kwargs):
+    """Drop deleted products from the search index"""
+    product_id = instance.pk
+    transaction.on_commit(lambda: get_search_backend().remove_product(product_id))
+
+# I M A G E S
+def _ensure_derivatives(field_file):
+    if not field_file:
+        return
+    try:
+        if needs_derivatives(field_file.name):
+            generate_derivatives(field_file.name, force=True)
+    except OSError:
+        # Missing or unreadable file: keep serving the original, the backfill command can retry
+        logger.warning("Could not generate derivatives for %s", field_file.name, exc_info=True)
+
+def _loaded_file_name(instance, field_name):
+    """Stored name of a file field as loaded, without touching deferred fields (None when not loaded)"""
+    value = instance.__dict__.get(field_name)
+    return getattr(value, 'name', value)
+
+def _discard_derivatives(model, field_name, name):
+    """Delete the derivatives of ``name`` unless another row still points at the same file"""
+    if not name or model._default_manager.filter(**{field_name: name}).exists():
+        return
+    try:
+        delete_derivatives(name)
+    except OSError:
+        logger.warning("Could not delete derivatives of %s", name, exc_info=True)
+
+def _discard_replaced_derivatives(instance, field_name):
+    old_name = instance._loaded_image_name
+    new_name = _loaded_file_name(instance, field_name)
+    instance._loaded_image_name = new_name
+    # A re-upload under the same name is picked up by needs_derivatives instead
+    if old_name and old_name != new_name:
+        transaction.on_commit(lambda: _discard_derivatives(type(instance), field_name, old_name))
+
+@receiver(post_init, sender=Product)
+def remember_product_image(sender, instance, **kwargs):
+    instance._loaded_image_name = _loaded_file_name(instance, 'image')
+
+@receiver(post_init, sender=UserProfile)
+def remember_profile_picture(sender, instance, **kwargs):
+    instance._loaded_image_name = _loaded_file_name(instance, 'profile_picture')
+
+@receiver(post_save, sender=Product)
+def generate_product_image_derivatives(sender, instance, **kwargs):
+    """Create responsive thumbnails when a product image is uploaded or replaced"""
+    image = instance.image
+    transaction.on_commit(lambda: _ensure_derivatives(image))
+    _discard_replaced_derivatives(instance, 'image')
+
+@receiver(post_save, sender=UserProfile)
+def generate_profile_picture_derivatives(sender, instance, **kwargs):
+    """Create responsive thumbnails when a profile picture is uploaded or replaced"""
+    picture = instance.profile_picture
+    transaction.on_commit(lambda: _ensure_derivatives(picture))
+    _discard_replaced_derivatives(instance, 'profile_picture')
+
+@receiver(post_delete, sender=Product)
+def delete_product_image_derivatives(sender, instance, **kwargs):
+    """Originals are kept (Django never deletes them); their resized copies go with the row"""
+    name = _loaded_file_name(instance, 'image')
+    transaction.on_commit(lambda: _discard_derivatives(Product, 'image', name))
+
+@receiver(post_delete, sender=UserProfile)
+def delete_profile_picture_derivatives(sender, instance, **kwargs):
+    name = _loaded_file_name(instance, 'profile_picture')
+    transaction.on_commit(lambda: _discard_derivatives(UserProfile, 'profile_picture', name))
+
+# C A R T
+@receiver(post_init, sender=Product)
+def remember_product_price(sender, instance, **kwargs):
+    instance._loaded_price = instance.__dict__.get('price')
+
+@receiver(post_save, sender=Product)
+def reprice_cart_items_on_price_change(sender, instance, created, raw=False, **kwargs):
+    """Open cart lines follow the product price, which is what checkout charges"""
+    price = instance.__dict__.get('price')
+    if created or raw or price == instance._loaded_price:
+        return
+    instance._loaded_price = price
+    product_id = instance.pk
+    transaction.on_commit(lambda: reprice_items([product_id]))
+
+@receiver(user_logged_in)
+def merge_cart_on_login(sender, request, user, **kwargs):
+    """Merge the anonymous session cart into the user's cart (api/login, api/register, admin)"""
+    if request is not None and hasattr(request, 'session'):
+        merge_session_cart(request, user)
+
+# C U R R E N C Y
+@receiver(user_logged_in)
+def remember_currency_on_login(sender, request, user, **kwargs):
+    """Read the preferred currency while the login writes the session anyway, not on the first page after it"""
+    if request is not None and hasattr(request, 'session'):
+        preference = UserProfile.objects.filter(user=user).values_list('preferred_currency', flat=True).first()
+        set_currency(request, preference or BASE_CURRENCY)
+
+# S A L E S   R O L L U P S
+@receiver(post_init, sender=Order)
+def remember_order_rollup_state(sender, instance, **kwargs):
+    """Keep what the rollups currently count for this order, to diff against on save"""
+    instance._rollup_state = (instance.placed_at, instance.status, instance.total_amount)
+
+@receiver(post_save, sender=Order)
+def update_sales_rollups_on_order_save(sender, instance, created, raw=False, **kwargs):
+    """Count new orders; move edited ones between statuses (e.g. admin list_editable)"""
+    if raw:
+        return
+    state = (instance.placed_at, instance.status, instance.total_amount)
+    if created:
+        add_order(*state)
+    elif state != instance._rollup_state and instance._rollup_state[0] is not None:
+        add_order(*instance._rollup_state, sign=-1)
+        add_order(*state)
+    instance._rollup_state = state
+
+@receiver(post_delete, sender=Order)
+def update_sales_rollups_on_order_delete(sender, instance, **kwargs):
+    if instance._rollup_state[0] is not None:
+        add_order(*instance._rollup_state, sign=-1)
+
+@receiver(post_init, sender=OrderItem)
+def remember_order_item_rollup_state(sender, instance, **kwargs):
+    instance._rollup_state = (instance.product_id, instance.quantity, instance.price)
+
+def _order_placed_at(order_id):
+    return Order.objects.filter(pk=order_id).values_list('placed_at', flat=True).first()
+
+def _product_name(product_id):
+    name = Product.objects.filter(pk=product_id).values_list('name', flat=True).first()
+    return name or 'Deleted Product'
+
+@receiver(post_save, sender=OrderItem)
+def update_product_rollups_on_item_save(sender, instance, created, raw=False, **kwargs):
+    """Lines added or edited one at a time (admin); checkout's bulk lines are counted by place_order"""
+    state = (instance.product_id, instance.quantity, instance.price)
+    if raw or (not created and state == instance._rollup_state):
+        return
+    placed_at = _order_placed_at(instance.order_id)
+    if placed_at is not None:
+        if not created:
+            product_id, quantity, price = instance._rollup_state
+            add_order_line(placed_at, product_id, _product_name(product_id), quantity, price, sign=-1)
+        add_order_line(placed_at, instance.product_id, _product_name(instance.product_id), instance.quantity, instance.price)
+    instance._rollup_state = state
+
+@receiver(post_delete, sender=OrderItem)
+def update_product_rollups_on_item_delete(sender, instance, **kwargs):
+    # Cascaded deletes remove lines before their order, so the order is still readable here
+    placed_at = _order_placed_at(instance.order_id)
+    if placed_at is not None:
+        product_id, quantity, price = instance._rollup_state
+        add_order_line(placed_at, product_id, _product_name(product_id), quantity, price, sign=-1)
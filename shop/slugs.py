@@ -0,0 +1,85 @@
+"""Unique product slug allocation.
+
+Finding a free slug takes one query however many ``notebook``,
+``notebook-1``, ``notebook-2``... already exist: every slug sharing the
+base is fetched at once and the next suffix is picked in Python.
+"""
+import re
+
+from django.db.models import Q
+from django.utils.text import slugify
+
+
+def slug_base(value):
+    return slugify(value) or 'product'
+
+
+def _suffix_pattern(base):
+    return re.compile(rf'{re.escape(base)}-([0-9]+)')
+
+
+def _next_free(base, taken):
+    if base not in taken:
+        return base
+    pattern = _suffix_pattern(base)
+    used = {int(match.group(1)) for slug in taken if (match := pattern.fullmatch(slug))}
+    suffix = 1
+    while suffix in used:
+        suffix += 1
+    return f"{base}-{suffix}"
+
+
+def colliding_slugs(queryset, bases):
+    """Existing slugs equal to one of ``bases`` or ``<base>-N``, in one query"""
+    condition = Q()
+    for base in bases:
+        # startswith keeps the lookup on the slug index; the suffix is checked in Python
+        condition |= Q(slug=base) | Q(slug__startswith=f"{base}-")
+    if not condition:
+        return set()
+    return set(queryset.filter(condition).values_list('slug', flat=True))
+
+
+def unique_slug(queryset, value):
+    """Next free slug for ``value`` among ``queryset`` (exclude the instance being saved)"""
+    base = slug_base(value)
+    return _next_free(base, colliding_slugs(queryset, [base]))
+
+
+class SlugAllocator:
+    """Hand out unique slugs for many names without a query per name.
+
+    The first ``Notebook`` gets ``notebook``, the next ``notebook-1`` and so
+    on, skipping anything already in ``taken``.
+    """
+
+    def __init__(self, taken=()):
+        self._taken = set(taken)
+        self._next_suffix = {}
+
+    @classmethod
+    def for_values(cls, queryset, values):
+        """Allocator that also avoids every slug in ``queryset`` that ``values`` could collide with"""
+        return cls(colliding_slugs(queryset, {slug_base(value) for value in values}))
+
+    def allocate(self, value):
+        """Return a unique slug for ``value`` (a name or a requested slug) and reserve it"""
+        base = slug_base(value)
+        slug = base
+        if slug in self._taken:
+            suffix = self._next_suffix.get(base, 1)
+            while f"{base}-{suffix}" in self._taken:
+                suffix += 1
+            slug = f"{base}-{suffix}"
+            self._next_suffix[base] = suffix + 1
+        self._taken.add(slug)
+        return slug
+
+
+def allocate_slugs(queryset, instances, field='name'):
+    """Fill in missing slugs on unsaved ``instances`` before a ``bulk_create``"""
+    pending = [instance for instance in instances if not instance.slug]
+    allocator = SlugAllocator.for_values(queryset, [getattr(instance, field) for instance in pending])
+    for instance in pending:
+        instance.slug = allocator.allocate(getattr(instance, field))
+    return instances
@@ -81,6 +81,7 @@ const initializeCartPage = () => {
         
         // Function to update cart totals based on SELECTED items only
         const updateCartTotals = () => {
+            const currency = document.querySelector('.cart-summary')?.dataset.currency || 'PHP';
             let subtotal = 0;
             let selectedItemsCount = 0;
             const cartItems = document.querySelectorAll('.cart-list-item');
@@ -93,7 +94,7 @@ const initializeCartPage = () => {
                 // Only count if checkbox is checked
                 if (checkbox && checkbox.checked && quantityInput && priceElement) {
                     const quantity = parseInt(quantityInput.value) || 0;
-                    const price = parseFloat(priceElement.textContent.replace('PHP ', '').replace(',', '')) || 0;
+                    const price = parseFloat(priceElement.textContent.replace(/[^\d.]/g, '')) || 0;
                     subtotal += quantity * price;
                     selectedItemsCount++;
                 }
@@ -106,12 +107,12 @@ const initializeCartPage = () => {
             const checkoutButton = document.querySelector('.cart-summary-proceed_to_checkout');
             
             if (subtotalElement) {
-                subtotalElement.textContent = `PHP ${subtotal.toFixed(2)}`;
+                subtotalElement.textContent = `${currency} ${subtotal.toFixed(2)}`;
             }
             
             if (totalElement && shippingElement) {
-                const shipping = parseFloat(shippingElement.textContent.replace('PHP ', '')) || 0;
-                totalElement.textContent = `PHP ${(subtotal + shipping).toFixed(2)}`;
+                const shipping = parseFloat(shippingElement.textContent.replace(/[^\d.]/g, '')) || 0;
+                totalElement.textContent = `${currency} ${(subtotal + shipping).toFixed(2)}`;
             }
             
             // Enable/disable checkout button based on selection
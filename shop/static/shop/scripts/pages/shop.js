@@ -64,105 +64,45 @@ const initializeShopPage = () => {
         const sidebarForm = document.querySelector('.shop-sidebar form');
         const modalForm = document.querySelector('.modal form');
 
-        const renderProductCard = (product) => {
-            
-            let stockClass = 'in_stock';
-            if (!product.is_active) {
-                stockClass = 'discontinued';
-            } else if (product.stock_quantity === 0) {
-                stockClass = 'out_of_stock';
-            } else if (product.stock_quantity <= 5) {
-                stockClass = 'low_stock';
-            }
-        
-            const getCookie = (name) => {
-                let cookieValue = null;
-                if (document.cookie && document.cookie !== '') {
-                    const cookies = document.cookie.split(';');
-                    for (let i = 0; i < cookies.length; i++) {
-                        const cookie = cookies[i].trim();
-                        if (cookie.substring(0, name.length + 1) === (name + '=')) {
-                            cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
-                            break;
-                        }
-                    }
-                }
-                return cookieValue;
-            };
-        
-            const truncateWords = (text, wordCount) => {
-                const words = text.split(' ');
-                if (words.length > wordCount) {
-                    return words.slice(0, wordCount).join(' ') + '...';
-                }
-                return text;
-            };
-        
-            const canAddToCart = product.is_in_stock && product.stock_quantity > 0 && product.is_active;
-        
-            return `
-                <div class="product_card">
-                    <div class="product_card-image-container">
-                        <img class="product_card-image" src="${product.image_url}" alt="${product.name} product image" />
-                    </div>
-                    
-                    <div class="product_card-wrapper">
-                        <div class="product_card-info">
-                            <small class="product_card-info-status">
-                                <span class="${stockClass}">
-                                    ${product.stock_status}
-                                </span>
-                                <i class="fa-solid fa-circle"></i>
-                                ${product.category_display}
-                            </small>
-                            <h4 class="product_card-info-label">
-                                ${product.name}
-                            </h4>
-                            <p class="product_card-info-description">
-                                ${truncateWords(product.description, 20)}
-                            </p>
-                        </div>
-                        <h3 class="product_card-price">
-                            PHP ${product.price}
-                        </h3>
-        
-                        <div class="product_card-ctas">
-                            ${canAddToCart ? `
-                                <form method="post" action="/cart/add/" class="product_card-add_to_cart_form" style="display:flex; gap:0.5rem; width:100%;">
-                                    <input type="hidden" name="csrfmiddlewaretoken" value="${getCookie('csrftoken')}">
-                                    <input type="hidden" name="product_id" value="${product.id}">
-                                    <input type="hidden" name="quantity" value="1">
-                                    <button type="submit" class="button-secondary product_card-ctas-primary_btn">
-                                        <i class="fa-solid fa-cart-shopping"></i>
-                                        Add to cart
-                                    </button>
-                                </form>
-                            ` : `
-                                <button class="button-secondary product_card-ctas-primary_btn" disabled>
-                                    <i class="fa-solid fa-exclamation-triangle"></i>
-                                    ${product.stock_status}
-                                </button>
-                            `}
-                            <a href="${product.url}" class="button-icon_outlined product_card-ctas-secondary_btn">
-                                <i class="fa-solid fa-square-up-right"></i>
-                            </a>
-                        </div>
-                    </div>
-                </div>
-            `;
+        const shopListWrapper = document.querySelector('.shop-list-wrapper');
+        const shopListSentinel = document.querySelector('.shop-list-sentinel');
+
+        // Cursor of the next page, as rendered by the server for the first one
+        let nextCursor = shopListSentinel ? shopListSentinel.dataset.nextCursor || null : null;
+        let activeParams = new URLSearchParams(window.location.search);
+        let isLoadingMore = false;
+
+        // The server renders the cards, so the grid always matches product_card.html
+        const fetchProductCards = async (params) => {
+            const response = await fetch(`/api/shop/products/fragment/?${params.toString()}`);
+            if (!response.ok) throw new Error(`Request failed with status ${response.status}`);
+            return response.json();
         };
 
-        const fetchAndRenderProducts = async (formData) => {
-            const shopListWrapper = document.querySelector('.shop-list-wrapper');
+        // Counts next to every filter option, for the filters just applied
+        const renderFacetCounts = (facets) => {
+            if (!facets) return;
 
+            document.querySelectorAll('.facet-count').forEach(count => {
+                const option = (facets[count.dataset.facet] || []).find(option => option.value === count.dataset.value);
+                count.textContent = option ? option.count : 0;
+            });
+        };
+
+        const fetchAndRenderProducts = async (formData) => {
+            activeParams = new URLSearchParams(formData);
+            activeParams.delete('cursor');
+            nextCursor = null;
             shopListWrapper.innerHTML = '<div class="shop-list-placeholder"><h3>Loading...</h3></div>';
 
             try {
-                const response = await fetch(`/api/shop/products/?${formData.toString()}`);
-                const data = await response.json();
+                const data = await fetchProductCards(activeParams);
 
-                if (data.products.length > 0) {
-                    shopListWrapper.innerHTML = data.products.map(product => renderProductCard(product)).join('');
+                renderFacetCounts(data.facets);
+
+                if (data.count > 0) {
+                    shopListWrapper.innerHTML = data.html;
+                    nextCursor = data.next_cursor;
                 } else {
                     shopListWrapper.innerHTML = `
                         <div class="shop-list-placeholder">
@@ -182,6 +122,34 @@ const initializeShopPage = () => {
             }
         };
 
+        const fetchNextProducts = async () => {
+            if (!nextCursor || isLoadingMore) return;
+
+            const pageParams = new URLSearchParams(activeParams);
+            pageParams.set('cursor', nextCursor);
+            isLoadingMore = true;
+
+            try {
+                const data = await fetchProductCards(pageParams);
+
+                shopListWrapper.insertAdjacentHTML('beforeend', data.html);
+                nextCursor = data.next_cursor;
+            } catch (error) {
+                console.error('Error fetching more products:', error);
+            } finally {
+                isLoadingMore = false;
+            }
+        };
+
+        if (shopListSentinel) {
+            // Infinite scroll replaces the "Load more" link used without JavaScript
+            shopListSentinel.innerHTML = '';
+
+            new IntersectionObserver((entries) => {
+                if (entries.some(entry => entry.isIntersecting)) fetchNextProducts();
+            }, { rootMargin: '400px' }).observe(shopListSentinel);
+        }
+
         const debounce = (func, delay) => {
             let timeoutId;
             return (...args) => {
@@ -206,7 +174,7 @@ const initializeShopPage = () => {
             if (!form) return;
 
             const sortByRadios = form.querySelectorAll('input[name="sort_by"]');
-            const categoryCheckboxes = form.querySelectorAll('input[name="categories"]');
+            const facetCheckboxes = form.querySelectorAll('input[name="categories"], input[name="price"], input[name="stock"]');
 
             sortByRadios.forEach(radio => {
                 radio.addEventListener('change', () => {
@@ -214,7 +182,7 @@ const initializeShopPage = () => {
                 });
             });
 
-            categoryCheckboxes.forEach(checkbox => {
+            facetCheckboxes.forEach(checkbox => {
                 checkbox.addEventListener('change', () => {
                     handleFilterChange(form);
                 });
@@ -5,8 +5,8 @@ register = template.Library()
 
 @register.filter
 def sum_item_prices(items):
-    """Calculate the total price of all items in a queryset"""
+    """Calculate the total price of all items in a queryset (at the prices stored on the items)"""
     total = Decimal('0.00')
     for item in items:
-        total += item.product.price * item.quantity
+        total += item.price * item.quantity
     return total
@@ -0,0 +1,34 @@
+"""Helpers for tests that keep an eye on query counts.
+
+Typical use::
+
+    with strict_query_budgets():
+        client.get(reverse('pdp', kwargs={'slug': product.slug}))  # raises if over SHOP_QUERY_BUDGETS
+
+    with assert_max_queries(3):
+        build_landing_rails()
+"""
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.test.utils import override_settings
+
+from .middleware import QueryRecorder
+
+
+def strict_query_budgets():
+    """Make ``QueryBudgetMiddleware`` raise instead of logging (usable as decorator or ``with``)"""
+    return override_settings(SHOP_QUERY_BUDGET_RAISE=True)
+
+
+@contextmanager
+def assert_max_queries(budget, threshold=None):
+    """Fail if the block runs more than ``budget`` queries or repeats one statement ``threshold`` times"""
+    if threshold is None:
+        threshold = getattr(settings, 'SHOP_N_PLUS_ONE_THRESHOLD', 5)
+    recorder = QueryRecorder()
+    with recorder.record():
+        yield recorder
+    problems = recorder.problems(budget=budget, threshold=threshold)
+    if problems:
+        raise AssertionError('; '.join(problems))
@@ -0,0 +1,41 @@
+"""Helpers shared by the shop test modules"""
+import json
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Product, UserProfile
+
+PASSWORD = 'correct-horse-battery'
+
+
+def make_product(name, price='100.00', stock_quantity=10, category='pens', **fields):
+    return Product.objects.create(
+        name=name, description=fields.pop('description', f'{name} for school and office'),
+        price=Decimal(price), stock_quantity=stock_quantity, category=category, **fields
+    )
+
+
+def make_user(email='buyer@example.com'):
+    user = User.objects.create_user(username=email, email=email, password=PASSWORD)
+    UserProfile.objects.create(user=user)
+    return user
+
+
+class ShopTestCase(TestCase):
+    def setUp(self):
+        # Catalog fragments and the catalog version live in the cache, which outlives each test's rollback
+        cache.clear()
+
+    def login(self, user):
+        return self.client.post(
+            reverse('api-login'),
+            json.dumps({'email_address': user.email, 'password': PASSWORD}),
+            content_type='application/json',
+        )
+
+    def add_to_cart(self, product, quantity=1):
+        return self.client.post(reverse('add_to_cart'), {'product_id': product.pk, 'quantity': quantity})
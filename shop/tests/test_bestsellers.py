@@ -0,0 +1,54 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from ..bestsellers import rank_bestsellers
+from ..models import Order, OrderItem, Product
+from .base import ShopTestCase, make_product
+
+
+class BestsellerTests(ShopTestCase):
+    def setUp(self):
+        super().setUp()
+        self.pen, self.ink, self.pad = make_product('Gel pen'), make_product('Ink refill'), make_product('Sketch pad')
+
+    def sell(self, product, quantity, days_ago=1, status='completed'):
+        order = Order.objects.create(
+            full_name='Ana Cruz', email='ana@example.com', address='1 Rizal St', total_amount=0, status=status
+        )
+        OrderItem.objects.create(order=order, product=product, quantity=quantity, price=product.price)
+        Order.objects.filter(pk=order.pk).update(placed_at=timezone.now() - timedelta(days=days_ago))
+
+    def ranking(self):
+        return list(
+            Product.objects.filter(sales_score__gt=0).order_by('bestseller_rank')
+            .values_list('name', 'sales_score', 'is_bestseller')
+        )
+
+    def test_products_are_ranked_by_units_sold_in_the_window(self):
+        self.sell(self.pen, 2)
+        self.sell(self.pen, 1)
+        self.sell(self.ink, 5)
+        self.sell(self.pad, 9, status='refunded')
+        self.sell(self.pad, 9, days_ago=40)
+
+        self.assertEqual(rank_bestsellers(days=30, top=1), [(self.ink.pk, 5), (self.pen.pk, 3)])
+        self.assertEqual(self.ranking(), [('Ink refill', 5, True), ('Gel pen', 3, False)])
+        listed = self.client.get(reverse('shop'), {'sort_by': 'bestselling'}).context['products']
+        self.assertEqual([product.pk for product in listed], [self.ink.pk, self.pen.pk, self.pad.pk])
+
+    def test_reranking_clears_products_that_stopped_selling(self):
+        self.sell(self.pen, 2, days_ago=10)
+        rank_bestsellers(days=30)
+        rank_bestsellers(days=5)
+        self.assertEqual(self.ranking(), [])
+        self.assertFalse(Product.objects.filter(is_bestseller=True).exists())
+
+    def test_a_zero_day_window_is_refused_not_defaulted(self):
+        with self.assertRaises(CommandError):
+            call_command('rank_bestsellers', '--days', '0', stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('rank_bestsellers', '--top', '0', stdout=StringIO())
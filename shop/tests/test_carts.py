@@ -0,0 +1,202 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..carts import CART_COOKIE, CART_COUNT_SESSION_KEY, add_item, delete_in_chunks, drifted_carts, stale_carts
+from ..models import Cart, CartItem
+from .base import ShopTestCase, make_product, make_user
+
+
+class StoredTotalsTests(ShopTestCase):
+    def setUp(self):
+        super().setUp()
+        self.pen = make_product('Gel pen', price='50.00')
+        self.pad = make_product('Sketch pad', price='80.00', category='papers')
+        self.user = make_user()
+
+    def assertTotals(self, cart, item_count, line_count, subtotal):
+        cart.refresh_from_db()
+        self.assertEqual((cart.item_count, cart.line_count, cart.subtotal), (item_count, line_count, Decimal(subtotal)))
+        self.assertFalse(drifted_carts().exists())
+        self.assertEqual(self.client.get(reverse('cart')).context['totals']['subtotal'], Decimal(subtotal))
+
+    def test_totals_stay_in_step_with_add_update_and_remove(self):
+        self.login(self.user)
+        cart = Cart.objects.get(user=self.user, is_active=True)
+
+        self.add_to_cart(self.pen, 2)
+        self.add_to_cart(self.pad)
+        self.add_to_cart(self.pen)
+        self.assertTotals(cart, 4, 2, '230.00')
+
+        pen_line = cart.items.get(product=self.pen)
+        self.client.post(reverse('update_cart_item', args=[pen_line.pk]), {'quantity': 1})
+        self.assertTotals(cart, 2, 2, '130.00')
+
+        self.client.post(reverse('remove_cart_item', args=[pen_line.pk]))
+        self.assertTotals(cart, 1, 1, '80.00')
+
+        pad_line = cart.items.get(product=self.pad)
+        self.client.post(reverse('update_cart_item', args=[pad_line.pk]), {'quantity': 0})
+        self.assertTotals(cart, 0, 0, '0.00')
+
+    def test_totals_stay_in_step_with_login_merges(self):
+        cart = Cart.objects.create(user=self.user)
+        self.login(self.user)
+        self.add_to_cart(self.pen)
+        self.client.logout()
+
+        with override_settings(SHOP_CART_COOKIE_MAX_LINES=1):
+            self.add_to_cart(self.pen, 2)
+            self.add_to_cart(self.pad)
+        self.login(self.user)
+        self.assertTotals(cart, 4, 2, '230.00')
+
+        self.client.logout()
+        self.add_to_cart(self.pad, 2)
+        self.login(self.user)
+        self.assertTotals(cart, 6, 2, '390.00')
+
+    def test_summaries_read_the_stored_subtotal(self):
+        self.login(self.user)
+        self.add_to_cart(self.pen, 2)
+        self.add_to_cart(self.pad)
+        cart = Cart.objects.get(user=self.user, is_active=True)
+        # Skewed on purpose: a page that summed the lines would still show 180
+        Cart.objects.filter(pk=cart.pk).update(subtotal=Decimal('999.00'))
+
+        self.assertEqual(self.client.get(reverse('cart')).context['totals']['subtotal'], Decimal('999.00'))
+        ids = list(cart.items.values_list('id', flat=True))
+        totals = self.client.post(reverse('checkout'), {'selected_items': ids}).context['totals']
+        self.assertEqual(totals['subtotal'], Decimal('999.00'))
+        # A partial selection is priced from its own lines
+        totals = self.client.post(reverse('checkout'), {'selected_items': ids[:1]}).context['totals']
+        self.assertEqual(totals['subtotal'], Decimal('100.00'))
+
+
+class LoginCartMergeTests(ShopTestCase):
+    def setUp(self):
+        super().setUp()
+        self.pen = make_product('Gel pen', price='50.00')
+        self.pad = make_product('Sketch pad', price='80.00', category='papers')
+        self.user = make_user()
+
+    def test_cookie_cart_is_folded_into_the_users_cart(self):
+        cart = Cart.objects.create(user=self.user)
+        add_item(cart, self.pen, 1)
+
+        self.add_to_cart(self.pen, 2)
+        self.add_to_cart(self.pad)
+        self.login(self.user)
+
+        cart.refresh_from_db()
+        self.assertEqual(dict(cart.items.values_list('product_id', 'quantity')), {self.pen.pk: 3, self.pad.pk: 1})
+        self.assertEqual((cart.line_count, cart.item_count, cart.subtotal), (2, 4, Decimal('230.00')))
+        self.assertEqual(self.client.session[CART_COUNT_SESSION_KEY], 2)
+        self.assertEqual(Cart.objects.filter(user=self.user, is_active=True).count(), 1)
+
+    def test_stored_anonymous_cart_is_merged_and_closed(self):
+        with override_settings(SHOP_CART_COOKIE_MAX_LINES=1):
+            self.add_to_cart(self.pen)
+            self.add_to_cart(self.pad)
+        anonymous = Cart.objects.get(user=None, is_active=True)
+
+        self.login(self.user)
+
+        anonymous.refresh_from_db()
+        self.assertFalse(anonymous.is_active)
+        self.assertFalse(anonymous.items.exists())
+        cart = Cart.objects.get(user=self.user, is_active=True)
+        self.assertEqual(dict(cart.items.values_list('product_id', 'quantity')), {self.pen.pk: 1, self.pad.pk: 1})
+        self.assertEqual(self.client.get(reverse('cart-count-api')).json(), {'count': 2})
+
+
+class CookieCartTests(ShopTestCase):
+    def setUp(self):
+        super().setUp()
+        self.pen = make_product('Gel pen')
+        self.pad = make_product('Sketch pad', category='papers')
+
+    def test_anonymous_cart_lives_in_a_signed_cookie(self):
+        self.add_to_cart(self.pen, 2)
+        self.add_to_cart(self.pad)
+        self.add_to_cart(self.pen)
+
+        self.assertFalse(Cart.objects.exists())
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, self.client.cookies)
+        response = self.client.get(reverse('cart'))
+        self.assertEqual({item.product_id: item.quantity for item in response.context['items']},
+                         {self.pen.pk: 3, self.pad.pk: 1})
+        self.assertEqual(self.client.get(reverse('cart-count-api')).json(), {'count': 2})
+
+    def test_tampered_cookie_is_ignored(self):
+        self.add_to_cart(self.pen)
+        self.client.cookies[CART_COOKIE] = f'{self.pen.pk}:500'
+        self.assertEqual(self.client.get(reverse('cart-count-api')).json(), {'count': 0})
+
+    def test_cannot_add_more_than_available(self):
+        response = self.add_to_cart(self.pen, 11)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.client.get(reverse('cart-count-api')).json(), {'count': 0})
+
+    @override_settings(SHOP_CART_COOKIE_MAX_LINES=1)
+    def test_full_cookie_moves_the_cart_to_the_database(self):
+        self.add_to_cart(self.pen, 2)
+        self.add_to_cart(self.pad)
+
+        cart = Cart.objects.get(user=None, is_active=True)
+        self.assertEqual(dict(cart.items.values_list('product_id', 'quantity')), {self.pen.pk: 2, self.pad.pk: 1})
+        self.assertEqual((cart.line_count, cart.item_count), (2, 3))
+        self.assertEqual(self.client.get(reverse('cart-count-api')).json(), {'count': 2})
+
+
+class StaleCartPurgeTests(ShopTestCase):
+    def setUp(self):
+        super().setUp()
+        self.pen = make_product('Gel pen')
+        self.user = make_user()
+
+    def cart(self, days_old, **fields):
+        cart = Cart.objects.create(**fields)
+        add_item(cart, self.pen, 1)
+        Cart.objects.filter(pk=cart.pk).update(updated_at=timezone.now() - timedelta(days=days_old))
+        return cart
+
+    def purge(self, *args):
+        call_command('purge_stale_carts', *args, stdout=StringIO())
+
+    def test_only_stale_carts_and_expired_sessions_are_purged(self):
+        merged = self.cart(8, is_active=False)
+        recently_merged = self.cart(2, is_active=False)
+        abandoned = self.cart(31)
+        browsing = self.cart(2)
+        users = self.cart(90, user=self.user)
+        Session.objects.create(session_key='expired', session_data='', expire_date=timezone.now() - timedelta(days=1))
+        Session.objects.create(session_key='current', session_data='', expire_date=timezone.now() + timedelta(days=1))
+
+        self.purge('--dry-run')
+        self.assertEqual(Cart.objects.count(), 5)
+
+        self.purge()
+        self.assertEqual(set(Cart.objects.values_list('pk', flat=True)), {recently_merged.pk, browsing.pk, users.pk})
+        self.assertFalse(CartItem.objects.filter(cart_id__in=[merged.pk, abandoned.pk]).exists())
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['current'])
+
+    def test_a_cart_used_between_chunks_survives(self):
+        self.cart(31)
+        second = self.cart(31)
+        carts = stale_carts(inactive_before=timezone.now(), anonymous_before=timezone.now() - timedelta(days=30))
+
+        chunks = delete_in_chunks(carts, chunk_size=1)
+        self.assertEqual(next(chunks), {'shop.CartItem': 1, 'shop.Cart': 1})
+        add_item(second, self.pen, 1)
+        self.assertEqual(list(chunks), [])
+
+        self.assertEqual(list(Cart.objects.values_list('pk', flat=True)), [second.pk])
@@ -0,0 +1,66 @@
+from decimal import Decimal
+
+from ..cache import get_catalog_version
+from ..carts import add_item, cart_items
+from ..checkout import InsufficientStock, place_order
+from ..models import Cart, CartItem, InventoryTransaction, Order
+from .base import ShopTestCase, make_product, make_user
+
+
+class PlaceOrderTests(ShopTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.pen = make_product('Gel pen', price='50.00', stock_quantity=1)
+        self.pad = make_product('Sketch pad', price='80.00', stock_quantity=5, category='papers')
+
+    def cart_with(self, *lines, user=None):
+        cart = Cart.objects.create(user=user)
+        for product, quantity in lines:
+            add_item(cart, product, quantity)
+        return cart_items(cart)
+
+    def place(self, items):
+        return place_order(
+            items, user=self.user, full_name='Ana Cruz', email='ana@example.com',
+            address='1 Rizal St', payment_method='COD', shipping_fee=Decimal('50.00'),
+        )
+
+    def test_order_decrements_stock_and_clears_the_lines(self):
+        items = self.cart_with((self.pen, 1), (self.pad, 2), user=self.user)
+        order = self.place(items)
+
+        self.assertEqual(order.total_amount, Decimal('260.00'))
+        self.assertEqual(order.items.count(), 2)
+        self.pen.refresh_from_db()
+        self.pad.refresh_from_db()
+        self.assertEqual((self.pen.stock_quantity, self.pad.stock_quantity), (0, 3))
+        self.assertEqual(
+            dict(InventoryTransaction.objects.values_list('product_id', 'stock_after')), {self.pen.pk: 0, self.pad.pk: 3}
+        )
+        self.assertFalse(CartItem.objects.filter(cart__user=self.user).exists())
+
+    def test_catalog_caches_survive_sales_that_keep_the_stock_band(self):
+        version = get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.place(self.cart_with((self.pad, 1), user=self.user))  # 5 -> 4, still low stock
+        self.assertEqual(get_catalog_version(), version)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.place(self.cart_with((self.pen, 1), user=self.user))  # 1 -> 0, out of stock
+        self.assertNotEqual(get_catalog_version(), version)
+
+    def test_last_unit_cannot_be_sold_twice(self):
+        first = self.cart_with((self.pen, 1), user=self.user)
+        second = self.cart_with((self.pad, 1), (self.pen, 1))
+        self.place(first)
+
+        with self.assertRaises(InsufficientStock) as raised:
+            self.place(second)
+
+        self.assertEqual(raised.exception.product, self.pen)
+        # The whole order is rolled back, including lines that had stock
+        self.assertEqual(Order.objects.count(), 1)
+        self.pad.refresh_from_db()
+        self.assertEqual(self.pad.stock_quantity, 5)
+        self.assertEqual(CartItem.objects.filter(cart=second[0].cart_id).count(), 2)
@@ -0,0 +1,49 @@
+from decimal import Decimal
+
+from django.urls import reverse
+
+from .base import ShopTestCase, make_product
+
+
+class ConditionalResponseTests(ShopTestCase):
+    """Unchanged product pages and API pages are answered with 304 Not Modified"""
+
+    def setUp(self):
+        super().setUp()
+        self.pen = make_product('Gel pen', price='50.00')
+        make_product('Gel pen refill', price='20.00')
+
+    def revalidate(self, url, etag, **params):
+        return self.client.get(url, params, headers={'if-none-match': etag})
+
+    def change_price(self, product, price):
+        product.price = Decimal(price)
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+
+    def test_product_page_is_revalidated(self):
+        url = reverse('pdp', args=[self.pen.slug])
+        etag = self.client.get(url)['ETag']
+
+        self.assertEqual(self.revalidate(url, etag).status_code, 304)
+        self.change_price(self.pen, '55.00')
+        response = self.revalidate(url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_product_page_etag_follows_the_visitors_cart(self):
+        url = reverse('pdp', args=[self.pen.slug])
+        etag = self.client.get(url)['ETag']
+
+        # The header badge is part of the page
+        self.add_to_cart(self.pen)
+        self.assertEqual(self.revalidate(url, etag).status_code, 200)
+
+    def test_products_api_pages_are_revalidated(self):
+        url = reverse('shop-products-api')
+        etag = self.client.get(url, {'search': 'pen'})['ETag']
+
+        self.assertEqual(self.revalidate(url, etag, search='pen').status_code, 304)
+        self.assertEqual(self.revalidate(url, etag, search='pen', currency='USD').status_code, 200)
+        self.change_price(self.pen, '55.00')
+        self.assertEqual(self.revalidate(url, etag, search='pen').status_code, 200)
@@ -0,0 +1,105 @@
+import json
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from .. import currency
+from ..carts import add_item
+from ..currency import RateTable, UnknownCurrency, convert_prices, get_rate_table, localize
+from ..models import Cart, Order, UserProfile
+from .base import ShopTestCase, make_product, make_user
+
+
+class CurrencyConversionTests(SimpleTestCase):
+    def setUp(self):
+        # The rate table is kept per process; start and end each test from the settings' file
+        currency._table = None
+        self.addCleanup(setattr, currency, '_table', None)
+
+    def test_prices_are_converted_and_rounded_half_up_to_the_cent(self):
+        table = RateTable('test', {'PHP': Decimal(1), 'USD': Decimal('0.5')})
+        self.assertEqual(
+            convert_prices([Decimal('100.00'), Decimal('0.01'), Decimal('0.03')], 'USD', table),
+            [Decimal('50.00'), Decimal('0.01'), Decimal('0.02')],
+        )
+        self.assertEqual(convert_prices([Decimal('0.01')], 'PHP', table), [Decimal('0.01')])
+
+    def test_unknown_currency_is_refused(self):
+        with self.assertRaises(UnknownCurrency):
+            convert_prices([Decimal('1.00')], 'XYZ')
+
+    def test_localize_sets_display_prices_on_objects_and_rows(self):
+        rows = localize([{'price': Decimal('100.00')}], 'USD')
+        self.assertEqual(rows[0]['display_price'], Decimal('1.72'))
+
+    @override_settings(SHOP_CURRENCY_REFRESH_SECONDS=0)
+    def test_rates_file_is_reloaded_when_it_changes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'rates.json'
+            path.write_text(json.dumps({'version': 'v1', 'rates': {'USD': '0.02'}}))
+            with override_settings(SHOP_CURRENCY_RATES_FILE=path):
+                self.assertEqual(get_rate_table().version, 'v1')
+                path.write_text(json.dumps({'version': 'v2', 'rates': {'USD': '0.03'}}))
+                self.assertEqual((get_rate_table().version, get_rate_table().rate('USD')), ('v2', Decimal('0.03')))
+
+
+class CartPriceTests(ShopTestCase):
+    """The cart page, checkout and the order all work from the cart lines' ``price``"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.pen = make_product('Gel pen', price='50.00')
+        self.pad = make_product('Sketch pad', price='80.00', category='papers')
+        self.cart = Cart.objects.create(user=self.user)
+        add_item(self.cart, self.pen, 2)
+        add_item(self.cart, self.pad, 1)
+        self.login(self.user)
+
+    def checkout_totals(self):
+        ids = list(self.cart.items.values_list('id', flat=True))
+        return self.client.post(reverse('checkout'), {'selected_items': ids}).context['totals']
+
+    def test_cart_page_checkout_and_stored_totals_agree_after_a_price_change(self):
+        self.pen.price = Decimal('60.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pen.save()
+
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.subtotal, Decimal('200.00'))
+        self.assertEqual(self.client.get(reverse('cart')).context['totals']['subtotal'], Decimal('200.00'))
+        totals = self.checkout_totals()
+        # 200 is in the upper shipping band, which the stale 180 wasn't
+        self.assertEqual((totals['subtotal'], totals['shipping_fee']), (Decimal('200.00'), Decimal('70.00')))
+
+        self.client.post(reverse('checkout'), {
+            'full_name': 'Ana Cruz', 'email': 'ana@example.com', 'address': '1 Rizal St', 'payment_method': 'COD',
+        })
+        order = Order.objects.get()
+        self.assertEqual((order.total_amount, order.shipping_fee), (Decimal('270.00'), Decimal('70.00')))
+        self.assertEqual(order.items.get(product=self.pen).price, Decimal('60.00'))
+
+    def test_summary_shows_the_charged_subtotal_converted(self):
+        UserProfile.objects.filter(user=self.user).update(preferred_currency='USD')
+        self.client.logout()
+        self.login(self.user)
+
+        # 50 PHP is 0.86 USD, so two lines and the total round the same way
+        self.assertEqual(self.client.get(reverse('cart')).context['totals']['subtotal'], Decimal('3.10'))
+        totals = self.checkout_totals()
+        self.assertEqual((totals['subtotal'], totals['shipping_fee']), (Decimal('3.10'), Decimal('0.86')))
+
+    def test_imported_price_changes_reprice_open_carts(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'feed.csv'
+            path.write_text(f'name,slug,price\nSketch pad,{self.pad.slug},90\n')
+            call_command('import_products', str(path), stdout=StringIO(), stderr=StringIO())
+
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.items.get(product=self.pad).price, Decimal('90.00'))
+        self.assertEqual(self.cart.subtotal, Decimal('190.00'))
@@ -0,0 +1,60 @@
+from django.http import QueryDict
+from django.urls import reverse
+
+from ..facets import get_facets, price_band_labels
+from ..search import search_product_ids
+from .base import ShopTestCase, make_product
+
+
+class FacetTests(ShopTestCase):
+    def setUp(self):
+        super().setUp()
+        make_product('Fountain pen', price='50.00', stock_quantity=10)
+        make_product('Fountain pen gift set', price='300.00', stock_quantity=3)
+        make_product('Sketch pad', price='80.00', stock_quantity=0, category='papers')
+        # Catch the shared search index up with this test's products
+        search_product_ids('fountain')
+
+    def counts(self, query, facet):
+        return {option['value']: option['count'] for option in get_facets(QueryDict(query))[facet] if option['count']}
+
+    def test_each_facet_counts_what_the_other_facets_let_through(self):
+        self.assertEqual(self.counts('price=under-100', 'category'), {'pens': 1, 'papers': 1})
+        self.assertEqual(self.counts('price=under-100', 'stock'), {'in-stock': 1, 'out-of-stock': 1})
+        # Ticking a price band doesn't hide the other bands' counts
+        self.assertEqual(self.counts('categories=pens&price=under-100', 'price'), {'under-100': 1, '250-500': 1})
+
+    def test_counts_cover_the_search(self):
+        self.assertEqual(self.counts('search=fountain', 'category'), {'pens': 2})
+        self.assertEqual(self.counts('search=fountain&stock=low-stock', 'price'), {'250-500': 1})
+
+    def test_counts_are_cached_until_the_catalog_changes(self):
+        get_facets(QueryDict())
+        with self.assertNumQueries(0):
+            get_facets(QueryDict('price=under-100'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_product('Drawing paper', category='papers')
+        self.assertEqual(self.counts('', 'category'), {'pens': 2, 'papers': 2})
+
+    def test_price_bands_are_labelled_in_the_visitors_currency(self):
+        self.assertEqual(price_band_labels('USD')[:2], ['Under USD 1.72', 'USD 1.72 – 4.30'])
+
+    def test_only_the_first_api_page_carries_facets(self):
+        first = self.client.get(reverse('shop-products-api'), {'limit': 1}).json()
+        self.assertEqual({option['value']: option['count'] for option in first['facets']['category']},
+                         {'pens': 2, 'papers': 1})
+        following = self.client.get(reverse('shop-products-api'), {'limit': 1, 'cursor': first['next_cursor']}).json()
+        self.assertNotIn('facets', following)
+
+    def test_api_etag_changes_with_the_counts(self):
+        url = reverse('shop-products-api')
+        etag = self.client.get(url, {'sort_by': 'a-to-z', 'limit': 1})['ETag']
+
+        # The page itself stays the same; only its facet counts move
+        with self.captureOnCommitCallbacks(execute=True):
+            make_product('Watercolor paper', category='papers')
+        response = self.client.get(url, {'sort_by': 'a-to-z', 'limit': 1}, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        counts = {option['value']: option['count'] for option in response.json()['facets']['category']}
+        self.assertEqual(counts, {'pens': 2, 'papers': 2})
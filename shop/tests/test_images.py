@@ -0,0 +1,64 @@
+import tempfile
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import override_settings
+from PIL import Image
+
+from ..images import derivative_name, has_derivatives
+from ..models import Product
+from .base import ShopTestCase, make_product
+
+
+def png_file(color):
+    buffer = BytesIO()
+    Image.new('RGB', (800, 600), color).save(buffer, 'PNG')
+    return ContentFile(buffer.getvalue())
+
+
+class ImageDerivativeTests(ShopTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media = override_settings(MEDIA_ROOT=media_root.name)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def upload(self, product, color):
+        with self.captureOnCommitCallbacks(execute=True):
+            product.image.save(f'{color}.png', png_file(color))
+        return product.image.name
+
+    def test_replacing_an_image_deletes_the_old_derivatives(self):
+        product = make_product('Gel pen')
+        old_name = self.upload(product, 'red')
+        self.assertTrue(has_derivatives(old_name))
+
+        product = Product.objects.get(pk=product.pk)
+        new_name = self.upload(product, 'blue')
+
+        self.assertNotEqual(old_name, new_name)
+        self.assertTrue(has_derivatives(new_name))
+        self.assertFalse(default_storage.exists(derivative_name(old_name, 160, 'webp')))
+
+    def test_deleting_a_product_deletes_its_derivatives(self):
+        product = make_product('Gel pen')
+        name = self.upload(product, 'red')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.get(pk=product.pk).delete()
+
+        self.assertFalse(has_derivatives(name))
+        self.assertTrue(default_storage.exists(name))
+
+    def test_derivatives_shared_with_another_product_are_kept(self):
+        product = make_product('Gel pen')
+        name = self.upload(product, 'red')
+        make_product('Gel pen refill', image=name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+
+        self.assertTrue(has_derivatives(name))
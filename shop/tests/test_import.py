@@ -0,0 +1,54 @@
+import json
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+
+from ..models import Product
+from .base import ShopTestCase, make_product
+
+
+class ImportProductsTests(ShopTestCase):
+    def import_feed(self, name, content):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / name
+            path.write_text(content)
+            call_command('import_products', str(path), stdout=StringIO(), stderr=StringIO())
+
+    def test_columns_a_row_leaves_out_keep_their_stored_values(self):
+        self.import_feed('feed.jsonl', '\n'.join(json.dumps(row) for row in [
+            {'name': 'Gel pen', 'slug': 'gel-pen', 'price': '45', 'stock_quantity': 30, 'description': 'Blue ink'},
+            {'name': 'Sketch pad', 'slug': 'sketch-pad', 'price': '120', 'category': 'papers', 'stock_quantity': 8},
+        ]))
+        # One row updates the price only, the other the stock only, in the same batch
+        self.import_feed('update.jsonl', '\n'.join(json.dumps(row) for row in [
+            {'name': 'Gel pen', 'slug': 'gel-pen', 'price': '49'},
+            {'name': 'Sketch pad', 'slug': 'sketch-pad', 'price': '120', 'stock_quantity': 3},
+        ]))
+
+        pen, pad = Product.objects.get(slug='gel-pen'), Product.objects.get(slug='sketch-pad')
+        self.assertEqual((pen.price, pen.stock_quantity, pen.description), (Decimal('49.00'), 30, 'Blue ink'))
+        self.assertEqual((pad.price, pad.stock_quantity, pad.category), (Decimal('120.00'), 3, 'papers'))
+
+    def test_blank_csv_cells_keep_their_stored_values(self):
+        self.import_feed('feed.csv', 'name,slug,price,stock_quantity,description\nGel pen,gel-pen,45,30,Blue ink\n')
+        self.import_feed('update.csv', 'name,slug,price,stock_quantity,description\nGel pen,gel-pen,49,,\n')
+
+        pen = Product.objects.get(slug='gel-pen')
+        self.assertEqual((pen.price, pen.stock_quantity, pen.description), (Decimal('49.00'), 30, 'Blue ink'))
+
+    def test_missing_image_keeps_the_stored_image(self):
+        product = make_product('Gel pen', slug='gel-pen', image='products/gel-pen.png')
+        self.import_feed('update.csv', 'name,slug,price,image\nGel pen,gel-pen,49,products/not-uploaded.png\n')
+
+        product.refresh_from_db()
+        self.assertEqual((product.price, product.image.name), (Decimal('49.00'), 'products/gel-pen.png'))
+
+    def test_bestseller_flag_is_not_importable(self):
+        product = make_product('Gel pen', slug='gel-pen', is_bestseller=True)
+        self.import_feed('update.csv', 'name,slug,price,is_bestseller\nGel pen,gel-pen,49,no\n')
+
+        product.refresh_from_db()
+        self.assertTrue(product.is_bestseller)
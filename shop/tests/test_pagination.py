@@ -0,0 +1,63 @@
+from decimal import Decimal
+
+from django.http import QueryDict
+from django.urls import reverse
+
+from ..catalog import SORT_ORDERS, InvalidCursor, filter_products, paginate
+from ..models import Product
+from .base import ShopTestCase, make_product
+
+
+class KeysetPaginationTests(ShopTestCase):
+    def setUp(self):
+        super().setUp()
+        # Repeated names and prices, so the id tie-breaker matters
+        for number in range(23):
+            make_product(f'Notebook {number % 5}', price=f'{50 + number % 4}.00', category='notebooks')
+
+    def walk(self, params, limit=4):
+        products = filter_products(QueryDict(params))[0]
+        page, cursor = paginate(products, None, limit)
+        seen = [product.pk for product in page]
+        while cursor:
+            page, cursor = paginate(products, cursor, limit)
+            self.assertLessEqual(len(page), limit)
+            seen += [product.pk for product in page]
+        return seen
+
+    def test_every_sort_walks_the_listing_once_in_order(self):
+        for sort_by, ordering in SORT_ORDERS.items():
+            with self.subTest(sort_by=sort_by):
+                expected = list(
+                    Product.objects.filter(is_active=True).order_by(
+                        *(ordering if sort_by != 'relevance' else SORT_ORDERS['a-to-z'])
+                    ).values_list('pk', flat=True)
+                )
+                self.assertEqual(self.walk(f'sort_by={sort_by}'), expected)
+
+    def test_filters_apply_to_every_page(self):
+        expected = list(
+            Product.objects.filter(name='Notebook 2', price__lt=Decimal('100'))
+            .order_by('-price', '-id').values_list('pk', flat=True)
+        )
+        self.assertEqual(self.walk('search=notebook 2&sort_by=price-highest-first&price=under-100', limit=2), expected)
+
+    def test_invalid_cursor(self):
+        products = filter_products(QueryDict(''))[0]
+        with self.assertRaises(InvalidCursor):
+            paginate(products, 'not-a-cursor')
+        response = self.client.get(reverse('shop-products-fragment'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_api_pages_carry_only_the_requested_fields(self):
+        url = reverse('shop-products-api')
+        first = self.client.get(url, {'fields': 'id,name', 'limit': 20, 'sort_by': 'a-to-z'}).json()
+        second = self.client.get(url, {'fields': 'id,name', 'limit': 20, 'cursor': first['next_cursor'], 'sort_by': 'a-to-z'}).json()
+
+        self.assertEqual(set(first['products'][0]), {'id', 'name'})
+        self.assertEqual((first['count'], second['count'], second['has_more']), (20, 3, False))
+        self.assertEqual(
+            [row['id'] for row in first['products'] + second['products']],
+            list(Product.objects.order_by(*SORT_ORDERS['a-to-z']).values_list('pk', flat=True)),
+        )
+        self.assertEqual(self.client.get(url, {'fields': 'id,secret'}).status_code, 400)
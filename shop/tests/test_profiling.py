@@ -0,0 +1,57 @@
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import reverse
+
+from .. import profiling
+from .base import PASSWORD, ShopTestCase, make_product
+
+
+@override_settings(SHOP_PROFILE_SAMPLE_RATE=0, SHOP_PROFILE_KEEP=2)
+class ProfilingTests(ShopTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        store = override_settings(SHOP_PROFILE_DIR=directory.name)
+        store.enable()
+        self.addCleanup(store.disable)
+        self.product = make_product('Gel pen')
+
+    def get_profiled(self, token=None):
+        return self.client.get(
+            reverse('pdp', args=[self.product.slug]),
+            headers={profiling.PROFILE_HEADER: token or profiling.make_profile_token()},
+        )
+
+    def test_only_requests_with_a_valid_token_are_profiled(self):
+        self.client.get(reverse('pdp', args=[self.product.slug]))
+        self.get_profiled('profile:forged:signature')
+        self.assertEqual(profiling.list_profiles(), [])
+
+        self.assertEqual(self.get_profiled().status_code, 200)
+        [summary] = profiling.list_profiles()
+        self.assertEqual((summary['reason'], summary['view'], summary['status']), ('header', 'pdp', 200))
+
+        profile = profiling.load_profile(summary['id'])
+        self.assertEqual(len(profile['queries']), profile['query_count'])
+        self.assertGreater(profile['query_count'], 0)
+
+    def test_only_the_newest_profiles_are_kept(self):
+        for _ in range(3):
+            self.get_profiled()
+        self.assertEqual(len(profiling.list_profiles()), 2)
+
+    def test_staff_can_browse_and_download_profiles(self):
+        self.get_profiled()
+        profile_id = profiling.list_profiles()[0]['id']
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', PASSWORD))
+
+        self.assertContains(self.client.get(reverse('profile-list')), profile_id)
+        self.assertEqual(self.client.get(reverse('profile-detail', args=[profile_id])).status_code, 200)
+        self.assertEqual(self.client.get(reverse('profile-stacks', args=[profile_id])).status_code, 200)
+
+    def test_ids_outside_the_store_are_refused(self):
+        self.assertIsNone(profiling.profile_path('../../settings'))
+        self.assertIsNone(profiling.load_profile('../../settings'))
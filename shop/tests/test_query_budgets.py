@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.urls import reverse
+
+from ..testing import assert_max_queries, strict_query_budgets
+from .base import ShopTestCase, make_product, make_user
+
+
+# Q U E R Y   B U D G E T S
+
+@strict_query_budgets()
+class QueryBudgetTests(ShopTestCase):
+    """The budgets in SHOP_QUERY_BUDGETS hold on a cold cache, for anonymous and signed-in visitors.
+
+    Strict budgets also fail the requests made to set each test up (adding to cart, logging in).
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.products = [
+            make_product(f'Gel pen {number}', price=f'{40 + number}.00', is_featured=number < 3)
+            for number in range(12)
+        ]
+        self.user = make_user()
+
+    def assert_within_budget(self, url_name, url):
+        with assert_max_queries(settings.SHOP_QUERY_BUDGETS[url_name]):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_landing(self):
+        self.assert_within_budget('landing', reverse('landing'))
+
+    def test_shop(self):
+        self.assert_within_budget('shop', reverse('shop'))
+        self.assert_within_budget('shop', f"{reverse('shop')}?search=gel&price=under-100&sort_by=price-lowest-first")
+
+    def test_products_api(self):
+        url = reverse('shop-products-api')
+        self.assert_within_budget('shop-products-api', url)
+        # Best match first, with a filter that leaves out some matches
+        self.assert_within_budget('shop-products-api', f"{url}?search=gel&categories=pens&price=under-100&limit=5")
+
+    def test_pdp(self):
+        self.assert_within_budget('pdp', self.products[0].get_absolute_url())
+
+    def test_cart(self):
+        self.add_to_cart(self.products[0])
+        self.add_to_cart(self.products[1])
+        self.assert_within_budget('cart', reverse('cart'))
+
+    def test_signed_in_pages(self):
+        self.add_to_cart(self.products[0])
+        self.login(self.user)
+        self.add_to_cart(self.products[1])
+        for url_name in ('landing', 'shop', 'cart'):
+            self.assert_within_budget(url_name, reverse(url_name))
+        self.assert_within_budget('pdp', self.products[2].get_absolute_url())
+
+    def test_cart_count_right_after_login(self):
+        self.add_to_cart(self.products[0])
+        self.login(self.user)
+        response = self.assert_within_budget('cart-count-api', reverse('cart-count-api'))
+        self.assertEqual(response.json(), {'count': 1})
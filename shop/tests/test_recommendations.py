@@ -0,0 +1,71 @@
+import numpy as np
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from ..models import Order, OrderItem, ProductRecommendation
+from ..recommendations import build_recommendations, co_purchase_scores, top_neighbours
+from .base import ShopTestCase, make_product
+
+
+class CoPurchaseScoreTests(SimpleTestCase):
+    def test_pairs_are_scored_by_cosine_similarity(self):
+        # Orders 1 and 2 hold products 10 and 20, order 3 holds 10 and 30
+        lines = np.array([[1, 10], [1, 20], [2, 20], [2, 10], [3, 10], [3, 30], [3, 30]])
+        product, other, score = co_purchase_scores(lines)
+
+        scores = {(p, o): round(s, 3) for p, o, s in zip(product.tolist(), other.tolist(), score.tolist())}
+        self.assertEqual(scores, {(10, 20): 0.816, (20, 10): 0.816, (10, 30): 0.577, (30, 10): 0.577})
+
+    def test_only_the_best_neighbours_are_kept(self):
+        product, other, rank, score = top_neighbours(
+            np.array([1, 1, 1, 2]), np.array([5, 6, 7, 5]), np.array([0.2, 0.9, 0.2, 0.4]), limit=2
+        )
+        self.assertEqual(list(zip(product.tolist(), other.tolist(), rank.tolist())), [(1, 6, 0), (1, 5, 1), (2, 5, 0)])
+
+
+class RecommendationTests(ShopTestCase):
+    def setUp(self):
+        super().setUp()
+        self.pen, self.ink, self.pad = make_product('Gel pen'), make_product('Ink refill'), make_product('Sketch pad')
+        self.pencil = make_product('Pencil')
+
+    def order(self, *products, status='completed'):
+        order = Order.objects.create(
+            full_name='Ana Cruz', email='ana@example.com', address='1 Rizal St', total_amount=0, status=status
+        )
+        for product in products:
+            OrderItem.objects.create(order=order, product=product, price=product.price)
+        return order
+
+    def recommended(self, product):
+        return list(
+            ProductRecommendation.objects.filter(product=product).order_by('rank').values_list('recommended', flat=True)
+        )
+
+    def test_product_page_lists_what_was_bought_with_it_first(self):
+        self.order(self.pen, self.ink)
+        self.order(self.pen, self.ink)
+        self.order(self.pen, self.pad)
+        self.order(self.pen, self.pencil, status='refunded')
+        build_recommendations()
+
+        self.assertEqual(self.recommended(self.pen), [self.ink.pk, self.pad.pk])
+        related = self.client.get(reverse('pdp', args=[self.pen.slug])).context['related_products']
+        # Topped up from the category once the bought-together list runs out
+        self.assertEqual([product.pk for product in related], [self.ink.pk, self.pad.pk, self.pencil.pk])
+
+    def test_incremental_builds_only_rewrite_affected_products(self):
+        self.order(self.pen, self.ink)
+        self.order(self.pad, self.pencil)
+        build_recommendations()
+        untouched = ProductRecommendation.objects.filter(product=self.pad).values_list('built_at', flat=True).get()
+
+        self.order(self.pen, self.ink)
+        products, rows = build_recommendations()
+
+        # Only the pen and the ink were bought since; the pad and the pencil keep their rows
+        self.assertEqual((products, rows), (2, 2))
+        self.assertEqual(self.recommended(self.pen), [self.ink.pk])
+        self.assertEqual(
+            ProductRecommendation.objects.filter(product=self.pad).values_list('built_at', flat=True).get(), untouched
+        )
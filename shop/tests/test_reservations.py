@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.test import override_settings
+from django.utils import timezone
+
+from ..carts import add_item, cart_items
+from ..checkout import InsufficientStock
+from ..models import Cart, StockReservation
+from ..reservations import available_quantity, purge_expired_reservations, reserve_items
+from .base import ShopTestCase, make_product
+
+
+class ReservationTests(ShopTestCase):
+    def setUp(self):
+        super().setUp()
+        self.pen = make_product('Gel pen', stock_quantity=3)
+        self.cart = Cart.objects.create()
+        self.other = Cart.objects.create()
+        add_item(self.cart, self.pen, 2)
+
+    def test_hold_reduces_what_other_carts_can_buy(self):
+        reserve_items(self.cart, cart_items(self.cart))
+
+        self.assertEqual(available_quantity(self.pen, self.other.pk), 1)
+        self.assertEqual(available_quantity(self.pen, self.cart.pk), 3)
+        add_item(self.other, self.pen, 2)
+        with self.assertRaises(InsufficientStock):
+            reserve_items(self.other, cart_items(self.other))
+
+    def test_re_reserving_refreshes_the_hold(self):
+        reserve_items(self.cart, cart_items(self.cart))
+        StockReservation.objects.update(expires_at=timezone.now() + timedelta(seconds=5))
+        reserve_items(self.cart, cart_items(self.cart))
+
+        hold = StockReservation.objects.get()
+        self.assertGreater(hold.expires_at, timezone.now() + timedelta(seconds=settings.SHOP_STOCK_RESERVATION_TTL - 60))
+
+    @override_settings(SHOP_STOCK_RESERVATION_TTL=60)
+    def test_expired_holds_stop_counting_and_are_purged(self):
+        reserve_items(self.cart, cart_items(self.cart))
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(available_quantity(self.pen, self.other.pk), 3)
+        self.assertEqual(purge_expired_reservations(), 1)
+        self.assertFalse(StockReservation.objects.exists())
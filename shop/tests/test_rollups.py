@@ -0,0 +1,67 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import DailyProductSalesRollup, DailySalesRollup, Order, OrderItem
+from ..rollups import dashboard_start
+from .base import PASSWORD, ShopTestCase, make_product
+
+
+class ProductRollupTests(ShopTestCase):
+    def test_lines_of_deleted_products_leave_the_orphaned_rows_alone(self):
+        order = Order.objects.create(
+            full_name='Ana Cruz', email='ana@example.com', address='1 Rizal St', total_amount=Decimal('130.00')
+        )
+        for product in (make_product('Gel pen', price='50.00'), make_product('Sketch pad', price='80.00')):
+            OrderItem.objects.create(order=order, product=product, quantity=1, price=product.price)
+            product.delete()
+
+        # Both rollup rows now have no product; editing the orphaned line must not touch either
+        line = order.items.first()
+        line.quantity = 3
+        line.save()
+
+        self.assertEqual(
+            dict(DailyProductSalesRollup.objects.values_list('product_name', 'units')), {'Gel pen': 1, 'Sketch pad': 1}
+        )
+
+
+class SalesDashboardTests(ShopTestCase):
+    def setUp(self):
+        super().setUp()
+        admin = User.objects.create_superuser('admin', 'admin@example.com', PASSWORD)
+        self.client.force_login(admin)
+        today = timezone.localdate()
+        for day, orders in ((today, 2), (today - timedelta(days=800), 5)):
+            product = make_product(f'Product {orders}')
+            DailySalesRollup.objects.create(date=day, status='completed', orders=orders, revenue=orders * 100)
+            DailyProductSalesRollup.objects.create(
+                date=day, product=product, product_name=product.name, units=orders, revenue=orders * 100
+            )
+
+    def test_dashboard_start_covers_twelve_calendar_months(self):
+        self.assertEqual(dashboard_start(today=date(2026, 1, 15)), date(2025, 2, 1))
+        self.assertEqual(dashboard_start(today=date(2026, 12, 31)), date(2026, 1, 1))
+
+    def test_sales_analytics_only_counts_the_last_twelve_months(self):
+        response = self.client.get(reverse('admin:sales-analytics'))
+
+        self.assertEqual((response.context['total_orders'], response.context['completed_orders']), (2, 2))
+        self.assertEqual([product['product_name'] for product in response.context['top_products']], ['Product 2'])
+        self.assertEqual([month['orders'] for month in response.context['monthly_sales']], [2])
+
+    def test_sales_analytics_scopes_totals_to_the_selected_month(self):
+        old_month = (timezone.localdate() - timedelta(days=800)).strftime('%Y-%m')
+        response = self.client.get(reverse('admin:sales-analytics'), {'month': old_month})
+
+        self.assertEqual(response.context['total_orders'], 5)
+        self.assertEqual([product['product_name'] for product in response.context['top_products']], ['Product 5'])
+
+    def test_order_history_only_counts_the_last_twelve_months(self):
+        response = self.client.get(reverse('admin:order-history'))
+
+        self.assertEqual((response.context['total_orders'], response.context['total_revenue']), (2, Decimal('200.00')))
+        self.assertEqual([month['orders'] for month in response.context['monthly_orders']], [2])
@@ -0,0 +1,58 @@
+from django.contrib.sessions.models import Session
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from .. import routers
+from ..middleware import ReplicaRoutingMiddleware
+from ..models import Cart, Product
+
+
+@override_settings(SHOP_READ_REPLICAS=['replica1'])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+
+    def in_request(self, **state):
+        token = routers.begin_request(**state)
+        self.addCleanup(routers.end_request, token)
+
+    def test_only_storefront_catalog_reads_use_a_replica(self):
+        self.assertIsNone(self.router.db_for_read(Product))
+
+        self.in_request()
+        self.assertEqual(self.router.db_for_read(Product), 'replica1')
+        self.assertIsNone(self.router.db_for_read(Cart))
+
+    def test_admin_requests_read_the_primary_outside_replica_reads(self):
+        self.in_request(catalog=False)
+        self.assertIsNone(self.router.db_for_read(Product))
+        with routers.replica_reads():
+            self.assertEqual(self.router.db_for_read(Cart), 'replica1')
+        self.assertIsNone(self.router.db_for_read(Cart))
+
+    def test_a_write_keeps_the_rest_of_the_request_on_the_primary(self):
+        self.in_request()
+        self.router.db_for_write(Session)
+        self.assertEqual(self.router.db_for_read(Product), 'replica1')
+        self.router.db_for_write(Cart)
+        self.assertIsNone(self.router.db_for_read(Product))
+
+    def test_visitors_who_wrote_stay_on_the_primary(self):
+        def writing_view(request):
+            self.router.db_for_write(Cart)
+            return HttpResponse()
+
+        def reading_view(request):
+            return HttpResponse(self.router.db_for_read(Product) or 'default')
+
+        factory = RequestFactory()
+        response = ReplicaRoutingMiddleware(writing_view)(factory.get('/'))
+        self.assertIn(routers.STICKY_COOKIE, response.cookies)
+
+        pinned = factory.get('/', headers={'cookie': f'{routers.STICKY_COOKIE}=1'})
+        self.assertEqual(ReplicaRoutingMiddleware(reading_view)(pinned).content, b'default')
+        self.assertEqual(ReplicaRoutingMiddleware(reading_view)(factory.get('/')).content, b'replica1')
+
+    def test_replicas_are_never_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica1', 'shop'))
+        self.assertIsNone(self.router.allow_migrate('default', 'shop'))
@@ -0,0 +1,105 @@
+from django.http import QueryDict
+from django.test import override_settings
+from django.urls import reverse
+
+from ..catalog import filter_products, paginate, search_results
+from ..facets import get_facets
+from ..models import Product
+from ..search import search_product_ids
+from .base import ShopTestCase, make_product
+
+
+class SearchRankingTests(ShopTestCase):
+    def setUp(self):
+        super().setUp()
+        self.in_description = [
+            make_product(f'Sketchbook {number}', category='art_materials', description='pairs well with a fine pen')
+            for number in range(6)
+        ]
+        self.in_name = make_product('Fine pen', description='Smooth ink')
+        # Catch the shared index up with this test's products before anything is measured
+        search_product_ids('pen')
+
+    def ranked(self, query):
+        # The index is shared by every test, so it may still know products rolled back since
+        existing = set(Product.objects.values_list('pk', flat=True))
+        return [pk for pk in search_product_ids(query) if pk in existing]
+
+    def test_best_match_first_by_default(self):
+        ranked = self.ranked('pen')
+        self.assertEqual(ranked[0], self.in_name.pk)
+        products = filter_products(QueryDict('search=pen'))[0]
+        page, cursor = paginate(products, None, 3)
+        seen = [product.pk for product in page]
+        while cursor:
+            page, cursor = paginate(products, cursor, 3)
+            seen += [product.pk for product in page]
+        self.assertEqual(seen, ranked)
+
+    def test_other_sorts_ignore_the_ranking(self):
+        products = filter_products(QueryDict('search=pen&sort_by=a-to-z'))[0]
+        self.assertEqual(paginate(products, None, 1)[0][0], self.in_name)
+
+    def test_api_pages_keep_the_ranking(self):
+        url = reverse('shop-products-api')
+        first = self.client.get(url, {'search': 'pen', 'limit': 4, 'fields': 'id'}).json()
+        second = self.client.get(url, {'search': 'pen', 'limit': 4, 'fields': 'id', 'cursor': first['next_cursor']}).json()
+        self.assertEqual(
+            [row['id'] for row in first['products'] + second['products']], self.ranked('pen')
+        )
+
+    def test_search_without_matches_lists_nothing(self):
+        for url_name in ('shop', 'shop-products-api', 'shop-products-fragment'):
+            for sort_by in ('', 'a-to-z'):
+                with self.subTest(url_name=url_name, sort_by=sort_by):
+                    response = self.client.get(reverse(url_name), {'search': 'zzzqqq', 'sort_by': sort_by})
+                    self.assertEqual(response.status_code, 200)
+                    if url_name == 'shop':
+                        self.assertEqual(list(response.context['products']), [])
+                    else:
+                        self.assertEqual(response.json()['count'], 0)
+
+    def test_numeric_search_lists_price_matches_after_text_matches(self):
+        priced = make_product('Glue stick', price='45.50', description='Washable')
+
+        products = filter_products(QueryDict('search=45'))[0]
+
+        self.assertEqual(paginate(products, None, 10)[0], [priced])
+
+    def walk(self, params, limit):
+        products = filter_products(QueryDict(params))[0]
+        page, cursor = paginate(products, None, limit)
+        seen = [product.pk for product in page]
+        while cursor:
+            page, cursor = paginate(products, cursor, limit)
+            seen += [product.pk for product in page]
+        return seen
+
+    def test_filtered_best_match_pages_skip_what_the_filters_leave_out(self):
+        for number in range(12):
+            make_product(f'Marker {number}', category='markers', description='a pen for posters')
+        sketchbook = make_product('Pen sketchbook', category='papers', description='drawing paper')
+        kept = {sketchbook.pk, self.in_name.pk}
+
+        expected = [pk for pk in self.ranked('pen') if pk in kept]
+        self.assertEqual(self.walk('search=pen&categories=papers&categories=pens', limit=1), expected)
+
+    @override_settings(SHOP_SEARCH_MAX_RESULTS=3)
+    def test_best_match_lists_every_match_other_sorts_the_best_few(self):
+        ranked = self.ranked('pen')
+        best = [pk for pk in search_results('pen')[:3] if pk in ranked]
+
+        self.assertEqual(self.walk('search=pen', limit=2), ranked)
+        self.assertEqual(sorted(self.walk('search=pen&sort_by=price-lowest-first', limit=2)), sorted(best))
+        counts = get_facets(QueryDict('search=pen'))['category']
+        self.assertEqual(sum(option['count'] for option in counts), len(best))
+
+    def test_results_are_cached_until_the_catalog_changes(self):
+        search_results('pen')
+        with self.assertNumQueries(0):
+            search_results('pen')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            refill = make_product('Fine pen refill')
+
+        self.assertIn(refill.pk, search_results('pen'))
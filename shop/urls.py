@@ -1,6 +1,6 @@
 from django.urls import path
 from . import views
-from .api import auth
+from .api import auth, catalog
 from django.contrib.auth.views import LogoutView
 
 
@@ -11,7 +11,9 @@ urlpatterns = [
     path('sign-in/', views.sign_in, name='sign-in'),
     path('sign-up/', views.sign_up, name='sign-up'),
     path('shop/', views.shop, name='shop'),
-    path('api/shop/products/', views.shop_products_api, name='shop-products-api'),
+    path('api/shop/products/', catalog.products_api, name='shop-products-api'),
+    path('api/shop/products/fragment/', views.shop_products_fragment, name='shop-products-fragment'),
+    path('api/products/<slug:slug>/', catalog.product_detail_api, name='product-detail-api'),
     path('cart/', views.cart, name='cart'),
     path('about-us/', views.about_us, name='about-us'),
     path('contact-us/', views.contact_us, name='contact-us'),
@@ -23,7 +25,7 @@ urlpatterns = [
     path('profile/delete-account/', views.delete_account, name='delete_account'),
     path('api/login/', auth.handle_account_authorization, name='api-login'),
     path('api/register/', auth.handle_account_registration, name='api-register'),
-    path('api/cart-count/', views.cart_count_api, name='cart-count-api'),
+    path('api/cart-count/', catalog.cart_count_api, name='cart-count-api'),
     path('cart/add/', views.add_to_cart, name='add_to_cart'),
     path('cart/item/<int:item_id>/update/', views.update_cart_item, name='update_cart_item'),
     path('cart/item/<int:item_id>/remove/', views.remove_cart_item, name='remove_cart_item'),
@@ -1,29 +1,41 @@
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
-from django.db.models import Q
+from django.template.loader import render_to_string
+from django.utils.functional import SimpleLazyObject
 from django.contrib import messages
 from django.http import JsonResponse
 from django.contrib.auth import authenticate, update_session_auth_hash
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
-from .models import Product, UserProfile, Address, Cart, CartItem, Order, OrderItem, Feedback
+from django.db.models import Max, OuterRef, Subquery
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from .models import Product, ProductRecommendation, UserProfile, Address, Cart, CartItem, Order, Feedback
+from .carts import (
+    CART_ID_SESSION_KEY, TOTAL_FIELDS, add_item, cart_items, current_cart, get_cart_badge_count, get_cart_item,
+    get_or_create_cart, items_subtotal, quantity_in_cart, refresh_cart_badge, remove_item, set_item_quantity,
+)
+from .cache import get_catalog_version, get_landing_rails, make_etag
+from .currency import get_currency, get_rate_table, localize, localize_cart, set_currency
+from .checkout import InsufficientStock, place_order, shipping_fee_for
+from .recommendations import recommended_products
+from .reservations import available_quantity, held_subquery, release_reservations, reserve_items
+from .catalog import InvalidCursor, filter_products, paginate
+from .facets import get_facets
 
 def landing(request):
     """Homepage with featured products, bestsellers, and new arrivals"""
     
-    # Get featured products (limit to 8)
-    featured_products = Product.objects.filter(is_active=True, is_featured=True)[:8]
+    currency = get_currency(request)
     
-    # Get bestsellers (limit to 8)
-    bestsellers = Product.objects.filter(is_active=True, is_bestseller=True)[:8]
+    def localized_rails():
+        rails = get_landing_rails()
+        localize([product for products in rails.values() for product in products], currency)
+        return rails
     
-    # Get new arrivals (products from last 30 days, limit to 8)
-    from django.utils import timezone
-    from datetime import timedelta
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    new_arrivals = Product.objects.filter(
-        is_active=True, 
-        created_at__gte=thirty_days_ago
-    ).order_by('-created_at')[:8]
+    # The rails are only built when the cached fragment in landing.html misses,
+    # so a warm homepage issues no catalog queries at all
+    landing_rails = SimpleLazyObject(localized_rails)
     
     # Breadcrumb for homepage (just "Home")
     breadcrumb_items = [
@@ -31,9 +43,10 @@ def landing(request):
     ]
     
     context = {
-        'featured_products': featured_products,
-        'bestsellers': bestsellers,
-        'new_arrivals': new_arrivals,
+        'landing_rails': landing_rails,
+        'catalog_version': get_catalog_version(),
+        'currency_rates_version': get_rate_table().version,
+        'landing_cache_timeout': settings.SHOP_LANDING_CACHE_TIMEOUT,
         'breadcrumb_items': breadcrumb_items,
     }
     
@@ -41,45 +54,19 @@ def landing(request):
 
 def shop(request):
     """Shop page with all products and filtering"""
-    # Get all active products
-    products = Product.objects.filter(is_active=True)
-    
-    # Get unique categories that actually have products
-    existing_categories = set(Product.objects.exclude(category='').values_list('category', flat=True))
-    category_choices = [
-        (cat, dict(Product.CATEGORIES_CHOICES).get(cat, cat)) 
-        for cat in existing_categories
-    ]
-    # Sort alphabetically by display name
-    category_choices.sort(key=lambda x: (x[1] or '').lower())
-    
-    # Handle search
-    search_query = request.GET.get('search', '')
-    if search_query:
-        products = products.filter(
-            Q(name__icontains=search_query) | 
-            Q(description__icontains=search_query)
-        )
+    # Handle search, category filtering and sorting
+    products, search_query, selected_categories, sort_by = filter_products(request.GET)
     
-    # Handle category filtering
-    selected_categories = request.GET.getlist('categories')
-    if selected_categories:
-        products = products.filter(category__in=selected_categories)
-    
-    # Handle sorting
-    sort_by = request.GET.get('sort_by', 'name')
-    if sort_by == 'a-to-z':
-        products = products.order_by('name')
-    elif sort_by == 'z-to-a':
-        products = products.order_by('-name')
-    elif sort_by == 'price-lowest-first':
-        products = products.order_by('price')
-    elif sort_by == 'price-highest-first':
-        products = products.order_by('-price')
-    elif sort_by == 'recently-added':
-        products = products.order_by('-created_at')
-    else:
-        products = products.order_by('name')
+    # Only the first page is rendered; the rest is streamed in by the fragment endpoint
+    try:
+        products, next_cursor = paginate(products, request.GET.get('cursor'), settings.SHOP_PAGE_SIZE)
+    except InvalidCursor:
+        products, next_cursor = paginate(products, None, settings.SHOP_PAGE_SIZE)
+    currency = get_currency(request)
+    localize(products, currency)
+    
+    # Counts per category, price band and stock status for the sidebar
+    facets = get_facets(request.GET, currency)
     
     # Build breadcrumb trail for shop page
     breadcrumb_items = [
@@ -89,80 +76,113 @@ def shop(request):
     
     context = {
         'products': products,
-        'category_choices': category_choices,
+        'facets': facets,
         'search_query': search_query,
         'selected_categories': selected_categories,
         'sort_by': sort_by,
+        'next_cursor': next_cursor,
+        'next_page_url': _next_page_url(request, next_cursor),
         'breadcrumb_items': breadcrumb_items,
     }
     
     return render(request, 'shop/shop.html', context)
 
-def shop_products_api(request):
-    """API endpoint to get filtered products without page refresh"""
-    from decimal import Decimal, InvalidOperation
-    
-    # Get all active products
-    products = Product.objects.filter(is_active=True)
-    
-    # Handle search - only search by name (title) and price
-    search_query = request.GET.get('search', '')
-    if search_query:
-        # Search by name or price (convert price to string for partial matching)
-        products = products.filter(
-            Q(name__icontains=search_query) | 
-            Q(price__startswith=search_query)
+def shop_products_fragment(request):
+    """Next page of the shop grid as pre-rendered product cards (infinite scroll)"""
+    products, search_query, selected_categories, sort_by = filter_products(request.GET)
+    try:
+        page, next_cursor = paginate(products, request.GET.get('cursor'), settings.SHOP_PAGE_SIZE)
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    currency = get_currency(request)
+    localize(page, currency)
+    
+    html = render_to_string('shop/components/product_card_list.html', {'products': page}, request=request)
+    
+    data = {
+        'html': html,
+        'count': len(page),
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None,
+    }
+    # A new first page means new filters, so the sidebar counts change too
+    if not request.GET.get('cursor'):
+        data['facets'] = get_facets(request.GET, currency)
+    return JsonResponse(data)
+
+def _next_page_url(request, next_cursor):
+    """Shop URL for the page after the current one, keeping the active filters"""
+    if not next_cursor:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = next_cursor
+    return f"?{params.urlencode()}"
+
+def _pdp_validators(request, slug):
+    """ETag and Last-Modified of a product page, from one query; ``(None, None)`` when it has to be rendered.
+
+    The page shows the product, its availability (stock minus other carts'
+    holds), its recommendations (topped up from its category) and the
+    visitor's header, prices and currency, so all of those go into the ETag.
+    """
+    if hasattr(request, '_pdp_validators'):
+        return request._pdp_validators
+    request._pdp_validators = (None, None)
+    
+    related_modified = (
+        Product.objects.filter(category=OuterRef('category'), is_active=True)
+        .exclude(pk=OuterRef('pk'))
+        .order_by()
+        .values('category')
+        .annotate(latest=Max('modified_at'))
+        .values('latest')[:1]
+    )
+    recommendations_built = (
+        ProductRecommendation.objects.filter(product=OuterRef('pk'))
+        .order_by()
+        .values('product')
+        .annotate(latest=Max('built_at'))
+        .values('latest')[:1]
+    )
+    row = (
+        Product.objects.filter(slug=slug)
+        .annotate(
+            held=held_subquery(exclude_cart=request.session.get(CART_ID_SESSION_KEY)),
+            related_modified=Subquery(related_modified),
+            recommendations_built=Subquery(recommendations_built),
         )
-    
-    # Handle category filtering
-    selected_categories = request.GET.getlist('categories')
-    if selected_categories:
-        products = products.filter(category__in=selected_categories)
-    
-    # Handle sorting
-    sort_by = request.GET.get('sort_by', 'name')
-    if sort_by == 'a-to-z':
-        products = products.order_by('name')
-    elif sort_by == 'z-to-a':
-        products = products.order_by('-name')
-    elif sort_by == 'price-lowest-first':
-        products = products.order_by('price')
-    elif sort_by == 'price-highest-first':
-        products = products.order_by('-price')
-    elif sort_by == 'recently-added':
-        products = products.order_by('-created_at')
-    else:
-        products = products.order_by('name')
-    
-    # Serialize products to JSON
-    products_data = []
-    for product in products:
-        products_data.append({
-            'id': product.id,
-            'name': product.name,
-            'description': product.description,
-            'price': str(product.price),
-            'image_url': product.image_url,
-            'category': product.category,
-            'category_display': product.get_category_display_name(),
-            'stock_quantity': product.stock_quantity,
-            'stock_status': product.stock_status,
-            'is_active': product.is_active,
-            'is_in_stock': product.is_in_stock,
-            'url': product.get_absolute_url(),
-        })
-    
-    return JsonResponse({
-        'products': products_data,
-        'count': len(products_data)
-    })
+        .values('modified_at', 'held', 'related_modified', 'recommendations_built')
+        .first()
+    )
+    if row is None:
+        return request._pdp_validators
+    
+    last_modified = max(filter(None, (row['modified_at'], row['related_modified'], row['recommendations_built'])))
+    etag = make_etag(
+        get_catalog_version(), row['modified_at'].isoformat(), row['related_modified'],
+        row['recommendations_built'], row['held'],
+        request.user.pk, get_currency(request), get_rate_table().version, get_cart_badge_count(request),
+        weak=True,
+    )
+    request._pdp_validators = (etag, last_modified)
+    return request._pdp_validators
+
+def _pdp_etag(request, slug):
+    return _pdp_validators(request, slug)[0]
+
+def _pdp_last_modified(request, slug):
+    return _pdp_validators(request, slug)[1]
+
+# Browsers and proxies keep the page but revalidate it, getting 304 Not Modified while nothing changed
+@cache_control(no_cache=True)
+@condition(etag_func=_pdp_etag, last_modified_func=_pdp_last_modified)
 def pdp(request, slug):
     """View for individual product details"""
     product = get_object_or_404(Product, slug=slug)
-    related_products = Product.objects.filter(
-        category=product.category, 
-        is_active=True
-    ).exclude(slug=slug)[:4]
+    # Customers also bought (see shop.recommendations), or more from the category
+    related_products = recommended_products(product, 4)
+    # Convert the product's price together with its related products'
+    localize([product, *related_products], get_currency(request))
     
     # Build breadcrumb trail
     breadcrumb_items = [
@@ -172,8 +192,13 @@ def pdp(request, slug):
         {'name': product.name, 'url': None}
     ]
     
+    # Stock minus what other shoppers are holding at checkout
+    available = available_quantity(product, cart=request.session.get(CART_ID_SESSION_KEY))
+    
     context = {
         'product': product,
+        'available_quantity': available,
+        'stock_status': Product.describe_stock(available, product.is_active),
         'related_products': related_products,
         'breadcrumb_items': breadcrumb_items,
     }
@@ -216,16 +241,6 @@ def sign_up(request):
     
     return render(request, 'shop/sign-up.html', context)
 
-def cart_count_api(request):
-    """API endpoint to get current cart count"""
-    cart = _get_or_create_cart(request)
-    items = cart.items.all() if cart else []
-    # Return number of distinct items (CartItem rows), not the sum of quantities
-    cart_item_count = items.count() if hasattr(items, 'count') else len(items)
-    
-    return JsonResponse({'count': cart_item_count})
-
-
 def about_us(request):
     """About Us page rendering a prototype-style layout"""
     breadcrumb_items = [
@@ -253,44 +268,11 @@ def contact_us(request):
 
     return render(request, 'shop/contact-us.html', context)
 
-from decimal import Decimal
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.http import require_POST
-from django.db import transaction
 
 from .models import Product, Cart, CartItem
 
-def _get_or_create_cart(request):
-    """Return an active Cart for the current user or session."""
-    session_key = request.session.session_key
-    if not session_key:
-        request.session.create()
-        session_key = request.session.session_key
-
-    if request.user.is_authenticated:
-        cart, created = Cart.objects.get_or_create(user=request.user, is_active=True, defaults={'session_key': session_key})
-        # If there is an anonymous cart for this session, merge it
-        try:
-            anon_cart = Cart.objects.get(session_key=session_key, user__isnull=True, is_active=True)
-            if anon_cart.pk != cart.pk:
-                with transaction.atomic():
-                    for item in anon_cart.items.all():
-                        ci, created = CartItem.objects.get_or_create(
-                            cart=cart,
-                            product=item.product,
-                            defaults={'quantity': item.quantity, 'price': item.price}
-                        )
-                        if not created:
-                            ci.quantity += item.quantity
-                            ci.save()
-                    anon_cart.is_active = False
-                    anon_cart.save()
-        except Cart.DoesNotExist:
-            pass
-    else:
-        cart, created = Cart.objects.get_or_create(session_key=session_key, user=None, is_active=True)
-    return cart
-
 @require_POST
 def add_to_cart(request):
     """Add product to cart or increment quantity."""
@@ -307,31 +289,26 @@ def add_to_cart(request):
     product = get_object_or_404(Product, pk=product_id)
     
     # Check stock availability
-    cart = _get_or_create_cart(request)
-    existing_item = CartItem.objects.filter(cart=cart, product=product).first()
-    new_quantity = (existing_item.quantity if existing_item else 0) + qty
-    
-    if new_quantity > product.stock_quantity:
+    cart = current_cart(request)
+    if cart.pk is None and cart.is_full(product.pk):
+        # Too many lines for the cookie; keep this cart in the database from now on
+        cart = get_or_create_cart(request)
+    new_quantity = quantity_in_cart(cart, product) + qty
+    available = available_quantity(product, cart.pk)
+    
+    if new_quantity > available:
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({
                 'success': False, 
-                'error': f'Insufficient stock. Only {product.stock_quantity} available.'
+                'error': f'Insufficient stock. Only {available} available.'
             }, status=400)
-        messages.error(request, f'Insufficient stock. Only {product.stock_quantity} available.')
+        messages.error(request, f'Insufficient stock. Only {available} available.')
         return redirect(request.META.get('HTTP_REFERER', 'shop'))
     
-    with transaction.atomic():
-        item, created = CartItem.objects.get_or_create(
-            cart=cart,
-            product=product,
-            defaults={'quantity': qty, 'price': product.price}
-        )
-        if not created:
-            item.quantity += qty
-            item.save()
+    add_item(cart, product, qty)
     
-    # Calculate new cart count
-    cart_item_count = sum(item.quantity for item in cart.items.all())
+    # Calculate new cart count (distinct items, same as the header badge)
+    cart_item_count = refresh_cart_badge(request, cart)
     
     # For AJAX requests, return JSON
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -353,12 +330,13 @@ def cart(request):
         {'name': 'Home', 'url': '/'},
         {'name': 'My Cart', 'url': None}
     ]
-    cart_obj = _get_or_create_cart(request)
-    items = cart_obj.items.select_related('product').all() if cart_obj else []
+    cart_obj = current_cart(request)
+    items = cart_items(cart_obj)
     context = {
         'breadcrumb_items': breadcrumb_items,
         'cart': cart_obj,
         'items': items,
+        'totals': localize_cart(items, get_currency(request), subtotal=items_subtotal(cart_obj, items)),
     }
     return render(request, 'shop/cart.html', context)
 
@@ -366,36 +344,51 @@ def cart(request):
 def update_cart_item(request, item_id):
     """Update quantity for a given cart item (set or remove if 0)."""
     qty = int(request.POST.get('quantity', 0))
-    item = get_object_or_404(CartItem, pk=item_id)
-    # Ensure item belongs to the current cart
-    cart = _get_or_create_cart(request)
-    if item.cart_id != cart.id:
+    # Only items of the current cart can be changed
+    cart = current_cart(request)
+    item = get_cart_item(cart, item_id)
+    if item is None:
         return redirect('cart')
-    if qty <= 0:
-        item.delete()
-    else:
-        item.quantity = qty
-        item.save()
+    set_item_quantity(cart, item, qty)
+    if cart.pk:
+        # Any checkout hold was for the old quantity; checkout takes a fresh one
+        release_reservations(cart, [item.product_id])
+    refresh_cart_badge(request, cart)
     return redirect('cart')
 
 @require_POST
 def remove_cart_item(request, item_id):
-    item = get_object_or_404(CartItem, pk=item_id)
-    cart = _get_or_create_cart(request)
-    if item.cart_id == cart.id:
-        item.delete()
+    cart = current_cart(request)
+    item = get_cart_item(cart, item_id)
+    if item is not None:
+        remove_item(cart, item)
+        if cart.pk:
+            release_reservations(cart, [item.product_id])
+        refresh_cart_badge(request, cart)
     return redirect('cart')
 
 from django.shortcuts import render, redirect
 from django.views.decorators.http import require_POST
 
 def checkout(request):
-    cart = _get_or_create_cart(request)
+    cart = current_cart(request)
+    from_cookie = cart.pk is None
+    if from_cookie:
+        if not cart.lines:
+            messages.warning(request, "Please select at least one item to checkout.")
+            return redirect('cart')
+        # Checkout is where an anonymous cookie cart gets stored, so it can hold stock and become an order
+        cart = get_or_create_cart(request)
     
     # Get selected item IDs from POST or session
     if request.method == "POST" and 'selected_items' in request.POST:
         # This is from the cart page "Proceed to Checkout" button
         selected_item_ids = request.POST.getlist('selected_items')
+        if from_cookie:
+            # The cart page listed cookie lines, whose ids are product ids
+            selected_item_ids = [
+                str(item_id) for item_id in cart.items.filter(product_id__in=selected_item_ids).values_list('id', flat=True)
+            ]
         # Store in session for subsequent requests
         if selected_item_ids:
             request.session['selected_items'] = selected_item_ids
@@ -412,7 +405,7 @@ def checkout(request):
         return redirect('cart')
     
     # Filter items based on selection
-    items = cart.items.select_related('product').filter(id__in=selected_item_ids) if cart else []
+    items = cart_items(cart, selected_item_ids)
     
     # Double-check that items exist (in case session data is stale)
     if not items:
@@ -421,18 +414,12 @@ def checkout(request):
             del request.session['selected_items']
         return redirect('cart')
     
-    # Calculate subtotal for all cases (both GET and POST)
-    subtotal = Decimal('0.00')
-    for item in items:
-        subtotal += item.product.price * item.quantity
-    
-    # Calculate shipping fee based on subtotal
-    if subtotal < Decimal('200.00'):
-        shipping_fee = Decimal('50.00')
-    elif subtotal >= Decimal('200.00'):
-        shipping_fee = Decimal('70.00')
-    else:
-        shipping_fee = Decimal('50.00')
+    # The stored subtotal when the whole cart is checked out; the shipping band comes from what place_order charges
+    subtotal = items_subtotal(cart, items)
+    shipping_fee = shipping_fee_for(subtotal)
+
+    # What the summary shows, in the visitor's currency; the order itself is placed in PHP
+    totals = localize_cart(items, get_currency(request), shipping_fee, subtotal)
 
     # Check if this is the actual checkout form submission
     if request.method == "POST" and 'full_name' in request.POST:
@@ -454,82 +441,44 @@ def checkout(request):
                 "cart": cart,
                 "items": items,
                 "shipping_fee": shipping_fee,
+                "totals": totals,
                 "breadcrumb_items": breadcrumb_items
             })
         
-        # Check stock availability before processing
-        for item in items:
-            if item.product.stock_quantity < item.quantity:
-                messages.error(request, f"Insufficient stock for {item.product.name}. Available: {item.product.stock_quantity}")
-                breadcrumb_items = [
-                    {'name': 'Home', 'url': '/'},
-                    {'name': 'My Cart', 'url': '/cart'},
-                    {'name': 'Checkout', 'url': None}
-                ]
-                return render(request, "shop/checkout.html", {
-                    "cart": cart,
-                    "items": items,
-                    "shipping_fee": shipping_fee,
-                    "breadcrumb_items": breadcrumb_items
-                })
-        
-        # Subtotal and shipping fee already calculated above
-        total_amount = subtotal + shipping_fee
-
-        with transaction.atomic():
-            # Create Order
-            order = Order.objects.create(
+        # Refresh the hold, then check and decrement stock atomically while placing the order
+        try:
+            reserve_items(cart, items)
+            order = place_order(
+                items,
                 user=request.user if request.user.is_authenticated else None,
                 full_name=full_name,
                 email=email,
                 address=address,
                 payment_method=payment_method,
-                total_amount=total_amount,
                 shipping_fee=shipping_fee,
-                status='pending'  # Changed from 'Pending' to 'pending' to match choices
             )
-
-            # Create OrderItems and deduct stock
-            from .models import InventoryTransaction
-            
-            for item in items:
-                # Create order item
-                order_item = OrderItem.objects.create(
-                    order=order,
-                    product=item.product,
-                    quantity=item.quantity,
-                    price=item.product.price,
-                )
-                # Calculate total_price for the order item
-                order_item.total_price = order_item.quantity * order_item.price
-                order_item.save()
-                
-                # Deduct stock
-                product = item.product
-                stock_before = product.stock_quantity
-                product.stock_quantity -= item.quantity
-                product.save()
-                stock_after = product.stock_quantity
-                
-                # Create inventory transaction record
-                InventoryTransaction.objects.create(
-                    product=product,
-                    order=order,
-                    transaction_type='sale',
-                    quantity_change=-item.quantity,
-                    stock_before=stock_before,
-                    stock_after=stock_after,
-                    notes=f"Order #{order.id} - {full_name}",
-                    created_by=request.user if request.user.is_authenticated else None
-                )
-
-            # Clear the cart (only selected items)
-            for item in items:
-                item.delete()
-            
-            # Clear selected items from session
-            if 'selected_items' in request.session:
-                del request.session['selected_items']
+        except InsufficientStock as exc:
+            available = available_quantity(Product.objects.get(pk=exc.product.pk), cart)
+            messages.error(request, f"Insufficient stock for {exc.product.name}. Available: {available}")
+            breadcrumb_items = [
+                {'name': 'Home', 'url': '/'},
+                {'name': 'My Cart', 'url': '/cart'},
+                {'name': 'Checkout', 'url': None}
+            ]
+            return render(request, "shop/checkout.html", {
+                "cart": cart,
+                "items": items,
+                "shipping_fee": shipping_fee,
+                "totals": totals,
+                "breadcrumb_items": breadcrumb_items
+            })
+        
+        cart.refresh_from_db(fields=TOTAL_FIELDS)
+        refresh_cart_badge(request, cart)
+        
+        # Clear selected items from session
+        if 'selected_items' in request.session:
+            del request.session['selected_items']
 
         breadcrumb_items = [
             {'name': 'Home', 'url': '/'},
@@ -544,7 +493,14 @@ def checkout(request):
             "breadcrumb_items": breadcrumb_items
         })
 
-    # GET request or POST from cart page - show checkout form
+    # GET request or POST from cart page - hold the stock while the form is filled in
+    try:
+        reserve_items(cart, items)
+    except InsufficientStock as exc:
+        available = available_quantity(Product.objects.get(pk=exc.product.pk), cart)
+        messages.error(request, f"Insufficient stock for {exc.product.name}. Available: {available}")
+        return redirect('cart')
+
     breadcrumb_items = [
         {'name': 'Home', 'url': '/'},
         {'name': 'My Cart', 'url': '/cart'},
@@ -555,6 +511,7 @@ def checkout(request):
         "cart": cart,
         "items": items,
         "shipping_fee": shipping_fee,
+        "totals": totals,
         "breadcrumb_items": breadcrumb_items
     })
 @login_required
@@ -613,6 +570,7 @@ def user_profile(request):  # Renamed from 'profile' to 'user_profile'
                 
                 if preferred_currency:
                     user_profile.preferred_currency = preferred_currency
+                    set_currency(request, preferred_currency)
                 if preferred_payment_method:
                     user_profile.preferred_payment_method = preferred_payment_method
             
@@ -921,7 +879,7 @@ def orders(request):
 @login_required
 def order_detail(request, order_id):
     """Display detailed information about a specific order"""
-    order = get_object_or_404(Order, id=order_id, user=request.user)
+    order = get_object_or_404(Order.objects.prefetch_related('items__product'), id=order_id, user=request.user)
     
     breadcrumb_items = [
         {'name': 'Home', 'url': '/'},